@@ -1,13 +1,13 @@
 #!/usr/bin/env python3
 from dataclasses import dataclass, field
-from typing import Tuple
+from typing import Optional, Tuple
 
 # noinspection PyUnresolvedReferences
 import cv2
 import numpy as np
 
 
-from aido_schemas import protocol_image_source, JPGImage, EpisodeStart, wrap_direct, Context
+from aido_schemas import protocol_image_source, JPGImage, EpisodeStart, wrap_direct, Context, FramePool
 
 
 # noinspection PyUnresolvedReferences
@@ -27,6 +27,10 @@ class DummyImageSourceConfig:
     """ Number of images for each episode. """
     num_episodes: int = 10
     """  Number of episodes in total. """
+    frame_pool_size: int = 0
+    """ If > 0, the images are encoded only once and served in turn from a ring of this size. """
+    frame_pool_threads: int = 0
+    """ If > 0, the ring is filled in the background by this many threads, rather than at startup. """
 
 
 @dataclass
@@ -40,6 +44,8 @@ class DummyImageSourceState:
 
     episode_name: str = None
 
+    frame_pool: Optional[FramePool] = None
+
 
 @dataclass
 class DummyImageSource:
@@ -54,6 +60,8 @@ class DummyImageSource:
 
     def on_updated_config(self, context: Context, key: str, value):
         context.info(f"Config was updated: {key} = {value!r}")
+        if key in ("shape", "frame_pool_size", "frame_pool_threads"):
+            self._close_frame_pool()
 
     def on_received_next_episode(self, context: Context):
         self._start_episode(context)
@@ -63,10 +71,7 @@ class DummyImageSource:
             context.write("no_more_images", None)
             return
 
-        H, W = self.config.shape
-        values = (128 + np.random.randn(H, W, 3) * 60).astype("uint8")
-        jpg_data = bgr2jpg(values)
-        image = JPGImage(jpg_data)
+        image = self._get_image()
         delta = 0.15
         t = self.state.nimages * delta
         time = timestamp_from_seconds(t)
@@ -76,7 +81,23 @@ class DummyImageSource:
         context.write(topic="image", data=image, timing=timing)
 
     def finish(self):
-        pass
+        self._close_frame_pool()
+
+    def _get_image(self) -> JPGImage:
+        if not self.config.frame_pool_size:
+            return random_image(self.config.shape)
+        if self.state.frame_pool is None:
+            self.state.frame_pool = FramePool(
+                lambda i: random_image(self.config.shape),
+                size=self.config.frame_pool_size,
+                nthreads=self.config.frame_pool_threads,
+            )
+        return self.state.frame_pool.get()
+
+    def _close_frame_pool(self):
+        if self.state.frame_pool is not None:
+            self.state.frame_pool.close()
+            self.state.frame_pool = None
 
     def _start_episode(self, context: Context):
         if self.state.episode >= self.config.num_episodes:
@@ -90,6 +111,12 @@ class DummyImageSource:
         context.write("episode_start", EpisodeStart(self.state.episode_name))
 
 
+def random_image(shape: Tuple[int, int]) -> JPGImage:
+    H, W = shape
+    values = (128 + np.random.randn(H, W, 3) * 60).astype("uint8")
+    return JPGImage(bgr2jpg(values))
+
+
 def bgr2jpg(image_cv) -> bytes:
 
     compress = cv2.imencode(".jpg", image_cv)[1]
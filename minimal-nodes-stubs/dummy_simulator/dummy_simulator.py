@@ -1,4 +1,6 @@
 #!/usr/bin/env python3
+from dataclasses import dataclass
+from typing import Optional
 
 import numpy as np
 
@@ -22,17 +24,35 @@ from aido_schemas import (
     DB18SetRobotCommands,
     DB18RobotObservations,
 )
-from aido_schemas import DuckieState
+from aido_schemas import CommandsDeduplicator, DuckieState, FramePool
+
+IMAGE_SHAPE = (200, 300)
+
+
+@dataclass
+class DummySimulatorConfig:
+    frame_pool_size: int = 0
+    """ If > 0, the camera images are encoded only once and served in turn from a ring of this size. """
+    frame_pool_threads: int = 0
+    """ If > 0, the ring is filled in the background by this many threads, rather than at startup. """
 
 
 class DummySimulator:
     """A dummy simulator implementation."""
 
+    config: DummySimulatorConfig
     current_time: float
     robot_name: str
+    frame_pool: Optional[FramePool]
+
+    def __init__(self):
+        self.config = DummySimulatorConfig()
+        self.frame_pool = None
 
     def init(self, context: Context):
         context.info("init()")
+        # set_robot_commands with the same commands as the last ones are no-ops
+        self.commands_dedup = CommandsDeduplicator()
 
     def on_received_seed(self, context: Context, data: int):
         context.info(f"seed({data})")
@@ -69,17 +89,20 @@ class DummySimulator:
     def on_received_episode_start(self, context: Context):
         context.info(f"episode_start()")
         self.current_time = 0
+        self.commands_dedup.reset()
 
     def on_received_step(self, context: Context, data: Step):
         context.info(f"step({data})")
         self.current_time = data.until
 
     def on_received_set_robot_commands(self, context: Context, data: DB18SetRobotCommands):
+        if self.commands_dedup.unchanged(data.robot_name, data.commands):
+            return
         context.info(f"set_robot_commands({data})")
 
     def on_received_get_robot_observations(self, context, data: RobotName):
         context.log(f"get_robot_observation({data!r})")
-        camera = get_random_image(shape=(200, 300))
+        camera = self._get_image()
         obs = Duckiebot1Observations(camera)
         ro = DB18RobotObservations(
             robot_name=self.robot_name, t_effective=self.current_time, observations=obs
@@ -100,6 +123,22 @@ class DummySimulator:
         context.info(f"dump_state()")
         context.write("dump_state", StateDump(None))
 
+    def finish(self, context: Context):
+        if self.frame_pool is not None:
+            self.frame_pool.close()
+            self.frame_pool = None
+
+    def _get_image(self) -> JPGImage:
+        if not self.config.frame_pool_size:
+            return get_random_image(shape=IMAGE_SHAPE)
+        if self.frame_pool is None:
+            self.frame_pool = FramePool(
+                lambda i: get_random_image(shape=IMAGE_SHAPE),
+                size=self.config.frame_pool_size,
+                nthreads=self.config.frame_pool_threads,
+            )
+        return self.frame_pool.get()
+
 
 def get_random_image(shape):
     H, W = shape
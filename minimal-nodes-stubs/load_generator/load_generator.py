@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""
+Drives an agent speaking protocol_agent_DB20 (or protocol_agent_DB20_timestamps)
+at a target rate of observations and get_commands, and writes a report with
+the response times, the throughput and the deadline misses.
+
+The agent runs as a separate process connected with fifos, as in docker-compose.yaml.
+Either give the command to start it:
+
+    ./load_generator.py --agent ../random_agent/random_agent.py --commands-rate 10,20,50
+
+or start it yourself with
+
+    AIDONODE_DATA_IN=<fifos>/agent-in AIDONODE_DATA_OUT=fifo:<fifos>/agent-out
+
+and pass the same ``--fifos`` directory.
+
+One episode is run for each commands rate; the report says which is
+the highest rate that the agent sustains without missing its deadlines.
+"""
+import argparse
+import json
+import os
+import shlex
+import subprocess
+import tempfile
+import time
+from dataclasses import asdict, dataclass, field
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from aido_schemas import (
+    DB20Observations,
+    DB20ObservationsWithTimestamp,
+    DB20Odometry,
+    DB20OdometryWithTimestamp,
+    EpisodeStart,
+    FramePool,
+    GetCommands,
+    JPGImage,
+    JPGImageWithTimestamp,
+    protocol_agent_DB20,
+    protocol_agent_DB20_timestamps,
+)
+from aido_schemas.utils import PhaseStats
+from zuper_commons.logs import ZLogger
+
+logger = ZLogger("load_generator")
+
+
+@dataclass
+class LoadGeneratorConfig:
+    commands_rate: List[float] = field(default_factory=lambda: [10.0])
+    """ Rates of get_commands (Hz); one episode for each. """
+    observations_rate: Optional[float] = None
+    """ Rate of the observations (Hz). By default the same as get_commands. """
+    duration: float = 10.0
+    """ Duration of each episode (seconds). """
+    deadline: Optional[float] = None
+    """ Maximum delay between the scheduled get_commands and the commands. By default the period. """
+    max_miss_ratio: float = 0.01
+    """ Fraction of deadline misses for a rate to count as sustained. """
+    timestamps: bool = False
+    """ Use protocol_agent_DB20_timestamps. """
+    shape: Tuple[int, int] = (480, 640)
+    """ Image shape (height, width) of the random camera frames. """
+    frame_pool_size: int = 16
+    """ Number of distinct camera frames, encoded at startup. """
+    seed: int = 0
+    timeout: float = 60.0
+    """ Timeout for each reply of the agent (seconds). """
+
+
+@dataclass
+class EpisodeReport:
+    episode_name: str
+    commands_rate: float
+    observations_rate: float
+    deadline: float
+    duration: float = 0.0
+    observations_sent: int = 0
+    commands_received: int = 0
+    deadline_misses: int = 0
+    """ Commands received after the deadline. """
+    skipped: int = 0
+    """ get_commands not sent at all because the agent was too far behind (also misses). """
+    response: PhaseStats = field(default_factory=PhaseStats)
+    """ From writing get_commands to reading the commands. """
+    lateness: PhaseStats = field(default_factory=PhaseStats)
+    """ From when get_commands was scheduled to when it was written. """
+    observations_write: PhaseStats = field(default_factory=PhaseStats)
+    """ Time to write the observations (serialization included) and get the agent's ack. """
+
+    @property
+    def miss_ratio(self) -> float:
+        n = self.commands_received + self.skipped
+        return (self.deadline_misses + self.skipped) / n if n else 0.0
+
+    def summary(self) -> dict:
+        return {
+            "episode_name": self.episode_name,
+            "commands_rate": self.commands_rate,
+            "observations_rate": self.observations_rate,
+            "deadline": self.deadline,
+            "duration": self.duration,
+            "observations_sent": self.observations_sent,
+            "commands_received": self.commands_received,
+            "commands_throughput": self.commands_received / self.duration if self.duration else 0.0,
+            "observations_throughput": self.observations_sent / self.duration if self.duration else 0.0,
+            "deadline_misses": self.deadline_misses,
+            "skipped": self.skipped,
+            "miss_ratio": self.miss_ratio,
+            "response": self.response.summary(),
+            "lateness": self.lateness.summary(),
+            "observations_write": self.observations_write.summary(),
+        }
+
+
+class LoadGenerator:
+    def __init__(self, config: LoadGeneratorConfig, ci, jpg_data: Optional[bytes] = None):
+        self.config = config
+        self.ci = ci
+        if jpg_data is not None:
+            self.frames = FramePool(lambda i: jpg_data, size=1)
+        else:
+            rng = np.random.RandomState(config.seed)
+            self.frames = FramePool(lambda i: random_jpg(rng, config.shape), size=config.frame_pool_size)
+
+    def run(self) -> dict:
+        self.ci.write_topic_and_expect_zero("seed", self.config.seed)
+        episodes = []
+        for i, rate in enumerate(self.config.commands_rate):
+            report = self.run_episode(f"load-{i}-{rate:g}Hz", rate)
+            s = report.summary()
+            logger.info(
+                f"{report.episode_name}: {s['commands_throughput']:.1f} commands/s, "
+                f"response p50 {s['response']['p50'] * 1000:.1f} ms "
+                f"p99 {s['response']['p99'] * 1000:.1f} ms, "
+                f"misses {report.deadline_misses} skipped {report.skipped}"
+            )
+            episodes.append(s)
+        sustained = [_["commands_rate"] for _ in episodes if _["miss_ratio"] <= self.config.max_miss_ratio]
+        return {
+            "config": asdict(self.config),
+            "episodes": episodes,
+            "max_sustained_rate": max(sustained) if sustained else None,
+        }
+
+    def run_episode(self, episode_name: str, commands_rate: float) -> EpisodeReport:
+        c = self.config
+        observations_rate = c.observations_rate or commands_rate
+        period_commands = 1.0 / commands_rate
+        period_observations = 1.0 / observations_rate
+        deadline = c.deadline or period_commands
+        report = EpisodeReport(episode_name, commands_rate, observations_rate, deadline)
+
+        self.ci.write_topic_and_expect_zero("episode_start", EpisodeStart(episode_name))
+        t_start = time.perf_counter()
+        # observations first, so that get_commands always has something to answer
+        next_observations = t_start
+        next_commands = t_start + min(period_observations, period_commands) / 2
+        end = t_start + c.duration
+        while True:
+            t_next = min(next_observations, next_commands)
+            if t_next >= end:
+                break
+            now = time.perf_counter()
+            if t_next > now:
+                time.sleep(t_next - now)
+
+            if next_observations <= next_commands:
+                t0 = time.perf_counter()
+                self.ci.write_topic_and_expect_zero("observations", self.make_observations())
+                report.observations_write.add(time.perf_counter() - t0)
+                report.observations_sent += 1
+                next_observations = _advance(next_observations, period_observations, time.perf_counter())[0]
+            else:
+                t0 = time.perf_counter()
+                report.lateness.add(t0 - next_commands)
+                at_time = t0 - t_start
+                # the agent gets what is left of the budget of this request
+                budget = max(0.0, deadline - (t0 - next_commands))
+                get_commands = GetCommands(at_time, deadline=budget)
+                self.ci.write_topic_and_expect("get_commands", get_commands, expect="commands")
+                t1 = time.perf_counter()
+                report.response.add(t1 - t0)
+                report.commands_received += 1
+                if t1 - next_commands > deadline:
+                    report.deadline_misses += 1
+                next_commands, skipped = _advance(next_commands, period_commands, t1)
+                report.skipped += skipped
+        report.duration = time.perf_counter() - t_start
+        return report
+
+    def make_observations(self):
+        jpg_data = self.frames.get()
+        if self.config.timestamps:
+            t = time.time()
+            camera = JPGImageWithTimestamp(jpg_data=jpg_data, timestamp=t)
+            odometry = DB20OdometryWithTimestamp(0.1, 0.0, 0.0, timestamp=t)
+            return DB20ObservationsWithTimestamp(camera, odometry)
+        return DB20Observations(JPGImage(jpg_data), DB20Odometry(0.1, 0.0, 0.0))
+
+
+def _advance(t: float, period: float, now: float) -> Tuple[float, int]:
+    """
+    The next tick after ``t``; if that is already more than a period ago,
+    the ticks in between are skipped (and their number returned).
+    """
+    t += period
+    skipped = 0
+    if now - t > period:
+        skipped = int((now - t) / period)
+        t += skipped * period
+    return t, skipped
+
+
+def random_jpg(rng: np.random.RandomState, shape: Tuple[int, int]) -> bytes:
+    # noinspection PyUnresolvedReferences
+    import cv2
+
+    H, W = shape
+    values = (128 + rng.randn(H, W, 3) * 60).astype("uint8")
+    return np.array(cv2.imencode(".jpg", values)[1]).tobytes()
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--agent", default=None, help="Command that starts the agent")
+    parser.add_argument("--fifos", default=None, help="Directory for the fifos (default: temporary)")
+    parser.add_argument("--commands-rate", default="10", help="Comma-separated rates (Hz)")
+    parser.add_argument("--observations-rate", type=float, default=None)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--deadline", type=float, default=None)
+    parser.add_argument("--max-miss-ratio", type=float, default=0.01)
+    parser.add_argument("--timestamps", default=False, action="store_true")
+    parser.add_argument("--jpg", default=None, help="Use this JPG file for all the frames")
+    parser.add_argument("--report", default="load-report.json")
+    parsed = parser.parse_args(args)
+
+    config = LoadGeneratorConfig(
+        commands_rate=[float(_) for _ in parsed.commands_rate.split(",")],
+        observations_rate=parsed.observations_rate,
+        duration=parsed.duration,
+        deadline=parsed.deadline,
+        max_miss_ratio=parsed.max_miss_ratio,
+        timestamps=parsed.timestamps,
+    )
+    jpg_data = None
+    if parsed.jpg is not None:
+        with open(parsed.jpg, "rb") as f:
+            jpg_data = f.read()
+
+    fifos = parsed.fifos or tempfile.mkdtemp(prefix="load_generator")
+    fnin = os.path.join(fifos, "agent-in")
+    fnout = os.path.join(fifos, "agent-out")
+    protocol = protocol_agent_DB20_timestamps if config.timestamps else protocol_agent_DB20
+
+    agent = None
+    if parsed.agent is not None:
+        env = dict(os.environ)
+        env.update({"AIDONODE_NAME": "agent", "AIDONODE_DATA_IN": fnin, "AIDONODE_DATA_OUT": f"fifo:{fnout}"})
+        agent = subprocess.Popen(shlex.split(parsed.agent), env=env)
+    else:
+        logger.info(f"Waiting for the agent to open {fnin} and create {fnout}.")
+
+    from zuper_nodes_wrapper.wrapper_outside import ComponentInterface
+
+    ci = ComponentInterface(fnin, fnout, expect_protocol=protocol, nickname="agent", timeout=config.timeout)
+    try:
+        # The replies are decoded according to the expected protocol.
+        generator = LoadGenerator(config, ci, jpg_data)
+        report = generator.run()
+    finally:
+        ci.close()
+        if agent is not None:
+            agent.wait(config.timeout)
+
+    with open(parsed.report, "w") as f:
+        json.dump(report, f, indent=2)
+    logger.info(f"Max sustained rate: {report['max_sustained_rate']} Hz. Report written to {parsed.report}")
+
+
+if __name__ == "__main__":
+    main()
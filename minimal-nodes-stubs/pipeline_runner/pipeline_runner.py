@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Runs the chain image_source -> filter1 -> filter2 of docker-compose.yaml
+in a single process: the images are passed between the nodes as Python
+objects, and only the outputs of the last node are serialized.
+
+Reads the messages for the image source (CBOR or JSON) from stdin or
+AIDONODE_DATA_IN and writes the outputs (CBOR) to stdout or AIDONODE_DATA_OUT.
+
+With --queues, each filter runs in its own thread and gets the images
+through a bounded queue (see aido_schemas.backpressure), so that a slow
+filter skips to the freshest image rather than accumulating a backlog.
+
+To run the same nodes isolated in separate processes connected with
+pipes or fifos, use the targets test-all_connected* in the Makefile.
+"""
+import argparse
+import json
+import os
+import sys
+
+import cbor2
+from zuper_ipce import IEDO, IESO, ipce_from_object, object_from_ipce
+from zuper_ipce.json2cbor import read_cbor_or_json_objects
+
+here = os.path.dirname(os.path.abspath(__file__))
+for d in ["dummy_image_source", "dummy_image_filter"]:
+    sys.path.insert(0, os.path.join(here, "..", d))
+
+from aido_schemas import (
+    parse_queue_policies,
+    Pipeline,
+    PipelineStage,
+    protocol_image_filter,
+    protocol_image_source,
+)
+from dummy_image_filter import DummyImageFilter
+from dummy_image_source import DummyImageSource
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--queues", default=None, help="For example: image:keep-latest or image:drop-oldest:4"
+    )
+    parsed = parser.parse_args(args)
+    queues = parse_queue_policies(parsed.queues) if parsed.queues else None
+
+    fin = os.environ.get("AIDONODE_DATA_IN", "/dev/stdin")
+    fout = os.environ.get("AIDONODE_DATA_OUT", "/dev/stdout")
+    ieso = IESO(with_schema=False)
+
+    with open(fin, "rb") as fi, open(fout, "wb") as fo:
+
+        def sink(topic: str, data: object, timing):
+            m = {
+                "compat": ["z2"],
+                "topic": topic,
+                "data": ipce_from_object(data, ieso=ieso),
+                "timing": ipce_from_object(timing, ieso=ieso) if timing is not None else None,
+            }
+            fo.write(cbor2.dumps(m))
+            fo.flush()
+
+        stages = [
+            PipelineStage("source", DummyImageSource(), protocol_image_source),
+            PipelineStage("filter1", DummyImageFilter(), protocol_image_filter),
+            PipelineStage("filter2", DummyImageFilter(), protocol_image_filter),
+        ]
+        pipeline = Pipeline(stages, sink, queues=queues)
+        pipeline.init()
+        inputs = protocol_image_source.inputs
+        for m in read_cbor_or_json_objects(fi):
+            topic = m.get("topic")
+            if topic is None:  # control messages
+                continue
+            data = object_from_ipce(m.get("data"), inputs[topic], iedo=IEDO(True, True))
+            pipeline.write(topic, data)
+        pipeline.finish()
+        if queues is not None:
+            print(f"Queue counters:\n{json.dumps(pipeline.queue_stats(), indent=2)}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -6,17 +6,23 @@ from aido_schemas import (
     EpisodeStart,
     protocol_agent_DB20,
     PWMCommands,
-    Duckiebot1Commands,
+    DB20Commands,
     LEDSCommands,
     RGB,
     wrap_direct,
     Context,
+    LatencyTracer,
+    DeadlineGuard,
+    GetCommands,
 )
 
 
 class RandomAgent:
     def init(self, context: Context):
         self.n = 0
+        self.tracer = LatencyTracer()
+        # if the commands are late, the previous ones are sent again (at the start: stop)
+        self.guard = DeadlineGuard(self.make_commands(0.0, 0.0))
         context.info("init()")
 
     def on_received_seed(self, data: int):
@@ -24,11 +30,18 @@ class RandomAgent:
 
     def on_received_episode_start(self, context: Context, data: EpisodeStart):
         context.info(f'Starting episode "{data.episode_name}".')
+        self.tracer.start_episode(data.episode_name)
+        self.guard.start_episode()
 
     def on_received_observations(self, context: Context):
-        pass
+        self.tracer.observation_received()
 
-    def on_received_get_commands(self, context: Context):
+    def on_received_get_commands(self, context: Context, data: GetCommands):
+        commands = self.guard.get(self.compute_commands, data.deadline)
+        context.write("commands", commands)
+        self.tracer.commands_sent()
+
+    def compute_commands(self) -> DB20Commands:
         if self.n == 0:
             pwm_left = 0.0
             pwm_right = 0.0
@@ -39,13 +52,18 @@ class RandomAgent:
 
         # pwm_left = 1.0
         # pwm_right = 1.0
+        return self.make_commands(pwm_left, pwm_right)
+
+    def make_commands(self, pwm_left: float, pwm_right: float) -> DB20Commands:
         grey = RGB(0.0, 0.0, 0.0)
         led_commands = LEDSCommands(grey, grey, grey, grey, grey)
         pwm_commands = PWMCommands(motor_left=pwm_left, motor_right=pwm_right)
-        commands = Duckiebot1Commands(pwm_commands, led_commands)
-        context.write("commands", commands)
+        return DB20Commands(pwm_commands, led_commands)
 
     def finish(self, context: Context):
+        self.guard.close()
+        context.info(f"Latency report:\n{self.tracer.to_json()}")
+        context.info(f"Deadline report: {self.guard.report()}")
         context.info("finish()")
 
 
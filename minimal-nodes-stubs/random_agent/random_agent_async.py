@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+
+import numpy as np
+
+from aido_schemas import (
+    DB20Observations,
+    DB20Commands,
+    EpisodeStart,
+    LEDSCommands,
+    protocol_agent_DB20,
+    PWMCommands,
+    RGB,
+    wrap_async,
+)
+
+
+class RandomAgentAsync:
+    """
+    Same as RandomAgent, with async handlers: "get_commands" is answered
+    with the commands computed for the latest observations, while the
+    following observations are being processed.
+    """
+
+    async def init(self, context):
+        context.info("init()")
+
+    async def on_received_seed(self, data: int):
+        np.random.seed(data)
+
+    async def on_received_episode_start(self, context, data: EpisodeStart):
+        context.info(f'Starting episode "{data.episode_name}".')
+        context.write("commands", self.compute_commands(0.0, 0.0))
+
+    async def on_received_observations(self, context, data: DB20Observations):
+        # inference would go here, e.g. in a thread: await context.run_in_executor(model, image)
+        pwm_left = np.random.uniform(0.5, 1.0)
+        pwm_right = np.random.uniform(0.5, 1.0)
+        context.write("commands", self.compute_commands(pwm_left, pwm_right))
+
+    def compute_commands(self, pwm_left: float, pwm_right: float) -> DB20Commands:
+        grey = RGB(0.0, 0.0, 0.0)
+        led_commands = LEDSCommands(grey, grey, grey, grey, grey)
+        pwm_commands = PWMCommands(motor_left=pwm_left, motor_right=pwm_right)
+        return DB20Commands(pwm_commands, led_commands)
+
+    async def finish(self, context):
+        context.info("finish()")
+
+
+def main():
+    node = RandomAgentAsync()
+    protocol = protocol_agent_DB20
+    wrap_async(node=node, protocol=protocol)
+
+
+if __name__ == "__main__":
+    main()
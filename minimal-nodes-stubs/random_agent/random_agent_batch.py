@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Same as RandomAgent, for many robots at once: the commands of all the
+robots are drawn in one call, as a node for protocol_multi_agent_DB20.
+"""
+import numpy as np
+
+from aido_schemas import (
+    BatchAgent,
+    BatchAgentAdapter,
+    DB20CommandsBatchArrays,
+    DB20ObservationsBatchArrays,
+    GetCommands,
+    protocol_multi_agent_DB20,
+    wrap_direct,
+)
+
+
+class RandomBatchAgent(BatchAgent):
+    # the frames are not used, so they are not decoded
+    uses_images = False
+
+    def seed(self, seed: int):
+        np.random.seed(seed)
+
+    def get_commands_batch(
+        self, observations: DB20ObservationsBatchArrays, request: GetCommands
+    ) -> DB20CommandsBatchArrays:
+        n = len(observations.robot_names)
+        pwm = np.random.uniform(0.5, 1.0, size=(n, 2))
+        leds = np.zeros((n, 5, 3))
+        return DB20CommandsBatchArrays(observations.robot_names, pwm, leds)
+
+
+def main():
+    node = BatchAgentAdapter(RandomBatchAgent()).host()
+    protocol = protocol_multi_agent_DB20
+    wrap_direct(node=node, protocol=protocol)
+
+
+if __name__ == "__main__":
+    main()
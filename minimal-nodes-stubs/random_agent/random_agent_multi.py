@@ -0,0 +1,22 @@
+#!/usr/bin/env python3
+"""
+Runs a RandomAgent for each robot, all in one process, as a single node
+for protocol_multi_agent_DB20.
+
+Each RandomAgent has its own DeadlineGuard, so that the last commands are
+kept per robot: this costs one thread per robot, started at its first
+"get_commands" and idle while the commands are in time.
+"""
+from aido_schemas import MultiAgentHost, protocol_multi_agent_DB20, wrap_direct
+
+from random_agent import RandomAgent
+
+
+def main():
+    node = MultiAgentHost(lambda robot_name: RandomAgent())
+    protocol = protocol_multi_agent_DB20
+    wrap_direct(node=node, protocol=protocol)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Relays the messages between two nodes connected with pipes or fifos,
+with a bounded queue for the topics carrying images: when the downstream
+node is slower than the upstream one, the oldest images are dropped
+instead of piling up in the pipe.
+
+Reads from AIDONODE_DATA_IN (default stdin) and writes to AIDONODE_DATA_OUT
+(default stdout; "fifo:path" creates a fifo, as for the nodes).
+The counters of received and dropped messages are logged at the end.
+"""
+import argparse
+import json
+import os
+
+import cbor2
+from zuper_commons.logs import ZLogger
+from zuper_ipce.json2cbor import read_cbor_or_json_objects
+
+from aido_schemas import parse_queue_policies, relay
+
+logger = ZLogger("relay")
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--data-in", default=os.environ.get("AIDONODE_DATA_IN", "/dev/stdin"))
+    parser.add_argument("--data-out", default=os.environ.get("AIDONODE_DATA_OUT", "/dev/stdout"))
+    parser.add_argument(
+        "--queues",
+        default="image:keep-latest,observations:keep-latest",
+        help="Comma-separated topic:drop-oldest:maxsize or topic:keep-latest",
+    )
+    parsed = parser.parse_args(args)
+    policies = parse_queue_policies(parsed.queues)
+
+    from zuper_nodes_wrapper.streams import open_for_read, open_for_write
+
+    fi = open_for_read(parsed.data_in)
+    fo = open_for_write(parsed.data_out)
+
+    def write(m: dict):
+        fo.write(cbor2.dumps(m))
+        fo.flush()
+
+    stats = relay(read_cbor_or_json_objects(fi), write, policies)
+    logger.info(f"Relay counters:\n{json.dumps(stats, indent=2)}")
+
+
+if __name__ == "__main__":
+    main()
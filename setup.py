@@ -41,6 +41,8 @@ setup(
         "test": tests_require,
     },
     entry_points={
-        "console_scripts": [],
+        "console_scripts": [
+            "aido-protocols-precompile=aido_schemas.automata:precompile_main",
+        ],
     },
 )
@@ -8,9 +8,58 @@ import os
 path = os.path.dirname(os.path.dirname(__file__))
 logger.debug(f"aido-protocols version {__version__} path {path}")
 
-from .protocols import *
-from .protocol_agent import *
-from .protocol_simulator import *
-from .schemas import *
-from .basics import *
-from .misc import *
+# The protocols (and zuper_nodes, zuper_nodes_wrapper) are only loaded when first accessed.
+from .lazy import import_public, public_names
+from . import (
+    protocols,
+    protocol_agent,
+    protocol_simulator,
+    schemas,
+    basics,
+    misc,
+    images,
+    state_arrays,
+    state_delta,
+    map_cache,
+    tracing,
+    automata,
+    validation,
+    slotted,
+    packed,
+    memo,
+    frame_pool,
+    backpressure,
+    pipeline,
+    async_node,
+    deadline,
+    multi_agent,
+    batch_agent,
+)
+
+_modules = [
+    protocols,
+    protocol_agent,
+    protocol_simulator,
+    schemas,
+    basics,
+    misc,
+    images,
+    state_arrays,
+    state_delta,
+    map_cache,
+    tracing,
+    automata,
+    validation,
+    slotted,
+    packed,
+    memo,
+    frame_pool,
+    backpressure,
+    pipeline,
+    async_node,
+    deadline,
+    multi_agent,
+    batch_agent,
+]
+__getattr__ = import_public(globals(), _modules)
+__all__ = public_names(_modules)
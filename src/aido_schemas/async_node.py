@@ -0,0 +1,266 @@
+import asyncio
+import inspect
+import socket
+import threading
+import traceback
+from concurrent.futures import Executor
+from typing import Callable, Dict, Optional, TYPE_CHECKING, TypeVar
+
+from zuper_commons.logs import ZLogger
+
+from .backpressure import IMAGE_TOPICS, KEEP_LATEST, QueuePolicy, TopicQueue
+
+if TYPE_CHECKING:
+    from zuper_nodes import InteractionProtocol
+    from zuper_nodes_wrapper import Context
+
+__all__ = ["AsyncContext", "AsyncNodeAdapter", "wrap_async"]
+
+logger = ZLogger(__name__)
+
+X = TypeVar("X")
+
+
+class AsyncContext:
+    """
+    The context given to the async handlers of a node run by AsyncNodeAdapter.
+
+    Writing a reply topic (e.g. "commands") makes it the latest value,
+    which is sent when the reply is requested (e.g. at the next "get_commands").
+    The other topics are written to the context of the node wrapper.
+    """
+
+    def __init__(self, adapter: "AsyncNodeAdapter", generation: int):
+        self.adapter = adapter
+        self.generation = generation
+
+    def write(self, topic: str, data: object, timing=None, with_schema: bool = False):
+        if topic in self.adapter.replies.values():
+            self.adapter._set_latest(topic, data, self.generation)
+        else:
+            self.adapter._forward(topic, data, timing, with_schema)
+
+    async def run_in_executor(self, f: Callable[..., X], *args) -> X:
+        """Runs a CPU-heavy function in the executor of the adapter (by default, a thread)."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.adapter.executor, f, *args)
+
+    def log(self, msg: str):
+        logger.info(msg)
+
+    def info(self, msg: str):
+        logger.info(msg)
+
+    def debug(self, msg: str):
+        logger.debug(msg)
+
+    def warning(self, msg: str):
+        logger.warning(msg)
+
+    def error(self, msg: str):
+        logger.error(msg)
+
+    def get_hostname(self):
+        return self.adapter.hostname
+
+
+class AsyncNodeAdapter:
+    """
+    Lets ``wrap_direct`` run a node whose ``init``, ``finish`` and
+    ``on_received_*`` handlers are coroutines (``async def``).
+
+    The handlers run in order on an event loop in a separate thread, so the
+    wrapper keeps reading the input while the node is busy: the messages of
+    the topics in ``queues`` (by default the observations) wait in a
+    keep-latest queue, so the node always processes the freshest one.
+
+    The requests in ``replies`` (by default get_commands -> commands) are
+    answered right away with the latest value that the node wrote on the
+    reply topic, so the commands for frame N go out while frame N+1 is being
+    processed. Only if nothing was written yet in the episode, the adapter
+    waits for the node to write it, and raises an error if the node is done
+    with its inputs without writing it. The latest value is forgotten at
+    each of the ``reset_topics`` (by default episode_start).
+
+    The messages of the other topics are also handled in order, but the
+    wrapper waits until they are handled, so that what the node writes in
+    response (e.g. the "robot_observations" of a simulator) is written to
+    the wrapper's context before the next message.
+
+    executor: Used by ``AsyncContext.run_in_executor()`` for CPU-heavy work
+        (None: the default thread pool of the event loop).
+    """
+
+    def __init__(
+        self,
+        node: object,
+        protocol: "InteractionProtocol",
+        replies: Optional[Dict[str, str]] = None,
+        queues: Optional[Dict[str, QueuePolicy]] = None,
+        reset_topics=("episode_start",),
+        executor: Optional[Executor] = None,
+    ):
+        self.node = node
+        self.protocol = protocol
+        self.replies = replies if replies is not None else {"get_commands": "commands"}
+        if queues is None:
+            queues = {_: QueuePolicy(KEEP_LATEST) for _ in IMAGE_TOPICS}
+        self.reset_topics = set(reset_topics)
+        self.executor = executor
+        self.hostname = socket.gethostname()
+        if hasattr(node, "config"):
+            self.config = node.config
+
+        self.queue = TopicQueue(queues)
+        self.generation = 0
+        self.latest: Dict[str, object] = {}
+        self.cond = threading.Condition()
+        self.errors = []
+        self.running = False
+        self.outbox = []
+        self.loop = None
+        self.thread = None
+        self.wakeup = None
+
+        for topic in protocol.inputs:
+            setattr(self, f"on_received_{topic}", self._make_handler(topic))
+
+    def _make_handler(self, topic: str):
+        if topic in self.replies:
+
+            def on_reply_request(context: "Context", data=None):
+                self._raise_errors()
+                reply = self.replies[topic]
+                context.write(reply, self._wait_latest(reply))
+
+            return on_reply_request
+
+        def on_received(context: "Context", data=None):
+            self._raise_errors()
+            if topic in self.reset_topics:
+                with self.cond:
+                    self.generation += 1
+                    self.latest.clear()
+            # only the topics with a queue policy are not waited for
+            done = None if topic in self.queue.policies else threading.Event()
+            self.queue.put(topic, (data, self.generation, done))
+            self.loop.call_soon_threadsafe(self.wakeup.set)
+            if done is not None:
+                done.wait()
+                self._raise_errors()
+            self._flush(context)
+
+        return on_received
+
+    def _forward(self, topic: str, data: object, timing, with_schema: bool):
+        with self.cond:
+            self.outbox.append((topic, data, timing, with_schema))
+
+    def _flush(self, context: "Context"):
+        # the wrapper's context is only used from its own thread
+        with self.cond:
+            outbox, self.outbox = self.outbox, []
+        for topic, data, timing, with_schema in outbox:
+            context.write(topic, data, timing=timing, with_schema=with_schema)
+
+    def _set_latest(self, topic: str, data: object, generation: int):
+        with self.cond:
+            if generation == self.generation:
+                self.latest[topic] = data
+                self.cond.notify_all()
+
+    def _idle(self) -> bool:
+        return not self.running and len(self.queue) == 0
+
+    def _wait_latest(self, topic: str) -> object:
+        with self.cond:
+            self.cond.wait_for(lambda: topic in self.latest or self.errors or self._idle())
+            self._raise_errors()
+            if topic not in self.latest:
+                msg = f'The node handled all its inputs without writing "{topic}".'
+                raise Exception(msg)
+            return self.latest[topic]
+
+    def _raise_errors(self):
+        if self.errors:
+            raise Exception("Error in the async node") from self.errors[0]
+
+    async def _dispatch(self):
+        while True:
+            await self.wakeup.wait()
+            self.wakeup.clear()
+            while len(self.queue):
+                with self.cond:
+                    topic, (data, generation, done) = self.queue.get()
+                    self.running = True
+                try:
+                    # after an error, the messages are only consumed
+                    if not self.errors:
+                        await self._call(f"on_received_{topic}", AsyncContext(self, generation), data)
+                except BaseException as e:
+                    logger.error(f"Error while handling {topic!r}:\n{traceback.format_exc()}")
+                    with self.cond:
+                        self.errors.append(e)
+                finally:
+                    with self.cond:
+                        self.running = False
+                        self.cond.notify_all()
+                    self.queue.task_done()
+                    if done is not None:
+                        done.set()
+
+    async def _call(self, fname: str, context: AsyncContext, data: object = None):
+        f = getattr(self.node, fname, None)
+        if f is None:
+            return
+        params = inspect.signature(f).parameters
+        kwargs = {k: v for k, v in {"context": context, "data": data}.items() if k in params}
+        res = f(**kwargs)
+        if inspect.isawaitable(res):
+            await res
+
+    def init(self, context: "Context"):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name="async-node", daemon=True)
+        self.thread.start()
+        self.wakeup = self._run(_new_event())
+        self._run(self._call("init", AsyncContext(self, self.generation)))
+        self.dispatcher = self._run(_start(self._dispatch()))
+
+    def _run(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    def finish(self, context: "Context"):
+        if self.loop is None:
+            return
+        self.queue.join()
+        self._run(_cancel(self.dispatcher))
+        self._run(self._call("finish", AsyncContext(self, self.generation)))
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+        self._raise_errors()
+
+
+async def _new_event() -> asyncio.Event:
+    # created in the loop that uses it
+    return asyncio.Event()
+
+
+async def _start(coro) -> asyncio.Task:
+    return asyncio.get_running_loop().create_task(coro)
+
+
+async def _cancel(task: asyncio.Task):
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+
+
+def wrap_async(node: object, protocol: "InteractionProtocol", **kwargs):
+    """Like wrap_direct() for a node with async handlers; the arguments are those of AsyncNodeAdapter."""
+    from .basics import wrap_direct
+
+    wrap_direct(node=AsyncNodeAdapter(node, protocol, **kwargs), protocol=protocol)
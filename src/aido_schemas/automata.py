@@ -0,0 +1,254 @@
+import hashlib
+import json
+import os
+import threading
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, List, Optional, Set, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from zuper_nodes import InteractionProtocol, Language
+    from zuper_nodes.language_recognize import Result
+
+__all__ = [
+    "ProtocolAutomaton",
+    "AutomatonChecker",
+    "compile_language",
+    "automaton_for_protocol",
+    "precompile_protocols",
+]
+
+ENV_AUTOMATA_CACHE = "AIDO_AUTOMATA_CACHE"
+""" Directory for the compiled automata. Set to the empty string to disable the disk cache. """
+
+FORMAT_VERSION = 1
+
+# An input or output event: ("in", channel) or ("out", channel).
+Symbol = Tuple[str, str]
+
+IN = "in"
+OUT = "out"
+
+
+@dataclass
+class ProtocolAutomaton:
+    """
+    Deterministic automaton equivalent to a protocol language
+    (same answers as zuper_nodes' LanguageChecker).
+
+    State 0 is the initial state. ``transitions[s]`` maps each symbol
+    allowed in state ``s`` to the next state; a missing symbol means that
+    the event is unexpected. ``accepting[s]`` says whether the sequence
+    seen so far is complete.
+    """
+
+    language: str
+    transitions: List[Dict[Symbol, int]]
+    accepting: List[bool]
+
+    @property
+    def nstates(self) -> int:
+        return len(self.transitions)
+
+    def to_json(self) -> dict:
+        return {
+            "format": FORMAT_VERSION,
+            "language": self.language,
+            "transitions": [sorted([k, c, t] for (k, c), t in tr.items()) for tr in self.transitions],
+            "accepting": self.accepting,
+        }
+
+    @classmethod
+    def from_json(cls, d: dict) -> "ProtocolAutomaton":
+        if d.get("format") != FORMAT_VERSION:
+            raise ValueError(f"Unknown format {d.get('format')!r}")
+        transitions = [{(k, c): t for k, c, t in tr} for tr in d["transitions"]]
+        return cls(language=d["language"], transitions=transitions, accepting=list(d["accepting"]))
+
+
+class AutomatonChecker:
+    """
+    Drop-in replacement for LanguageChecker: ``push()`` and ``finish()``
+    return Enough, NeedMore or Unexpected, but each event costs one
+    dictionary lookup.
+    """
+
+    state: Optional[int]
+
+    def __init__(self, automaton: ProtocolAutomaton):
+        from zuper_nodes import Enough, InputReceived, NeedMore, OutputProduced
+
+        self.automaton = automaton
+        self._kinds = {InputReceived: IN, OutputProduced: OUT}
+        self._results = (NeedMore(), Enough())
+        self.state = 0
+
+    def reset(self):
+        self.state = 0
+
+    def push(self, event) -> "Result":
+        return self.push_symbol(self._kinds[type(event)], event.channel)
+
+    def push_symbol(self, kind: str, channel: str) -> "Result":
+        if self.state is not None:
+            self.state = self.automaton.transitions[self.state].get((kind, channel))
+        return self.finish()
+
+    def finish(self) -> "Result":
+        if self.state is None:
+            from zuper_nodes import Unexpected
+
+            return Unexpected("no active")
+        return self._results[self.automaton.accepting[self.state]]
+
+    def get_expected_events(self) -> Set[Symbol]:
+        if self.state is None:
+            return set()
+        return set(self.automaton.transitions[self.state])
+
+
+def _determinize(language: "Language") -> Tuple[List[Dict[Symbol, int]], List[bool]]:
+    """Subset construction on the NFA used by LanguageChecker."""
+    import networkx as nx
+    from zuper_nodes import ExpectInputReceived
+    from zuper_nodes.language_recognize import ACCEPT, Always, get_nfa, START
+
+    g = nx.MultiDiGraph()
+    get_nfa(g=g, l=language, start_node=START, accept_node=ACCEPT, prefix=())
+
+    always: Dict[object, List[object]] = {}
+    moves: Dict[object, List[Tuple[Symbol, object]]] = {}
+    for a, b, data in g.out_edges(data=True):
+        em = data["event_match"]
+        if isinstance(em, Always):
+            always.setdefault(a, []).append(b)
+        else:
+            kind = IN if isinstance(em, ExpectInputReceived) else OUT
+            moves.setdefault(a, []).append(((kind, em.channel), b))
+
+    def closure(nodes: Set[object]) -> FrozenSet[object]:
+        # Same rule as LanguageChecker._evolve_empty: a node stays active
+        # if it has event edges or no edges at all.
+        active = set(nodes)
+        while True:
+            now_active = set()
+            for n in active:
+                now_active.update(always.get(n, ()))
+                if n in moves or n not in always:
+                    now_active.add(n)
+            if now_active == active:
+                return frozenset(active)
+            active = now_active
+
+    initial = closure({START})
+    index = {initial: 0}
+    sets = [initial]
+    transitions: List[Dict[Symbol, int]] = []
+    accepting: List[bool] = []
+    i = 0
+    while i < len(sets):
+        current = sets[i]
+        targets: Dict[Symbol, Set[object]] = {}
+        for n in current:
+            for symbol, b in moves.get(n, ()):
+                targets.setdefault(symbol, set()).add(b)
+        tr = {}
+        for symbol, nodes in targets.items():
+            s = closure(nodes)
+            if not s:
+                continue
+            if s not in index:
+                index[s] = len(sets)
+                sets.append(s)
+            tr[symbol] = index[s]
+        transitions.append(tr)
+        accepting.append(ACCEPT in current)
+        i += 1
+    return transitions, accepting
+
+
+def _default_cache_dir() -> Optional[str]:
+    d = os.environ.get(ENV_AUTOMATA_CACHE)
+    if d is None:
+        base = os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache"))
+        d = os.path.join(base, "aido-protocols", "automata")
+    return d or None
+
+
+_compiled: Dict[str, ProtocolAutomaton] = {}
+_lock = threading.Lock()
+
+
+def compile_language(language: str, cache_dir: Optional[str] = None) -> ProtocolAutomaton:
+    """
+    Returns the automaton for the language (a string in the protocol syntax,
+    e.g. ``InteractionProtocol.language``).
+
+    The result is kept in memory and in ``cache_dir`` (by default
+    $AIDO_AUTOMATA_CACHE or ~/.cache/aido-protocols/automata), in a file
+    named after the hash of the language, so the language is parsed and
+    compiled only once.
+    """
+    with _lock:
+        if language in _compiled:
+            return _compiled[language]
+
+    if cache_dir is None:
+        cache_dir = _default_cache_dir()
+    key = hashlib.sha256(language.encode("utf-8")).hexdigest()
+    fn = os.path.join(cache_dir, f"{key}.json") if cache_dir else None
+
+    automaton = None
+    if fn is not None and os.path.exists(fn):
+        try:
+            with open(fn) as f:
+                automaton = ProtocolAutomaton.from_json(json.load(f))
+        except (ValueError, KeyError, TypeError):
+            automaton = None
+        else:
+            if automaton.language != language:
+                automaton = None
+
+    if automaton is None:
+        from zuper_nodes import parse_language
+
+        transitions, accepting = _determinize(parse_language(language))
+        automaton = ProtocolAutomaton(language=language, transitions=transitions, accepting=accepting)
+        if fn is not None:
+            _write_atomic(fn, json.dumps(automaton.to_json()))
+
+    with _lock:
+        return _compiled.setdefault(language, automaton)
+
+
+def _write_atomic(fn: str, data: str):
+    try:
+        os.makedirs(os.path.dirname(fn), exist_ok=True)
+        tmp = f"{fn}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            f.write(data)
+        os.replace(tmp, fn)
+    except OSError:
+        # the cache is an optimization only (e.g. read-only file system)
+        pass
+
+
+def automaton_for_protocol(
+    protocol: "InteractionProtocol", cache_dir: Optional[str] = None
+) -> ProtocolAutomaton:
+    return compile_language(protocol.language, cache_dir=cache_dir)
+
+
+def precompile_protocols(cache_dir: Optional[str] = None) -> Dict[str, ProtocolAutomaton]:
+    """Compiles all the protocols in aido_schemas; meant to be run when building a container."""
+    import aido_schemas
+
+    res = {}
+    for name in aido_schemas.__all__:
+        if name.startswith("protocol_"):
+            res[name] = automaton_for_protocol(getattr(aido_schemas, name), cache_dir=cache_dir)
+    return res
+
+
+def precompile_main():
+    for name, automaton in precompile_protocols().items():
+        print(f"{name}: {automaton.nstates} states")
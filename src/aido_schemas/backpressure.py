@@ -0,0 +1,182 @@
+import threading
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, Dict, Iterable, Optional, Tuple
+
+__all__ = [
+    "DROP_OLDEST",
+    "KEEP_LATEST",
+    "IMAGE_TOPICS",
+    "QueuePolicy",
+    "parse_queue_policies",
+    "TopicQueue",
+    "QueueClosed",
+    "relay",
+]
+
+DROP_OLDEST = "drop-oldest"
+""" When the queue has ``maxsize`` messages of the topic, the oldest one is dropped. """
+KEEP_LATEST = "keep-latest"
+""" Only the latest message of the topic is kept (same as DROP_OLDEST with maxsize 1). """
+
+IMAGE_TOPICS = ("image", "observations")
+""" The topics carrying images, for which a bounded queue makes sense. """
+
+
+@dataclass
+class QueuePolicy:
+    kind: str = DROP_OLDEST
+    maxsize: int = 1
+
+    def __post_init__(self):
+        if self.kind not in (DROP_OLDEST, KEEP_LATEST):
+            raise ValueError(f"Unknown queue policy {self.kind!r}")
+        if self.kind == KEEP_LATEST:
+            self.maxsize = 1
+        if self.maxsize < 1:
+            raise ValueError(f"Invalid maxsize {self.maxsize}")
+
+
+def parse_queue_policies(s: str) -> Dict[str, QueuePolicy]:
+    """
+    Parses a comma-separated list of ``topic:kind[:maxsize]``, for example
+    ``image:drop-oldest:4,observations:keep-latest``.
+    """
+    res = {}
+    for part in s.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        tokens = part.split(":")
+        if len(tokens) not in (2, 3):
+            raise ValueError(f"Invalid queue policy {part!r}; expected topic:kind[:maxsize]")
+        maxsize = int(tokens[2]) if len(tokens) == 3 else 1
+        res[tokens[0]] = QueuePolicy(tokens[1], maxsize)
+    return res
+
+
+class QueueClosed(Exception):
+    """Raised by TopicQueue.get() when the queue is closed and empty."""
+
+
+class TopicQueue:
+    """
+    A FIFO queue of messages (topic, item) between a producer and a slower
+    consumer, in which the topics with a policy are bounded: when too many
+    messages of such a topic are waiting, the oldest ones are dropped, so
+    the consumer always gets the freshest data. The other topics (e.g. the
+    episode start) are never dropped, and the order of the messages is kept.
+
+    Thread-safe. ``get()`` blocks until a message is available.
+    """
+
+    items: Deque[Tuple[Optional[str], object]]
+    queued: Dict[Optional[str], int]
+    received: Dict[Optional[str], int]
+    dropped: Dict[Optional[str], int]
+
+    def __init__(self, policies: Dict[str, QueuePolicy]):
+        self.policies = policies
+        self.items = deque()
+        self.queued = {}
+        self.received = {}
+        self.dropped = {}
+        self.unfinished = 0
+        self.closed = False
+        self.cond = threading.Condition()
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def put(self, topic: Optional[str], item: object):
+        with self.cond:
+            if self.closed:
+                raise QueueClosed()
+            self.received[topic] = self.received.get(topic, 0) + 1
+            policy = self.policies.get(topic)
+            if policy is not None and self.queued.get(topic, 0) >= policy.maxsize:
+                self._drop_oldest(topic)
+            self.items.append((topic, item))
+            self.queued[topic] = self.queued.get(topic, 0) + 1
+            self.unfinished += 1
+            self.cond.notify_all()
+
+    def _drop_oldest(self, topic: Optional[str]):
+        for i, (t, _) in enumerate(self.items):
+            if t == topic:
+                del self.items[i]
+                break
+        self.queued[topic] -= 1
+        self.dropped[topic] = self.dropped.get(topic, 0) + 1
+        self.unfinished -= 1
+
+    def get(self, timeout: Optional[float] = None) -> Tuple[Optional[str], object]:
+        """Raises QueueClosed, or TimeoutError if nothing arrived within ``timeout``."""
+        with self.cond:
+            if not self.cond.wait_for(lambda: self.items or self.closed, timeout):
+                raise TimeoutError()
+            if not self.items:
+                raise QueueClosed()
+            topic, item = self.items.popleft()
+            self.queued[topic] -= 1
+            return topic, item
+
+    def task_done(self):
+        """To call after processing a message returned by get()."""
+        with self.cond:
+            self.unfinished -= 1
+            self.cond.notify_all()
+
+    def join(self):
+        """Waits until all the messages put have been processed (or dropped)."""
+        with self.cond:
+            self.cond.wait_for(lambda: self.unfinished == 0)
+
+    def close(self):
+        """After this, put() fails and get() fails once the queue is empty."""
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+
+    def stats(self) -> Dict[str, dict]:
+        with self.cond:
+            return {
+                str(topic): {"received": n, "dropped": self.dropped.get(topic, 0)}
+                for topic, n in sorted(self.received.items(), key=lambda _: str(_[0]))
+            }
+
+
+def relay(messages: Iterable[dict], write, policies: Dict[str, QueuePolicy]) -> Dict[str, dict]:
+    """
+    Copies the wire messages (e.g. read from a fifo) to ``write`` through a TopicQueue:
+    the messages are read by a separate thread as fast as they arrive, and
+    the ones that the consumer is too slow to take are dropped according to the policies.
+
+    Returns the counters of TopicQueue.stats() once all the messages have been written.
+    """
+    queue = TopicQueue(policies)
+    errors = []
+
+    def read():
+        try:
+            for m in messages:
+                # control messages have no topic
+                queue.put(m.get("topic", "(control)"), m)
+        except BaseException as e:
+            errors.append(e)
+        finally:
+            queue.close()
+
+    reader = threading.Thread(target=read, name="relay-reader", daemon=True)
+    reader.start()
+    while True:
+        try:
+            _, m = queue.get()
+        except QueueClosed:
+            break
+        write(m)
+        queue.task_done()
+    reader.join()
+    if errors:
+        raise errors[0]
+    return queue.stats()
@@ -1,5 +1,29 @@
-# noinspection PyUnresolvedReferences
-from zuper_nodes import InteractionProtocol, particularize, particularize_no_check
+from typing import TYPE_CHECKING
 
-# noinspection PyUnresolvedReferences
-from zuper_nodes_wrapper import wrap_direct, Context
+if TYPE_CHECKING:
+    # noinspection PyUnresolvedReferences
+    from zuper_nodes import InteractionProtocol, particularize, particularize_no_check
+
+    # noinspection PyUnresolvedReferences
+    from zuper_nodes_wrapper import wrap_direct, Context
+
+__all__ = ["InteractionProtocol", "particularize", "particularize_no_check", "wrap_direct", "Context"]
+
+# zuper_nodes and zuper_nodes_wrapper are imported on first use.
+_sources = {
+    "InteractionProtocol": "zuper_nodes",
+    "particularize": "zuper_nodes",
+    "particularize_no_check": "zuper_nodes",
+    "wrap_direct": "zuper_nodes_wrapper",
+    "Context": "zuper_nodes_wrapper",
+}
+
+
+def __getattr__(name: str):
+    if name not in _sources:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    import importlib
+
+    value = getattr(importlib.import_module(_sources[name]), name)
+    globals()[name] = value
+    return value
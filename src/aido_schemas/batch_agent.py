@@ -0,0 +1,255 @@
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, List, Mapping, Optional, TYPE_CHECKING, Union
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from dataclasses import dataclass
+else:
+    from zuper_typing import dataclass
+
+from .images import array_from_raw_image, raw_image_from_array
+from .multi_agent import MultiAgentHost
+from .protocol_agent import EpisodeStart, GetCommands
+from .protocol_simulator import JPGImage, RawImage, RobotName
+from .schemas import (
+    DB20Commands,
+    DB20Observations,
+    DB20ObservationsRaw,
+    DB20Odometry,
+    LEDSCommands,
+    PWMCommands,
+    RGB,
+)
+from .state_arrays import LED_NAMES
+
+__all__ = [
+    "DB20ObservationsBatchArrays",
+    "DB20CommandsBatchArrays",
+    "observations_batch_from_observations",
+    "observations_from_observations_batch",
+    "commands_batch_from_commands",
+    "commands_from_commands_batch",
+    "BatchAgent",
+    "BatchAgentAdapter",
+]
+
+DecodeJPG = Callable[[bytes], np.ndarray]
+""" Decodes a JPG into an (H, W, 3) RGB uint8 array. """
+EncodeJPG = Callable[[np.ndarray], bytes]
+""" Encodes an (H, W, 3) RGB uint8 array as a JPG. """
+
+
+@dataclass
+class DB20ObservationsBatchArrays:
+    """
+    The observations of N robots, with one stacked array per quantity.
+
+    robot_names: The i-th name refers to the i-th entry of the arrays
+    images: (N, H, W, 3) RGB frames (None if they were not decoded)
+    odometry: (N, 3) resolution_rad, axis_left_rad, axis_right_rad
+    """
+
+    robot_names: List[RobotName]
+    images: Optional[np.ndarray]
+    odometry: np.ndarray
+
+
+@dataclass
+class DB20CommandsBatchArrays:
+    """
+    The commands of N robots, with one stacked array per quantity.
+
+    robot_names: The i-th name refers to the i-th entry of the arrays
+    pwm: (N, 2) motor_left, motor_right
+    leds: (N, 5, 3) RGB for center, front_left, front_right, back_left, back_right
+    """
+
+    robot_names: List[RobotName]
+    pwm: np.ndarray
+    leds: np.ndarray
+
+
+def _decode_jpg(jpg_data: bytes) -> np.ndarray:
+    import cv2
+
+    bgr = cv2.imdecode(np.frombuffer(jpg_data, dtype="uint8"), cv2.IMREAD_COLOR)
+    return cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB)
+
+
+def observations_batch_from_observations(
+    observations: Mapping[RobotName, Union[DB20Observations, DB20ObservationsRaw]],
+    decode_jpg: Optional[DecodeJPG] = None,
+    with_images: bool = True,
+) -> DB20ObservationsBatchArrays:
+    """
+    Stacks the observations of many robots. The frames must have the same shape.
+
+    decode_jpg: Used for the JPGImage frames (default: OpenCV, which must be installed).
+        RawImage frames are used as they are.
+    with_images: If False, the frames are not decoded and ``images`` is None.
+    """
+    robot_names = list(observations)
+    obs = [observations[_] for _ in robot_names]
+    odometry = np.array(
+        [(o.odometry.resolution_rad, o.odometry.axis_left_rad, o.odometry.axis_right_rad) for o in obs],
+        dtype="float64",
+    ).reshape((len(obs), 3))
+    images = None
+    if with_images:
+        decode_jpg = decode_jpg or _decode_jpg
+        frames = []
+        for o in obs:
+            if isinstance(o.camera, RawImage):
+                frames.append(array_from_raw_image(o.camera))
+            else:
+                frames.append(decode_jpg(o.camera.jpg_data))
+        images = np.stack(frames) if frames else np.zeros((0, 0, 0, 3), dtype="uint8")
+    return DB20ObservationsBatchArrays(robot_names=robot_names, images=images, odometry=odometry)
+
+
+def observations_from_observations_batch(
+    b: DB20ObservationsBatchArrays, encode_jpg: Optional[EncodeJPG] = None
+) -> Dict[RobotName, Union[DB20Observations, DB20ObservationsRaw]]:
+    """
+    Splits the stacked observations by robot: DB20Observations if ``encode_jpg``
+    is given, otherwise DB20ObservationsRaw (without compression).
+    """
+    if b.images is None:
+        raise ValueError("The batch has no images.")
+    res = {}
+    for i, robot_name in enumerate(b.robot_names):
+        resolution_rad, axis_left_rad, axis_right_rad = (float(_) for _ in b.odometry[i])
+        odometry = DB20Odometry(resolution_rad, axis_left_rad, axis_right_rad)
+        if encode_jpg is not None:
+            res[robot_name] = DB20Observations(JPGImage(encode_jpg(b.images[i])), odometry)
+        else:
+            res[robot_name] = DB20ObservationsRaw(raw_image_from_array(b.images[i]), odometry)
+    return res
+
+
+def commands_batch_from_commands(commands: Mapping[RobotName, DB20Commands]) -> DB20CommandsBatchArrays:
+    robot_names = list(commands)
+    cmds = [commands[_] for _ in robot_names]
+    pwm = np.array([(c.wheels.motor_left, c.wheels.motor_right) for c in cmds], dtype="float64")
+    leds = np.array(
+        [[(rgb.r, rgb.g, rgb.b) for rgb in (getattr(c.LEDS, _) for _ in LED_NAMES)] for c in cmds],
+        dtype="float64",
+    )
+    return DB20CommandsBatchArrays(
+        robot_names=robot_names, pwm=pwm.reshape((len(cmds), 2)), leds=leds.reshape((len(cmds), 5, 3))
+    )
+
+
+def commands_from_commands_batch(b: DB20CommandsBatchArrays) -> Dict[RobotName, DB20Commands]:
+    n = len(b.robot_names)
+    if b.pwm.shape != (n, 2) or b.leds.shape != (n, 5, 3):
+        msg = f"Expected pwm (N, 2) and leds (N, 5, 3) for N = {n}, got {b.pwm.shape} and {b.leds.shape}."
+        raise ValueError(msg)
+    res = {}
+    for i, robot_name in enumerate(b.robot_names):
+        left, right = b.pwm[i]
+        leds = LEDSCommands(*(RGB(float(r), float(g), float(bl)) for r, g, bl in b.leds[i]))
+        res[robot_name] = DB20Commands(PWMCommands(motor_left=float(left), motor_right=float(right)), leds)
+    return res
+
+
+class BatchAgent(ABC):
+    """
+    An agent that computes the commands of many robots at once, e.g. with
+    one batched forward pass of a network. Run it with BatchAgentAdapter.
+
+    uses_images: If False, the frames are not decoded.
+    """
+
+    uses_images: bool = True
+
+    def seed(self, seed: int):
+        """Called once, before the first episode, with the seed of the random number generators."""
+
+    def episode_start(self, robot_name: RobotName, data: EpisodeStart):
+        """Called when an episode starts for a robot (e.g. to reset its state)."""
+
+    @abstractmethod
+    def get_commands_batch(
+        self, observations: DB20ObservationsBatchArrays, request: GetCommands
+    ) -> DB20CommandsBatchArrays:
+        """Returns the commands for the robots in ``observations.robot_names``, in the same order."""
+
+
+class _ObservationsBuffer:
+    """The agent of a robot in MultiAgentHost: keeps its last observations for the BatchAgentAdapter."""
+
+    def __init__(self, adapter: "BatchAgentAdapter", robot_name: RobotName):
+        self.adapter = adapter
+        self.robot_name = robot_name
+        self.last = None
+
+    def init(self):
+        pass
+
+    def on_received_seed(self, data: int):
+        self.adapter.on_seed(data)
+
+    def on_received_episode_start(self, data: EpisodeStart):
+        self.last = None
+        self.adapter.batch_agent.episode_start(self.robot_name, data)
+
+    def on_received_observations(self, data: DB20Observations):
+        self.last = data
+
+    def finish(self):
+        pass
+
+
+class BatchAgentAdapter:
+    """
+    Runs a BatchAgent in a MultiAgentHost: the last observations of the
+    robots are stacked, given to the agent in a single call, and its
+    commands are split again by robot.
+
+    The robots that have not received observations yet in the episode
+    get ``safe_default`` (by default, stopped with the LEDs off).
+
+    decode_jpg: See observations_batch_from_observations().
+    """
+
+    def __init__(
+        self,
+        batch_agent: BatchAgent,
+        decode_jpg: Optional[DecodeJPG] = None,
+        safe_default: Optional[DB20Commands] = None,
+    ):
+        self.batch_agent = batch_agent
+        self.decode_jpg = decode_jpg
+        if safe_default is None:
+            grey = RGB(0.0, 0.0, 0.0)
+            safe_default = DB20Commands(PWMCommands(0.0, 0.0), LEDSCommands(grey, grey, grey, grey, grey))
+        self.safe_default = safe_default
+        self.seeded = False
+
+    def on_seed(self, seed: int):
+        # the seed is given to the buffer of each robot, but to the agent only once
+        if not self.seeded:
+            self.seeded = True
+            self.batch_agent.seed(seed)
+
+    def make_agent(self, robot_name: RobotName) -> _ObservationsBuffer:
+        return _ObservationsBuffer(self, robot_name)
+
+    def host(self, **kwargs) -> MultiAgentHost:
+        """The MultiAgentHost running this agent; the arguments are those of MultiAgentHost."""
+        return MultiAgentHost(self.make_agent, batch=self, **kwargs)
+
+    def __call__(self, agents: Dict[RobotName, _ObservationsBuffer], request: GetCommands):
+        observations = {k: v.last for k, v in agents.items() if v.last is not None}
+        commands = {k: self.safe_default for k in agents if k not in observations}
+        if observations:
+            with_images = self.batch_agent.uses_images
+            b = observations_batch_from_observations(observations, self.decode_jpg, with_images=with_images)
+            res = self.batch_agent.get_commands_batch(b, request)
+            if list(res.robot_names) != b.robot_names:
+                msg = f"Expected the commands for {b.robot_names}, got {res.robot_names}."
+                raise ValueError(msg)
+            commands.update(commands_from_commands_batch(res))
+        return {k: commands[k] for k in agents}
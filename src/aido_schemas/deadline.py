@@ -0,0 +1,119 @@
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Callable, Dict, Generic, Optional, TypeVar
+
+__all__ = ["DeadlineGuard"]
+
+X = TypeVar("X")
+
+
+class DeadlineGuard(Generic[X]):
+    """
+    Answers the requests of an agent (e.g. ``get_commands``) within a deadline.
+
+    ``get(compute, deadline)`` runs ``compute()`` in a background thread and
+    waits for it at most ``deadline`` seconds. If it is late, get() returns
+    the last commands computed (or ``safe_default``, if there are none yet in
+    the episode) and counts a deadline miss; the computation continues, and
+    its result becomes the last commands for the next requests. While it is
+    still running, the following requests do not start a new one.
+
+    safe_default: The commands used before the first ones are computed (e.g. stop).
+    default_deadline: Used when the request has none (None: wait for ``compute``).
+    margin: Seconds subtracted from the deadline, for writing the answer.
+    """
+
+    last: Optional[X]
+    pending: "Optional[Future[X]]"
+
+    def __init__(self, safe_default: X, default_deadline: Optional[float] = None, margin: float = 0.0):
+        self.safe_default = safe_default
+        self.default_deadline = default_deadline
+        self.margin = margin
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="deadline-guard")
+        self.lock = threading.Lock()
+        self.generation = 0
+        self.last = None
+        self.pending = None
+        self.error = None
+        self.requests = 0
+        self.misses = 0
+        self.fallbacks_default = 0
+
+    def start_episode(self):
+        """Forgets the last commands; a computation still running is not used anymore."""
+        with self.lock:
+            self.generation += 1
+            self.last = None
+            self.pending = None
+
+    def get(
+        self, compute: Callable[[], X], deadline: Optional[float] = None, t_received: Optional[float] = None
+    ) -> X:
+        """
+        deadline: Seconds available from ``t_received`` (e.g. ``GetCommands.deadline``).
+        t_received: ``time.perf_counter()`` when the request was received (default: now).
+        """
+        if t_received is None:
+            t_received = time.perf_counter()
+        if deadline is None:
+            deadline = self.default_deadline
+        with self.lock:
+            self._raise_error()
+            self.requests += 1
+            if self.pending is None:
+                self.pending = self.executor.submit(self._run, compute, self.generation)
+            pending = self.pending
+        if deadline is None:
+            timeout = None
+        else:
+            timeout = max(0.0, t_received + deadline - self.margin - time.perf_counter())
+        try:
+            return pending.result(timeout=timeout)
+        except FutureTimeout:
+            pass
+        except Exception:
+            with self.lock:
+                self.error = None
+            raise
+        with self.lock:
+            self.misses += 1
+            if self.last is not None:
+                return self.last
+            self.fallbacks_default += 1
+            return self.safe_default
+
+    def _run(self, compute: Callable[[], X], generation: int) -> X:
+        try:
+            res = compute()
+        except BaseException as e:
+            with self.lock:
+                if generation == self.generation:
+                    self.pending = None
+                    self.error = e
+            raise
+        with self.lock:
+            if generation == self.generation:
+                self.pending = None
+                self.last = res
+        return res
+
+    def _raise_error(self):
+        # the error of a computation that finished after the deadline
+        if self.error is not None:
+            e, self.error = self.error, None
+            raise Exception("Error in the computation of the commands") from e
+
+    def report(self) -> Dict[str, int]:
+        return {
+            "requests": self.requests,
+            "deadline_misses": self.misses,
+            "fallbacks_default": self.fallbacks_default,
+        }
+
+    def close(self):
+        """Waits for the computation still running."""
+        self.executor.shutdown(wait=True)
+        with self.lock:
+            self._raise_error()
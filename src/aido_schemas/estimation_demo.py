@@ -1,20 +1,31 @@
-from .basics import InteractionProtocol
+from typing import TYPE_CHECKING
+
+from .lazy import LazyAttributes, new_protocol
+
+if TYPE_CHECKING:
+    from zuper_nodes import InteractionProtocol
 
 __all__ = ["protocol_simple_predictor"]
 
-protocol_simple_predictor = InteractionProtocol(
-    description="""
+_lazy = LazyAttributes(__name__)
+__getattr__ = _lazy.getattr
+
+
+@_lazy.attribute
+def _make_protocol_simple_predictor() -> "InteractionProtocol":
+    return new_protocol(
+        description="""
 
 An estimator receives a stream of values and must predict the next value.
 
     """.strip(),
-    inputs={"observations": float, "seed": int, "get_prediction": type(None)},
-    outputs={"prediction": float},
-    language="""
+        inputs={"observations": float, "seed": int, "get_prediction": type(None)},
+        outputs={"prediction": float},
+        language="""
             in:seed? ;
         
             (in:observations | 
                 (in:get_prediction ; out:prediction)
              )*
         """,
-)
+    )
@@ -0,0 +1,64 @@
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Generic, List, TypeVar
+
+__all__ = ["FramePool"]
+
+X = TypeVar("X")
+
+
+class FramePool(Generic[X]):
+    """
+    A ring of ``size`` values computed once (e.g. encoded camera frames),
+    which are then served in turn by get() at memory speed.
+
+    make: Creates the i-th value, for i in range(size).
+    nthreads: If 0, all the values are computed in the constructor.
+        Otherwise they are computed in the background by this many threads
+        (useful if ``make`` releases the GIL, as cv2.imencode does), and
+        get() waits for the next value only if it is not ready yet.
+
+    After close(), get() raises ValueError.
+    """
+
+    futures: List["Future[X]"]
+
+    def __init__(self, make: Callable[[int], X], size: int, nthreads: int = 0):
+        if size < 1:
+            raise ValueError(f"Invalid size {size}")
+        self.size = size
+        self.i = 0
+        self.closed = False
+        self.lock = threading.Lock()
+        self.executor = None
+        if nthreads:
+            self.executor = ThreadPoolExecutor(max_workers=nthreads, thread_name_prefix="frame-pool")
+            self.futures = [self.executor.submit(make, i) for i in range(size)]
+            # the threads exit once all the values are computed
+            self.executor.shutdown(wait=False)
+        else:
+            self.futures = []
+            for i in range(size):
+                f = Future()
+                f.set_result(make(i))
+                self.futures.append(f)
+
+    def get(self) -> X:
+        """Returns the next value of the ring."""
+        with self.lock:
+            if self.closed:
+                raise ValueError("The frame pool was closed")
+            f = self.futures[self.i]
+            self.i = (self.i + 1) % self.size
+        return f.result()
+
+    def ready(self) -> int:
+        """Number of values already computed."""
+        return sum(1 for _ in self.futures if _.done())
+
+    def close(self):
+        """Cancels the computation of the values not started yet."""
+        with self.lock:
+            self.closed = True
+        for f in self.futures:
+            f.cancel()
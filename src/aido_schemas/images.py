@@ -0,0 +1,143 @@
+import dataclasses
+from typing import List, Optional, Sequence, Tuple, TYPE_CHECKING
+
+import numpy as np
+
+from .protocol_simulator import (
+    CameraConfiguration,
+    CameraConfigurationRequest,
+    IMAGE_ENCODING_JPG,
+    IMAGE_ENCODING_RAW,
+    ImageEncoding,
+    JPGImage,
+    RawImage,
+    RegionOfInterest,
+)
+
+if TYPE_CHECKING:
+    from zuper_nodes import InteractionProtocol
+
+__all__ = [
+    "raw_image_from_array",
+    "array_from_raw_image",
+    "camera_encodings",
+    "negotiate_camera_configuration",
+    "apply_camera_configuration",
+]
+
+
+def raw_image_from_array(a: np.ndarray, dtype: Optional[str] = None) -> RawImage:
+    """
+    Wraps an array as a :class:`RawImage`, with little-endian data.
+
+    dtype: Converts the data to this type (e.g. "<f4" to halve the size of float64 arrays).
+
+    The only copy is the one needed to obtain the ``bytes`` buffer;
+    non-contiguous arrays are made contiguous first.
+    """
+    a = np.asarray(a)
+    dt = np.dtype(dtype) if dtype is not None else a.dtype
+    a = np.ascontiguousarray(a, dtype=dt.newbyteorder("<"))
+    return RawImage(shape=tuple(int(_) for _ in a.shape), dtype=a.dtype.str, data=a.tobytes())
+
+
+def array_from_raw_image(image: RawImage) -> np.ndarray:
+    """
+    Returns a read-only view of the image data as an array.
+
+    No copy is made: the array shares memory with ``image.data``.
+    """
+    a = np.frombuffer(image.data, dtype=np.dtype(image.dtype))
+    return a.reshape(image.shape)
+
+
+def _field_type(klass: type, name: str) -> type:
+    if dataclasses.is_dataclass(klass):
+        for f in dataclasses.fields(klass):
+            if f.name == name:
+                return f.type
+    return object
+
+
+def camera_encodings(protocol: "InteractionProtocol") -> List[ImageEncoding]:
+    """
+    The encodings that a simulator speaking the protocol can send, according
+    to the type of the camera in its "robot_observations" (e.g. only JPG for
+    protocol_simulator_DB20, only raw for protocol_simulator_DB20_raw).
+    """
+    observations = _field_type(protocol.outputs["robot_observations"], "observations")
+    camera = _field_type(observations, "camera")
+    res = []
+    for encoding, klass in ((IMAGE_ENCODING_JPG, JPGImage), (IMAGE_ENCODING_RAW, RawImage)):
+        # the camera can be a subclass (e.g. JPGImageWithTimestamp) or Any
+        if isinstance(camera, type) and (issubclass(camera, klass) or issubclass(klass, camera)):
+            res.append(encoding)
+    return res
+
+
+def negotiate_camera_configuration(
+    request: CameraConfigurationRequest,
+    shape: Tuple[int, int],
+    encodings: Sequence[ImageEncoding],
+    default_jpg_quality: int = 95,
+) -> CameraConfiguration:
+    """
+    Returns the configuration that a simulator rendering frames of the given
+    (height, width) would use to satisfy the request.
+
+    The region of interest is clipped to the frame, the resolution is never larger
+    than the region of interest, and unsupported encodings fall back to the first one.
+
+    encodings: The encodings that the simulator can send, see camera_encodings().
+    """
+    if not encodings:
+        raise ValueError("No encodings to choose from.")
+    H, W = shape
+    roi = request.roi
+    if roi is not None:
+        x0 = min(max(roi.x, 0), W - 1)
+        y0 = min(max(roi.y, 0), H - 1)
+        x1 = min(max(roi.x + roi.width, x0 + 1), W)
+        y1 = min(max(roi.y + roi.height, y0 + 1), H)
+        roi = RegionOfInterest(x=x0, y=y0, width=x1 - x0, height=y1 - y0)
+        H, W = roi.height, roi.width
+
+    if request.resolution is None:
+        resolution = (H, W)
+    else:
+        h, w = request.resolution
+        resolution = (min(max(h, 1), H), min(max(w, 1), W))
+
+    encoding = request.encoding if request.encoding in encodings else encodings[0]
+    if encoding == IMAGE_ENCODING_JPG:
+        jpg_quality = default_jpg_quality if request.jpg_quality is None else request.jpg_quality
+        jpg_quality = min(max(jpg_quality, 0), 100)
+    else:
+        jpg_quality = None
+
+    return CameraConfiguration(
+        robot_name=request.robot_name,
+        encoding=encoding,
+        jpg_quality=jpg_quality,
+        resolution=resolution,
+        roi=roi,
+    )
+
+
+def apply_camera_configuration(a: np.ndarray, config: CameraConfiguration) -> np.ndarray:
+    """
+    Crops and downscales a full-resolution frame (H x W x C) according
+    to the configuration, using nearest-neighbor sampling.
+
+    Cropping returns a view; resizing makes one copy of the output size only.
+    """
+    roi = config.roi
+    if roi is not None:
+        a = a[roi.y : roi.y + roi.height, roi.x : roi.x + roi.width]
+    H, W = a.shape[:2]
+    h, w = config.resolution
+    if (h, w) == (H, W):
+        return a
+    rows = (np.arange(h) * H) // h
+    cols = (np.arange(w) * W) // w
+    return a[rows[:, None], cols[None, :]]
@@ -0,0 +1,119 @@
+import sys
+import threading
+from types import ModuleType
+from typing import Callable, Dict, Iterable, List, MutableMapping, TYPE_CHECKING, TypeVar
+
+if TYPE_CHECKING:
+    from zuper_nodes import InteractionProtocol
+
+__all__ = ["LazyAttributes", "import_public", "public_names"]
+
+X = TypeVar("X")
+
+PREFIX = "_make_"
+
+
+class LazyAttributes:
+    """
+    Module attributes that are computed on first access.
+
+    Used for the protocols, which are relatively expensive to create
+    and need zuper_nodes:
+
+        _lazy = LazyAttributes(__name__)
+        __getattr__ = _lazy.getattr
+
+        @_lazy.attribute
+        def _make_protocol_x() -> InteractionProtocol:
+            return new_protocol(...)  # or particularize_protocol(...)
+
+    defines ``protocol_x`` in the module. Once created, the value is
+    stored in the module, so later accesses are plain lookups.
+    """
+
+    builders: Dict[str, Callable[[], object]]
+
+    def __init__(self, module_name: str):
+        self.module_name = module_name
+        self.builders = {}
+        self.lock = threading.RLock()
+
+    def attribute(self, f: Callable[[], X]) -> Callable[[], X]:
+        fname = f.__name__
+        if not fname.startswith(PREFIX):
+            msg = f'Expected a function called "{PREFIX}<name>", got {fname!r}.'
+            raise ValueError(msg)
+        self.builders[fname[len(PREFIX) :]] = f
+        return f
+
+    def getattr(self, name: str) -> object:
+        if name not in self.builders:
+            msg = f"module {self.module_name!r} has no attribute {name!r}"
+            raise AttributeError(msg)
+        module = sys.modules[self.module_name]
+        with self.lock:
+            if name in vars(module):
+                return vars(module)[name]
+            value = self.builders[name]()
+            setattr(module, name, value)
+        return value
+
+
+def new_protocol(**kwargs) -> "InteractionProtocol":
+    """An InteractionProtocol with the given arguments, for the builders of LazyAttributes."""
+    from zuper_nodes import InteractionProtocol
+
+    return InteractionProtocol(**kwargs)
+
+
+def particularize_protocol(base: str, **kwargs) -> "InteractionProtocol":
+    """
+    particularize_no_check() of the protocol of the package called ``base``
+    (created first, if needed), for the builders of LazyAttributes.
+    """
+    import aido_schemas
+    from zuper_nodes import particularize_no_check
+
+    return particularize_no_check(getattr(aido_schemas, base), **kwargs)
+
+
+def import_public(
+    namespace: MutableMapping[str, object], modules: Iterable[ModuleType]
+) -> Callable[[str], object]:
+    """
+    Like ``from module import *`` for each module, except that the names
+    in ``__all__`` that are not created yet (see LazyAttributes) are not
+    resolved.
+
+    Returns a function to use as the package ``__getattr__``, which resolves
+    them on first access.
+    """
+    lazy: Dict[str, ModuleType] = {}
+    for module in modules:
+        defined = vars(module)
+        for name in module.__all__:
+            if name in defined:
+                namespace[name] = defined[name]
+            else:
+                lazy[name] = module
+                # e.g. "protocol_agent" is both a submodule and a protocol:
+                # the package attribute must be the protocol.
+                if isinstance(namespace.get(name), ModuleType):
+                    del namespace[name]
+
+    package_name = namespace["__name__"]
+
+    def package_getattr(name: str) -> object:
+        if name not in lazy:
+            msg = f"module {package_name!r} has no attribute {name!r}"
+            raise AttributeError(msg)
+        value = getattr(lazy[name], name)
+        namespace[name] = value
+        return value
+
+    return package_getattr
+
+
+def public_names(modules: Iterable[ModuleType]) -> List[str]:
+    """The names in the ``__all__`` of the modules, to use as the package ``__all__``."""
+    return [name for module in modules for name in module.__all__]
@@ -0,0 +1,105 @@
+import hashlib
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+__all__ = ["map_digest", "MapCache", "MapCacheMiss", "MapSender"]
+
+
+def map_digest(map_data: str) -> str:
+    """The digest used to refer to a map (see OfferMap)."""
+    return "sha256:" + hashlib.sha256(map_data.encode("utf-8")).hexdigest()
+
+
+class MapCacheMiss(KeyError):
+    """The map was referred to by digest but it is not in the cache."""
+
+
+class MapCache:
+    """
+    Receiver side: a bounded least-recently-used cache of maps by digest.
+
+    A simulator answers ``offer_map`` with ``known=digest in cache``,
+    and calls ``put()`` when it receives the map with ``set_map``.
+    """
+
+    maps: "OrderedDict[str, str]"
+
+    def __init__(self, max_entries: int = 8):
+        if max_entries < 1:
+            raise ValueError(max_entries)
+        self.max_entries = max_entries
+        self.maps = OrderedDict()
+
+    def __contains__(self, digest: str) -> bool:
+        return digest in self.maps
+
+    def __len__(self) -> int:
+        return len(self.maps)
+
+    def put(self, map_data: str) -> str:
+        """Adds the map and returns its digest."""
+        digest = map_digest(map_data)
+        self.maps[digest] = map_data
+        self.maps.move_to_end(digest)
+        while len(self.maps) > self.max_entries:
+            self.maps.popitem(last=False)
+        return digest
+
+    def get(self, digest: str) -> str:
+        """Returns the map, or raises MapCacheMiss."""
+        try:
+            map_data = self.maps[digest]
+        except KeyError:
+            msg = f"Map {digest} is not in the cache; I know {list(self.maps)}."
+            raise MapCacheMiss(msg) from None
+        self.maps.move_to_end(digest)
+        return map_data
+
+    def resolve(self, digest: str, map_data: Optional[str]) -> str:
+        """
+        For messages that carry the digest and, optionally, the map itself:
+        caches the map if present, otherwise looks it up.
+        """
+        if map_data is not None:
+            found = map_digest(map_data)
+            if found != digest:
+                msg = f"The map received has digest {found}, not {digest}."
+                raise ValueError(msg)
+            self.put(map_data)
+            return map_data
+        return self.get(digest)
+
+
+class MapSender:
+    """
+    Sender side, for one-way channels such as observations:
+    the map is included only the first time its digest is sent.
+
+    The sender keeps track of the maps in the MapCache of the receiver,
+    which must have the same ``max_entries`` and must see all the messages
+    in order (through ``resolve()`` only): a map that the receiver has
+    evicted is sent again.
+    """
+
+    sent: "OrderedDict[str, None]"
+
+    def __init__(self, max_entries: int = 8):
+        if max_entries < 1:
+            raise ValueError(max_entries)
+        self.max_entries = max_entries
+        self.sent = OrderedDict()
+
+    def prepare(self, map_data: str) -> Tuple[str, Optional[str]]:
+        """Returns the digest, and the map itself if the receiver does not have it."""
+        digest = map_digest(map_data)
+        # the same updates as MapCache.resolve() on the other side
+        known = digest in self.sent
+        self.sent[digest] = None
+        self.sent.move_to_end(digest)
+        while len(self.sent) > self.max_entries:
+            self.sent.popitem(last=False)
+        return digest, (None if known else map_data)
+
+    def forget(self):
+        """To call if the receiver was restarted."""
+        self.sent.clear()
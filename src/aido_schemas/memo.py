@@ -0,0 +1,82 @@
+import copy
+import dataclasses
+from collections import OrderedDict
+from typing import Dict, Optional, TypeVar
+
+from .slotted import to_slotted
+
+__all__ = ["Interner", "CommandsDeduplicator"]
+
+X = TypeVar("X")
+
+
+def _frozen(ob: object) -> object:
+    """Returns ``ob`` if it cannot be modified, else a frozen copy of it (or None)."""
+    ob = to_slotted(ob)
+    if not dataclasses.is_dataclass(ob) or type(ob).__dataclass_params__.frozen:
+        return ob
+    return None
+
+
+class Interner:
+    """
+    Returns one shared instance for each distinct value, so that repeated
+    values (e.g. the same LEDSCommands at every step) are not kept in
+    many copies and can be compared by identity.
+
+    The schemas (mutable zuper_typing dataclasses) are interned as their frozen
+    slotted variants (see slotted.py), which encode to the same IPCE; the
+    mutable values without one are returned as they are.
+    """
+
+    values: "OrderedDict[object, object]"
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self.values = OrderedDict()
+
+    def intern(self, ob: X) -> X:
+        key = _frozen(ob)
+        if key is None:
+            return ob
+        try:
+            res = self.values[key]
+        except KeyError:
+            self.values[key] = key
+            if len(self.values) > self.max_entries:
+                self.values.popitem(last=False)
+            return key
+        except TypeError:  # not hashable
+            return ob
+        self.values.move_to_end(key)
+        return res
+
+
+class CommandsDeduplicator:
+    """
+    Simulator side: tells whether the commands for a robot are the same
+    as the last ones received, in which case ``set_robot_commands``
+    can be treated as a no-op.
+    """
+
+    last: Dict[str, object]
+
+    def __init__(self):
+        self.last = {}
+        self.unchanged_count = 0
+
+    def unchanged(self, robot_name: str, commands: object) -> bool:
+        # a copy, so that changing the commands in place is noticed
+        current = _frozen(commands)
+        if current is None:
+            current = copy.deepcopy(commands)
+        previous: Optional[object] = self.last.get(robot_name)
+        if previous is not None and previous == current:
+            self.unchanged_count += 1
+            return True
+        self.last[robot_name] = current
+        return False
+
+    def reset(self):
+        """To call at the start of an episode."""
+        self.last.clear()
@@ -1,11 +1,15 @@
-from zuper_nodes_wrapper import Context
-from zuper_nodes_wrapper.constants import ENV_AIDO_REQUIRE_GPU
 import os
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from zuper_nodes_wrapper import Context
 
 __all__ = ["no_hardware_GPU_available"]
 
 
-def should_bail_if_no_hardware_GPU(context: Context) -> bool:
+def should_bail_if_no_hardware_GPU(context: "Context") -> bool:
+    from zuper_nodes_wrapper.constants import ENV_AIDO_REQUIRE_GPU
+
     req = os.environ.get(ENV_AIDO_REQUIRE_GPU, None)
     if req is None:
         return False
@@ -15,7 +19,7 @@ def should_bail_if_no_hardware_GPU(context: Context) -> bool:
         return True
 
 
-def no_hardware_GPU_available(context: Context):
+def no_hardware_GPU_available(context: "Context"):
     if should_bail_if_no_hardware_GPU(context):
         msg = "I need a GPU; bailing."
         context.error(msg)
@@ -0,0 +1,190 @@
+import time
+from typing import Callable, Dict, List, Optional, TYPE_CHECKING
+
+from .lazy import LazyAttributes, new_protocol
+from .pipeline import Pipeline, PipelineStage
+from .protocol_agent import EpisodeStart, GetCommands
+from .protocol_simulator import RobotName
+from .schemas import DB20Commands, DB20RobotObservationsBatch
+
+if TYPE_CHECKING:
+    from dataclasses import dataclass
+    from zuper_nodes import InteractionProtocol
+    from zuper_nodes_wrapper import Context
+else:
+    from zuper_typing import dataclass
+
+__all__ = [
+    "MultiAgentEpisodeStart",
+    "MultiAgentGetCommands",
+    "MultiAgentCommands",
+    "protocol_multi_agent_DB20",
+    "MultiAgentHost",
+]
+
+_lazy = LazyAttributes(__name__)
+__getattr__ = _lazy.getattr
+
+
+@dataclass
+class MultiAgentEpisodeStart:
+    """Start of an episode for the robots in ``robot_names``."""
+
+    episode_name: str
+    robot_names: List[RobotName]
+    yaml_payload: str = "{}"
+
+
+@dataclass
+class MultiAgentGetCommands:
+    """Asks the commands of the robots in ``robot_names``; see GetCommands."""
+
+    at_time: float
+    robot_names: List[RobotName]
+    deadline: Optional[float] = None
+
+
+@dataclass
+class MultiAgentCommands:
+    commands: Dict[RobotName, DB20Commands]
+
+
+@_lazy.attribute
+def _make_protocol_multi_agent_DB20() -> "InteractionProtocol":
+    return new_protocol(
+        description="""
+
+Like protocol_agent_DB20, for many robots at once: the messages say which
+robots they are for.
+
+    """.strip(),
+        inputs={
+            "observations": DB20RobotObservationsBatch,
+            "seed": int,
+            "get_commands": MultiAgentGetCommands,
+            "episode_start": MultiAgentEpisodeStart,
+        },
+        outputs={"commands": MultiAgentCommands},
+        language="""
+            in:seed? ;
+            (   in:episode_start ;
+                (in:observations |
+                    (in:get_commands ; out:commands)
+                 )*
+            )*
+        """,
+    )
+
+
+BatchGetCommands = Callable[[Dict[RobotName, object], GetCommands], Dict[RobotName, DB20Commands]]
+""" Computes the commands of many robots at once, given their agents and the request. """
+
+
+class MultiAgentHost:
+    """
+    Runs an agent (a node for protocol_agent_DB20) for each robot, all in
+    one process, as a single node for protocol_multi_agent_DB20.
+
+    The messages are given to the agent of each robot they are for, which
+    is created with ``make_agent(robot_name)`` at its first episode; the
+    agents share the modules and whatever ``make_agent`` shares between
+    them (e.g. the weights of a model). Each agent is run in a one-stage
+    Pipeline, so what it receives and writes is checked against its protocol.
+
+    The agents answer "get_commands" in turn, and each one is given what is
+    left of the deadline of the request.
+
+    batch: If given, "get_commands" is not passed to the agents; instead
+        ``batch(agents, request)`` computes the commands of all the robots
+        requested in one call (e.g. a batched forward pass), where ``agents``
+        are the agents of those robots.
+    """
+
+    agents: Dict[RobotName, object]
+    pipelines: Dict[RobotName, Pipeline]
+    replies: Dict[RobotName, List[object]]
+
+    def __init__(
+        self,
+        make_agent: Callable[[RobotName], object],
+        batch: Optional[BatchGetCommands] = None,
+        check_types: bool = True,
+    ):
+        self.make_agent = make_agent
+        self.batch = batch
+        self.check_types = check_types
+        self.seed = None
+        self.agents = {}
+        self.pipelines = {}
+        self.replies = {}
+
+    def _get_pipeline(self, robot_name: RobotName) -> Pipeline:
+        pipeline = self.pipelines.get(robot_name)
+        if pipeline is None:
+            from .schemas import protocol_agent_DB20
+
+            agent = self.agents[robot_name] = self.make_agent(robot_name)
+            replies = self.replies[robot_name] = []
+
+            def sink(topic: str, data: object, timing):
+                replies.append(data)
+
+            stage = PipelineStage(robot_name, agent, protocol_agent_DB20)
+            pipeline = self.pipelines[robot_name] = Pipeline([stage], sink, check_types=self.check_types)
+            pipeline.init()
+            if self.seed is not None:
+                pipeline.write("seed", self.seed)
+        return pipeline
+
+    def _get_started(self, robot_name: RobotName) -> Pipeline:
+        pipeline = self.pipelines.get(robot_name)
+        if pipeline is None:
+            msg = f'No episode was started for robot "{robot_name}"; know {sorted(self.pipelines)}.'
+            raise ValueError(msg)
+        return pipeline
+
+    def init(self, context: "Context"):
+        # the agents are created at the first episode of their robot
+        context.info("init()")
+
+    def on_received_seed(self, data: int):
+        self.seed = data
+
+    def on_received_episode_start(self, context: "Context", data: MultiAgentEpisodeStart):
+        context.info(f'Starting episode "{data.episode_name}" for {len(data.robot_names)} robots.')
+        episode_start = EpisodeStart(data.episode_name, data.yaml_payload)
+        for robot_name in data.robot_names:
+            self._get_pipeline(robot_name).write("episode_start", episode_start)
+
+    def on_received_observations(self, data: DB20RobotObservationsBatch):
+        for robot_name, observations in data.observations.items():
+            self._get_started(robot_name).write("observations", observations)
+
+    def on_received_get_commands(self, context: "Context", data: MultiAgentGetCommands):
+        t_received = time.perf_counter()
+        if self.batch is not None:
+            agents = {}
+            for robot_name in data.robot_names:
+                self._get_started(robot_name)
+                agents[robot_name] = self.agents[robot_name]
+            commands = self.batch(agents, GetCommands(data.at_time, deadline=data.deadline))
+        else:
+            commands = {}
+            for robot_name in data.robot_names:
+                pipeline = self._get_started(robot_name)
+                replies = self.replies[robot_name]
+                replies.clear()
+                # the agents are called in turn: each one gets what is left of the budget
+                deadline = data.deadline
+                if deadline is not None:
+                    deadline = max(0.0, deadline - (time.perf_counter() - t_received))
+                pipeline.write("get_commands", GetCommands(data.at_time, deadline=deadline))
+                if len(replies) != 1:
+                    msg = f'The agent of "{robot_name}" wrote {len(replies)} commands instead of 1.'
+                    raise ValueError(msg)
+                commands[robot_name] = replies[0]
+        context.write("commands", MultiAgentCommands(commands))
+
+    def finish(self, context: "Context"):
+        for pipeline in self.pipelines.values():
+            pipeline.finish()
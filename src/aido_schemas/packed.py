@@ -0,0 +1,228 @@
+from typing import Dict, List, Optional, TYPE_CHECKING
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from dataclasses import dataclass
+    from zuper_nodes import InteractionProtocol
+else:
+    from zuper_typing import dataclass
+
+from .images import array_from_raw_image, raw_image_from_array
+from .lazy import LazyAttributes, particularize_protocol
+from .protocol_simulator import (
+    CheckpointSaved,
+    DuckieState,
+    DuckieStateBatch,
+    RawImage,
+    RobotName,
+    RobotState,
+    RobotStateBatch,
+    StateDump,
+    StepObservations,
+)
+from .schemas import (
+    DB20Observations,
+    DTSimDuckieInfo,
+    DTSimRobotInfo,
+    DTSimState,
+    DTSimStateDelta,
+    LEDSCommands,
+    PWMCommands,
+)
+
+__all__ = [
+    "DTSimRobotInfoPacked",
+    "DTSimDuckieInfoPacked",
+    "DTSimStatePacked",
+    "DTSimRobotStatePacked",
+    "DTSimDuckieStatePacked",
+    "DTSimRobotStateBatchPacked",
+    "DTSimDuckieStateBatchPacked",
+    "DTSimStateDumpPacked",
+    "DTSimCheckpointSavedPacked",
+    "DTSimStateDeltaPacked",
+    "DTSimStateDeltaDumpPacked",
+    "DB20StepObservationsPacked",
+    "pack_robot_info",
+    "unpack_robot_info",
+    "pack_duckie_info",
+    "unpack_duckie_info",
+    "pack_sim_state",
+    "unpack_sim_state",
+    "pack_state_delta",
+    "unpack_state_delta",
+    "protocol_simulator_DB20_packed",
+]
+
+_lazy = LazyAttributes(__name__)
+__getattr__ = _lazy.getattr
+
+
+def _pack(a: np.ndarray, float32: bool) -> RawImage:
+    a = np.asarray(a)
+    # float32 halves the size of the floating point arrays, at the cost of precision
+    return raw_image_from_array(a, "<f4" if float32 and a.dtype.kind == "f" else None)
+
+
+@dataclass
+class DTSimRobotInfoPacked:
+    pose: RawImage
+    velocity: RawImage
+    pwm: PWMCommands
+    leds: LEDSCommands
+
+
+@dataclass
+class DTSimDuckieInfoPacked:
+    pose: RawImage
+    velocity: RawImage
+
+
+@dataclass
+class DTSimStatePacked:
+    t_effective: float
+    duckiebots: Dict[str, DTSimRobotInfoPacked]
+    duckies: Dict[str, DTSimDuckieInfoPacked]
+
+
+@dataclass
+class DTSimRobotStatePacked(RobotState):
+    robot_name: RobotName
+    t_effective: float
+    state: DTSimRobotInfoPacked
+
+
+@dataclass
+class DTSimDuckieStatePacked(DuckieState):
+    duckie_name: RobotName
+    t_effective: float
+    state: DTSimDuckieInfoPacked
+
+
+@dataclass
+class DTSimRobotStateBatchPacked(RobotStateBatch):
+    t_effective: float
+    states: Dict[RobotName, DTSimRobotInfoPacked]
+
+
+@dataclass
+class DTSimDuckieStateBatchPacked(DuckieStateBatch):
+    t_effective: float
+    states: Dict[str, DTSimDuckieInfoPacked]
+
+
+@dataclass
+class DTSimStateDumpPacked(StateDump):
+    state: DTSimStatePacked
+
+
+@dataclass
+class DTSimCheckpointSavedPacked(CheckpointSaved):
+    checkpoint_name: str
+    state: DTSimStateDumpPacked
+
+
+@dataclass
+class DTSimStateDeltaPacked:
+    """DTSimStateDelta with the state arrays as packed buffers."""
+
+    version: int
+    base_version: Optional[int]
+    t_effective: float
+    duckiebots: Dict[RobotName, DTSimRobotInfoPacked]
+    duckies: Dict[str, DTSimDuckieInfoPacked]
+    removed_duckiebots: List[RobotName]
+    removed_duckies: List[str]
+    map_data: Optional[str]
+
+
+@dataclass
+class DTSimStateDeltaDumpPacked(StateDump):
+    state: DTSimStateDeltaPacked
+
+
+@dataclass
+class DB20StepObservationsPacked(StepObservations):
+    t_effective: float
+    observations: Dict[RobotName, DB20Observations]
+    state: Optional[DTSimStatePacked] = None
+
+
+def pack_robot_info(r: DTSimRobotInfo, float32: bool = False) -> DTSimRobotInfoPacked:
+    return DTSimRobotInfoPacked(
+        pose=_pack(r.pose, float32), velocity=_pack(r.velocity, float32), pwm=r.pwm, leds=r.leds
+    )
+
+
+def unpack_robot_info(r: DTSimRobotInfoPacked) -> DTSimRobotInfo:
+    pose, velocity = array_from_raw_image(r.pose), array_from_raw_image(r.velocity)
+    return DTSimRobotInfo(pose=pose, velocity=velocity, pwm=r.pwm, leds=r.leds)
+
+
+def pack_duckie_info(d: DTSimDuckieInfo, float32: bool = False) -> DTSimDuckieInfoPacked:
+    return DTSimDuckieInfoPacked(pose=_pack(d.pose, float32), velocity=_pack(d.velocity, float32))
+
+
+def unpack_duckie_info(d: DTSimDuckieInfoPacked) -> DTSimDuckieInfo:
+    return DTSimDuckieInfo(pose=array_from_raw_image(d.pose), velocity=array_from_raw_image(d.velocity))
+
+
+def pack_sim_state(state: DTSimState, float32: bool = False) -> DTSimStatePacked:
+    return DTSimStatePacked(
+        t_effective=state.t_effective,
+        duckiebots={k: pack_robot_info(v, float32) for k, v in state.duckiebots.items()},
+        duckies={k: pack_duckie_info(v, float32) for k, v in state.duckies.items()},
+    )
+
+
+def unpack_sim_state(state: DTSimStatePacked) -> DTSimState:
+    return DTSimState(
+        t_effective=state.t_effective,
+        duckiebots={k: unpack_robot_info(v) for k, v in state.duckiebots.items()},
+        duckies={k: unpack_duckie_info(v) for k, v in state.duckies.items()},
+    )
+
+
+def pack_state_delta(delta: DTSimStateDelta, float32: bool = False) -> DTSimStateDeltaPacked:
+    return DTSimStateDeltaPacked(
+        version=delta.version,
+        base_version=delta.base_version,
+        t_effective=delta.t_effective,
+        duckiebots={k: pack_robot_info(v, float32) for k, v in delta.duckiebots.items()},
+        duckies={k: pack_duckie_info(v, float32) for k, v in delta.duckies.items()},
+        removed_duckiebots=list(delta.removed_duckiebots),
+        removed_duckies=list(delta.removed_duckies),
+        map_data=delta.map_data,
+    )
+
+
+def unpack_state_delta(delta: DTSimStateDeltaPacked) -> DTSimStateDelta:
+    return DTSimStateDelta(
+        version=delta.version,
+        base_version=delta.base_version,
+        t_effective=delta.t_effective,
+        duckiebots={k: unpack_robot_info(v) for k, v in delta.duckiebots.items()},
+        duckies={k: unpack_duckie_info(v) for k, v in delta.duckies.items()},
+        removed_duckiebots=list(delta.removed_duckiebots),
+        removed_duckies=list(delta.removed_duckies),
+        map_data=delta.map_data,
+    )
+
+
+@_lazy.attribute
+def _make_protocol_simulator_DB20_packed() -> "InteractionProtocol":
+    return particularize_protocol(
+        "protocol_simulator_DB20",
+        description="""Particularization for DB20, with the state arrays as packed buffers.""",
+        outputs={
+            "robot_state": DTSimRobotStatePacked,
+            "robot_state_batch": DTSimRobotStateBatchPacked,
+            "duckie_state": DTSimDuckieStatePacked,
+            "duckie_state_batch": DTSimDuckieStateBatchPacked,
+            "state_dump": DTSimStateDumpPacked,
+            "state_delta_dump": DTSimStateDeltaDumpPacked,
+            "checkpoint_saved": DTSimCheckpointSavedPacked,
+            "step_observations": DB20StepObservationsPacked,
+        },
+    )
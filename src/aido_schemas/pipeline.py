@@ -0,0 +1,247 @@
+import socket
+import threading
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple, TYPE_CHECKING
+
+from zuper_commons.logs import ZLogger
+
+from .automata import AutomatonChecker, automaton_for_protocol, IN, OUT
+from .backpressure import QueueClosed, QueuePolicy, TopicQueue
+
+if TYPE_CHECKING:
+    from zuper_nodes import InteractionProtocol, TimingInfo
+
+__all__ = ["PipelineStage", "Pipeline", "InProcessContext", "ProtocolViolation"]
+
+logger = ZLogger(__name__)
+
+Sink = Callable[[str, object, Optional["TimingInfo"]], None]
+""" Receives (topic, data, timing) for the outputs of the pipeline. """
+
+
+class ProtocolViolation(Exception):
+    """A node received or wrote a message that its protocol does not allow at that point."""
+
+
+@dataclass
+class PipelineStage:
+    """
+    A node in a Pipeline.
+
+    translate: Renames the outputs of this node before they are given
+        to the next node (same as AIDONODE_TRANSLATE).
+    """
+
+    name: str
+    node: object
+    protocol: "InteractionProtocol"
+    translate: Dict[str, str] = field(default_factory=dict)
+
+
+class InProcessContext:
+    """
+    The context given to a node run by a Pipeline. It has the methods of
+    zuper_nodes_wrapper's Context; what the node writes is checked against
+    its protocol and passed on as is, without serialization.
+    """
+
+    def __init__(self, stage: PipelineStage, checker: AutomatonChecker, forward: Sink, check_types: bool):
+        self.stage = stage
+        self.checker = checker
+        self.forward = forward
+        self.check_types = check_types
+        self.last_timing = None
+        self.hostname = socket.gethostname()
+        self.logger = logger.getChild(stage.name)
+
+    def write(self, topic: str, data: object, timing: "TimingInfo" = None, with_schema: bool = False):
+        protocol = self.stage.protocol
+        if topic not in protocol.outputs:
+            msg = f'Output channel "{topic}" not found in protocol; know {sorted(protocol.outputs)}.'
+            raise ProtocolViolation(f"{self.stage.name}: {msg}")
+        if self.check_types:
+            _check_type(self.stage.name, topic, data, protocol.outputs[topic])
+        self.checker.push_symbol(OUT, topic)
+        if self.checker.state is None:
+            raise ProtocolViolation(f'{self.stage.name}: unexpected output "{topic}".')
+        self.forward(topic, data, timing if timing is not None else self.last_timing)
+
+    def log(self, msg: str):
+        self.logger.info(msg)
+
+    def info(self, msg: str):
+        self.logger.info(msg)
+
+    def debug(self, msg: str):
+        self.logger.debug(msg)
+
+    def warning(self, msg: str):
+        self.logger.warning(msg)
+
+    def error(self, msg: str):
+        self.logger.error(msg)
+
+    def get_hostname(self):
+        return self.hostname
+
+    def get_profiler(self):
+        from zuper_nodes_wrapper.profiler import fake_profiler
+
+        return fake_profiler
+
+
+def _check_type(node_name: str, topic: str, data: object, klass: object):
+    if isinstance(klass, type) and not isinstance(data, klass):
+        msg = f'{node_name}: expected {klass.__name__} on topic "{topic}", got {type(data).__name__}.'
+        raise ProtocolViolation(msg)
+
+
+class Pipeline:
+    """
+    Runs a chain of nodes in one process: what a node writes on a topic
+    that is an input of the next node is given to it directly, as the same
+    Python object; the other outputs (and the outputs of the last node)
+    go to ``sink``.
+
+    Each hop is checked against the protocols of the two nodes, as the
+    node wrapper does, but nothing is serialized. The nodes share the
+    objects, so they must not modify the data they receive.
+
+    check_types: Check that the data is an instance of the type declared by the protocol.
+    queues: If given, each node after the first one runs in its own thread
+        and receives its inputs through a TopicQueue with these policies
+        (e.g. ``{"image": QueuePolicy(KEEP_LATEST)}``), so that a slow node
+        gets the freshest images rather than a backlog. The outputs that a
+        node does not take go through the same queues, so that the sink
+        gets everything in order; it is called from the thread of the last node.
+    """
+
+    stages: List[PipelineStage]
+    contexts: List[InProcessContext]
+    counts: Dict[Tuple[str, str], int]
+    queues: Dict[int, TopicQueue]
+    threads: List[threading.Thread]
+    errors: List[BaseException]
+
+    def __init__(
+        self,
+        stages: List[PipelineStage],
+        sink: Sink,
+        check_types: bool = True,
+        queues: Optional[Dict[str, QueuePolicy]] = None,
+    ):
+        from zuper_nodes_wrapper.utils import call_if_fun_exists
+
+        self._call = call_if_fun_exists
+        self.stages = list(stages)
+        self.sink = sink
+        self.check_types = check_types
+        self.counts = {}
+        self.queues = {}
+        self.threads = []
+        self.errors = []
+        if queues is not None:
+            for i in range(1, len(self.stages)):
+                self.queues[i] = TopicQueue(queues)
+        self.contexts = []
+        for i, stage in enumerate(self.stages):
+            checker = AutomatonChecker(automaton_for_protocol(stage.protocol))
+            forward = self._forward_function(i)
+            self.contexts.append(InProcessContext(stage, checker, forward, check_types))
+
+    def _forward_function(self, i: int) -> Sink:
+        stage = self.stages[i]
+        following = self.stages[i + 1] if i + 1 < len(self.stages) else None
+
+        def forward(topic: str, data: object, timing: Optional["TimingInfo"]):
+            topic = stage.translate.get(topic, topic)
+            if following is not None and topic in following.protocol.inputs:
+                if i + 1 in self.queues:
+                    self.queues[i + 1].put(topic, (data, timing, False))
+                else:
+                    self._deliver(i + 1, topic, data, timing)
+            else:
+                self._bypass(i + 1, topic, data, timing)
+
+        return forward
+
+    def _bypass(self, i: int, topic: str, data: object, timing: Optional["TimingInfo"]):
+        """Passes on an output that node ``i`` does not take, after what is queued for it."""
+        if i in self.queues:
+            self.queues[i].put(topic, (data, timing, True))
+        else:
+            self.sink(topic, data, timing)
+
+    def _deliver(self, i: int, topic: str, data: object, timing: Optional["TimingInfo"]):
+        stage = self.stages[i]
+        context = self.contexts[i]
+        if topic not in stage.protocol.inputs:
+            msg = f'Input channel "{topic}" not found in protocol; know {sorted(stage.protocol.inputs)}.'
+            raise ProtocolViolation(f"{stage.name}: {msg}")
+        if self.check_types:
+            _check_type(stage.name, topic, data, stage.protocol.inputs[topic])
+        context.checker.push_symbol(IN, topic)
+        if context.checker.state is None:
+            raise ProtocolViolation(f'{stage.name}: unexpected input "{topic}".')
+        key = (stage.name, topic)
+        self.counts[key] = self.counts.get(key, 0) + 1
+        context.last_timing = timing
+        self._call(stage.node, f"on_received_{topic}", data=data, context=context, timing=timing)
+
+    def _work(self, i: int):
+        queue = self.queues[i]
+        while True:
+            try:
+                topic, (data, timing, bypass) = queue.get()
+            except QueueClosed:
+                return
+            try:
+                if self.errors:
+                    pass
+                elif bypass:
+                    self._bypass(i + 1, topic, data, timing)
+                else:
+                    self._deliver(i, topic, data, timing)
+            except BaseException as e:
+                self.errors.append(e)
+            finally:
+                queue.task_done()
+
+    def _raise_errors(self):
+        if self.errors:
+            raise self.errors[0]
+
+    def init(self):
+        for stage, context in zip(self.stages, self.contexts):
+            self._call(stage.node, "init", context=context)
+        for i in sorted(self.queues):
+            t = threading.Thread(
+                target=self._work, args=(i,), name=f"pipeline-{self.stages[i].name}", daemon=True
+            )
+            t.start()
+            self.threads.append(t)
+
+    def write(self, topic: str, data: object = None, timing: "TimingInfo" = None):
+        """Gives a message to the first node."""
+        self._raise_errors()
+        self._deliver(0, topic, data, timing)
+
+    def queue_stats(self) -> Dict[str, Dict[str, dict]]:
+        """Messages received and dropped by the input queue of each node."""
+        return {self.stages[i].name: q.stats() for i, q in sorted(self.queues.items())}
+
+    def finish(self):
+        # the queues are drained in order, as each node writes to the queue of the next one
+        for i in sorted(self.queues):
+            self.queues[i].join()
+            self.queues[i].close()
+        for t in self.threads:
+            t.join()
+        self._raise_errors()
+        for stage, context in zip(self.stages, self.contexts):
+            self._call(stage.node, "finish", context=context)
+            state = context.checker.state
+            if state is None:
+                logger.warning(f"{stage.name}: finished after a protocol violation.")
+            elif not context.checker.automaton.accepting[state]:
+                logger.warning(f"{stage.name}: finished in the middle of an interaction.")
@@ -1,14 +1,18 @@
-from typing import Any, TYPE_CHECKING
+from typing import Any, Optional, TYPE_CHECKING
 
 if TYPE_CHECKING:
     from dataclasses import dataclass
+    from zuper_nodes import InteractionProtocol
 else:
     from zuper_typing import dataclass
 
-from .basics import InteractionProtocol
+from .lazy import LazyAttributes, new_protocol
 
 __all__ = ["EpisodeStart", "protocol_agent", "GetCommands"]
 
+_lazy = LazyAttributes(__name__)
+__getattr__ = _lazy.getattr
+
 
 @dataclass
 class EpisodeStart:
@@ -21,10 +25,14 @@ class EpisodeStart:
 @dataclass
 class GetCommands:
     at_time: float
+    deadline: Optional[float] = None
+    """ Seconds the agent has to answer, from when it receives the request (None: no deadline). """
 
 
-protocol_agent = InteractionProtocol(
-    description="""
+@_lazy.attribute
+def _make_protocol_agent() -> "InteractionProtocol":
+    return new_protocol(
+        description="""
 
 Generic protocol for an agent that receives "observations" and responds 
 with "commands".
@@ -32,14 +40,14 @@ with "commands".
 "episode_start" marks the beginning of an episode.  
 
     """.strip(),
-    inputs={
-        "observations": Any,
-        "seed": int,
-        "get_commands": GetCommands,
-        "episode_start": EpisodeStart,
-    },
-    outputs={"commands": Any},
-    language="""
+        inputs={
+            "observations": Any,
+            "seed": int,
+            "get_commands": GetCommands,
+            "episode_start": EpisodeStart,
+        },
+        outputs={"commands": Any},
+        language="""
             in:seed? ;
             (   in:episode_start ; 
                 (in:observations | 
@@ -47,4 +55,4 @@ with "commands".
                  )* 
             )*
         """,
-)
+    )
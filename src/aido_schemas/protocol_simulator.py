@@ -1,11 +1,13 @@
-from typing import Any, Dict, List, NewType, Optional, TYPE_CHECKING
+from typing import Any, Dict, List, NewType, Optional, Tuple, TYPE_CHECKING
 from zuper_typing import dataclass
 
 if TYPE_CHECKING:
     from dataclasses import dataclass, field
+    from zuper_nodes import InteractionProtocol
 
-from .basics import InteractionProtocol
+from .lazy import LazyAttributes, new_protocol
 from .protocol_agent import EpisodeStart
+from .validation import metric_value
 
 __all__ = [
     "RobotState",
@@ -43,8 +45,32 @@ __all__ = [
     "FriendlyVelocity",
     "JPGImageWithTimestamp",
     "FriendlyPose",
+    "RawImage",
+    "ImageEncoding",
+    "IMAGE_ENCODING_JPG",
+    "IMAGE_ENCODING_RAW",
+    "RegionOfInterest",
+    "CameraConfigurationRequest",
+    "CameraConfiguration",
+    "GetRobotObservationsBatch",
+    "RobotObservationsBatch",
+    "GetRobotStateBatch",
+    "RobotStateBatch",
+    "GetDuckieStateBatch",
+    "DuckieStateBatch",
+    "StepAndObserve",
+    "StepObservations",
+    "DumpStateDelta",
+    "OfferMap",
+    "MapOfferReply",
+    "SaveCheckpoint",
+    "CheckpointSaved",
+    "RestoreCheckpoint",
 ]
 
+_lazy = LazyAttributes(__name__)
+__getattr__ = _lazy.getattr
+
 RobotName = str
 
 
@@ -64,11 +90,100 @@ class JPGImageWithTimestamp(JPGImage):
     timestamp: float
 
 
+@dataclass
+class RawImage:
+    """
+    An uncompressed image; also used for the other arrays sent as raw buffers
+    (see packed.py). See raw_image_from_array() and array_from_raw_image().
+
+    shape: Shape of the array in Numpy conventions (height, width, channels)
+    dtype: Numpy dtype string of the elements, little-endian (e.g. "|u1", "<f8")
+    data: Bytes of the C-contiguous array
+    """
+
+    shape: Tuple[int, ...]
+    dtype: str
+    data: bytes
+
+
+ImageEncoding = NewType("ImageEncoding", str)
+
+IMAGE_ENCODING_JPG = ImageEncoding("jpg")
+""" JPGImage """
+
+IMAGE_ENCODING_RAW = ImageEncoding("raw")
+""" RawImage """
+
+
+@dataclass
+class RegionOfInterest:
+    """
+    A rectangle in pixel coordinates of the full-resolution frame.
+
+    x, y: Top-left corner (column, row)
+    """
+
+    x: int
+    y: int
+    width: int
+    height: int
+
+
+@dataclass
+class CameraConfigurationRequest:
+    """
+    What the agent would like to receive from the camera.
+
+    encoding: One of the IMAGE_ENCODING_* values (an ImageEncoding)
+    jpg_quality: JPG quality (0-100), if the encoding is JPG. None means the simulator's default.
+    resolution: Output (height, width) after cropping. None means no resizing.
+    roi: The region of the frame to keep. None means the whole frame.
+    """
+
+    robot_name: RobotName
+    encoding: str
+    jpg_quality: Optional[int] = None
+    resolution: Optional[Tuple[int, int]] = None
+    roi: Optional[RegionOfInterest] = None
+
+
+@dataclass
+class CameraConfiguration:
+    """
+    The camera configuration that the simulator will use,
+    which might differ from the one requested.
+    """
+
+    robot_name: RobotName
+    encoding: str
+    jpg_quality: Optional[int]
+    resolution: Tuple[int, int]
+    roi: Optional[RegionOfInterest]
+
+
 @dataclass
 class SetMap:
     map_data: Any
 
 
+@dataclass
+class OfferMap:
+    """Offers a map by its digest (see map_digest()), instead of sending it."""
+
+    digest: str
+
+
+@dataclass
+class MapOfferReply:
+    """
+    known: Whether the receiver has the map with this digest.
+        If not, the map must be sent with set_map.
+    """
+
+    digest: str
+    known: bool
+
+
 @dataclass
 class FriendlyPose:
     x: float
@@ -135,6 +250,48 @@ class DuckieState:
     state: Any
 
 
+@dataclass
+class GetRobotObservationsBatch:
+    """Observations for many robots at once. None means all robots."""
+
+    robot_names: Optional[List[RobotName]]
+    t_effective: float
+
+
+@dataclass
+class RobotObservationsBatch:
+    t_effective: float
+    observations: Dict[RobotName, Any]
+
+
+@dataclass
+class GetRobotStateBatch:
+    """State of many robots at once. None means all robots."""
+
+    robot_names: Optional[List[RobotName]]
+    t_effective: float
+
+
+@dataclass
+class RobotStateBatch:
+    t_effective: float
+    states: Dict[RobotName, Any]
+
+
+@dataclass
+class GetDuckieStateBatch:
+    """State of many duckies at once. None means all duckies."""
+
+    duckie_names: Optional[List[str]]
+    t_effective: float
+
+
+@dataclass
+class DuckieStateBatch:
+    t_effective: float
+    states: Dict[str, Any]
+
+
 @dataclass
 class Termination:
     when: float
@@ -165,8 +322,7 @@ class Metric:
     description: str
 
     def __post_init__(self):
-        if isinstance(self.cumulative_value, int):
-            self.cumulative_value = float(self.cumulative_value)
+        self.cumulative_value = metric_value(self.cumulative_value)
 
 
 @dataclass
@@ -202,11 +358,49 @@ class Step:
     until: float
 
 
+@dataclass
+class StepAndObserve:
+    """
+    Sets the commands, steps the simulation and returns the observations,
+    in one exchange.
+
+    commands: Commands for each robot, effective from the current time
+    until: The time until which to step (as in Step)
+    robot_names: Robots for which to return observations. None means all robots.
+    with_state: Whether to also return the simulation state.
+    """
+
+    commands: Dict[RobotName, Any]
+    until: float
+    robot_names: Optional[List[RobotName]] = None
+    with_state: bool = False
+
+
+@dataclass
+class StepObservations:
+    """state is None unless it was requested with ``with_state``."""
+
+    t_effective: float
+    observations: Dict[RobotName, Any]
+    state: Optional[Any] = None
+
+
 @dataclass
 class DumpState:
     pass
 
 
+@dataclass
+class DumpStateDelta:
+    """
+    Asks for the changes to the state since the given version.
+
+    since_version: The last version the client has. None asks for a full keyframe.
+    """
+
+    since_version: Optional[int] = None
+
+
 @dataclass
 class StateDump:
     """Opaque object that contains the simulator's state, whichever it is."""
@@ -214,6 +408,28 @@ class StateDump:
     state: object
 
 
+@dataclass
+class SaveCheckpoint:
+    """Saves the configured world (map, robots, duckies, time) under a name."""
+
+    checkpoint_name: str
+
+
+@dataclass
+class CheckpointSaved:
+    """state: The same as what dump_state would return at this point."""
+
+    checkpoint_name: str
+    state: StateDump
+
+
+@dataclass
+class RestoreCheckpoint:
+    """Restores the world saved with SaveCheckpoint, in place of clear/set_map/spawn_*."""
+
+    checkpoint_name: str
+
+
 ProtocolDesc = NewType("ProtocolDesc", str)
 
 PROTOCOL_NORMAL = ProtocolDesc("PROTOCOL_NORMAL")
@@ -291,7 +507,7 @@ class SpawnDuckie:
     pose: FriendlyPose
 
 
-description = """\
+description_scenario_maker = """\
 
 A "scenario maker" is an object that is able to create robot simulations scenarios.
 
@@ -306,22 +522,27 @@ for the same values of the seed.
 
 """
 
-protocol_scenario_maker = InteractionProtocol(
-    description=description,
-    language="""\
+
+@_lazy.attribute
+def _make_protocol_scenario_maker() -> "InteractionProtocol":
+    return new_protocol(
+        description=description_scenario_maker,
+        language="""\
         in:seed? ;
         (
             in:next_scenario ; 
             (out:finished | out:scenario)
         )*
 """,
-    inputs={
-        # Seed random number generator
-        "seed": int,
-        "next_scenario": type(None),
-    },
-    outputs={"finished": type(None), "scenario": Scenario},
-)
+        inputs={
+            # Seed random number generator
+            "seed": int,
+            "next_scenario": type(None),
+        },
+        outputs={"finished": type(None), "scenario": Scenario},
+    )
+
+
 description = """\
 
 Interface to be implemented by a simulator.
@@ -336,10 +557,29 @@ Resets the simulation data. Need to re-transmit map and robot poses.
 
 Sets the map to use.
 
+`simulator.offer_map(digest)`
+
+Proposes the map by its digest. If the simulator has it cached,
+it replies with `known=True` and there is no need to send `set_map`.
+
 `simulator.spawn_robot(name, configuration)`
 
 Adds a robot to the simulation of the given name.
 
+`simulator.save_checkpoint(name)`
+
+Saves the world as configured so far (map, robots, duckies) under the given name.
+
+`simulator.restore_checkpoint(name)`
+
+Restores a saved world. Can be used instead of the sequence 
+`clear`, `set_map`, `spawn_robot`, `spawn_duckie` to start an episode. 
+
+`simulator.set_camera_configuration(name, request)`
+
+Negotiates the encoding, resolution and region of interest of the camera
+of the given robot. The simulator answers with the configuration it will use.
+
 `simulator.episode_start`
 
 `simulator.step(until: timestamp)`
@@ -362,6 +602,25 @@ Asks for the dump of a robot observation.
 Asks for the dump of a robot state.
 
 
+`simulator.get_robot_observations_batch(names, t: timestamp)`
+`simulator.get_robot_state_batch(names, t: timestamp)`
+`simulator.get_duckie_state_batch(names, t: timestamp)`
+
+Same as above, for many robots/duckies in a single message.
+
+
+`simulator.step_and_observe(commands, until: timestamp, names)`
+
+Equivalent to `set_robot_commands` for each robot, `step`, and 
+`get_robot_observations` for each robot (optionally followed by 
+`dump_state`), in a single exchange.
+
+
+`simulator.dump_state_delta(since_version)`
+
+Like `dump_state`, but only sends what changed since the given version.
+
+
 `seed(int)`
 
 Sets seed for random process.
@@ -369,70 +628,108 @@ Sets seed for random process.
 
     """
 
-protocol_simulator = InteractionProtocol(
-    description=description,
-    language="""\
+
+@_lazy.attribute
+def _make_protocol_simulator() -> "InteractionProtocol":
+    return new_protocol(
+        description=description,
+        language="""\
         
         in:seed? ;
             (
-            in:clear ; 
-            in:set_map ;
-            (in:spawn_robot|in:spawn_duckie)*;
+            (
+                (
+                    in:clear ; 
+                    (in:set_map | (in:offer_map ; out:map_offer_reply ; in:set_map?)) ;
+                    (in:spawn_robot|in:spawn_duckie)*
+                ) |
+                in:restore_checkpoint
+            ) ;
             
-            (in:get_robot_interface_description; out:robot_interface_description)*;
+            (in:save_checkpoint ; out:checkpoint_saved)? ;
+            
+            (
+                (in:get_robot_interface_description; out:robot_interface_description) |
+                (in:set_camera_configuration; out:camera_configuration)
+            )*;
             
             in:episode_start;
                 
                 (
                     in:step |
                     in:set_robot_commands |
+                    (in:step_and_observe ;  out:step_observations) |
                     (in:get_robot_observations ;  out:robot_observations) |
+                    (in:get_robot_observations_batch ;  out:robot_observations_batch) |
                     (in:get_robot_performance ;  out:robot_performance) |
                     (in:get_robot_state ;  out:robot_state) |
                     (in:get_duckie_state ;  out:duckie_state) |
+                    (in:get_robot_state_batch ;  out:robot_state_batch) |
+                    (in:get_duckie_state_batch ;  out:duckie_state_batch) |
                     (in:get_sim_state ;  out:sim_state) |
                     (in:dump_state   ;  out:state_dump) |
+                    (in:dump_state_delta   ;  out:state_delta_dump) |
                     (in:get_ui_image ; out:ui_image) 
                 )* 
         )*
 """,
-    inputs={
-        # Seed random number generator
-        "seed": int,
-        "clear": type(None),
-        "set_map": SetMap,
-        "spawn_robot": SpawnRobot,
-        "spawn_duckie": SpawnDuckie,
-        "get_robot_interface_description": RobotName,
-        "get_robot_performance": RobotName,
-        "get_sim_state": type(None),
-        "episode_start": EpisodeStart,
-        # Step physics
-        "step": Step,
-        "set_robot_commands": SetRobotCommands,
-        "get_robot_observations": GetRobotObservations,
-        "get_robot_state": GetRobotState,
-        "get_duckie_state": GetDuckieState,
-        "get_ui_image": type(None),
-        # Dump state information
-        "dump_state": DumpState,
-    },
-    outputs={
-        "robot_observations": RobotObservations,
-        "robot_state": RobotState,
-        "duckie_state": DuckieState,
-        "robot_performance": RobotPerformance,
-        "robot_interface_description": RobotInterfaceDescription,
-        "sim_state": SimulationState,
-        "state_dump": StateDump,
-        "ui_image": JPGImage,
-    },
-)
-
-# XXX this is not implemented yet
-protocol_scorer = InteractionProtocol(
-    description="""Protocol for scorer""",
-    language="""\
+        inputs={
+            # Seed random number generator
+            "seed": int,
+            "clear": type(None),
+            "set_map": SetMap,
+            "offer_map": OfferMap,
+            "spawn_robot": SpawnRobot,
+            "spawn_duckie": SpawnDuckie,
+            "save_checkpoint": SaveCheckpoint,
+            "restore_checkpoint": RestoreCheckpoint,
+            "get_robot_interface_description": RobotName,
+            "set_camera_configuration": CameraConfigurationRequest,
+            "get_robot_performance": RobotName,
+            "get_sim_state": type(None),
+            "episode_start": EpisodeStart,
+            # Step physics
+            "step": Step,
+            "set_robot_commands": SetRobotCommands,
+            "step_and_observe": StepAndObserve,
+            "get_robot_observations": GetRobotObservations,
+            "get_robot_state": GetRobotState,
+            "get_duckie_state": GetDuckieState,
+            "get_robot_observations_batch": GetRobotObservationsBatch,
+            "get_robot_state_batch": GetRobotStateBatch,
+            "get_duckie_state_batch": GetDuckieStateBatch,
+            "get_ui_image": type(None),
+            # Dump state information
+            "dump_state": DumpState,
+            "dump_state_delta": DumpStateDelta,
+        },
+        outputs={
+            "robot_observations": RobotObservations,
+            "robot_state": RobotState,
+            "duckie_state": DuckieState,
+            "robot_observations_batch": RobotObservationsBatch,
+            "step_observations": StepObservations,
+            "robot_state_batch": RobotStateBatch,
+            "duckie_state_batch": DuckieStateBatch,
+            "robot_performance": RobotPerformance,
+            "robot_interface_description": RobotInterfaceDescription,
+            "map_offer_reply": MapOfferReply,
+            "checkpoint_saved": CheckpointSaved,
+            "camera_configuration": CameraConfiguration,
+            "sim_state": SimulationState,
+            "state_dump": StateDump,
+            "state_delta_dump": StateDump,
+            "ui_image": JPGImage,
+        },
+    )
+
+
+@_lazy.attribute
+def _make_protocol_scorer() -> "InteractionProtocol":
+    # XXX this is not implemented yet
+    return new_protocol(
+        description="""Protocol for scorer""",
+        language="""\
             in:set_map ;
             (
                 in:episode_start;
@@ -443,12 +740,12 @@ protocol_scorer = InteractionProtocol(
                 )*
             )*
 """,
-    inputs={
-        "set_map": SetMap,
-        "episode_start": EpisodeStart,
-        "set_robot_state": RobotState,
-        "set_sim_state": SimulationState,
-        "get_robot_performance": RobotName,
-    },
-    outputs={"robot_performance": RobotPerformance},
-)
+        inputs={
+            "set_map": SetMap,
+            "episode_start": EpisodeStart,
+            "set_robot_state": RobotState,
+            "set_sim_state": SimulationState,
+            "get_robot_performance": RobotName,
+        },
+        outputs={"robot_performance": RobotPerformance},
+    )
@@ -1,34 +1,48 @@
-from .basics import InteractionProtocol
+from typing import TYPE_CHECKING
+
+from .lazy import LazyAttributes, new_protocol
 from .protocol_agent import EpisodeStart
 from .protocol_simulator import JPGImage
 
+if TYPE_CHECKING:
+    from zuper_nodes import InteractionProtocol
+
 __all__ = ["protocol_image_filter", "protocol_image_source"]
 
-protocol_image_filter = InteractionProtocol(
-    description="""An image filter. Takes an image, returns an image.""",
-    inputs={"image": JPGImage, "episode_start": EpisodeStart},
-    outputs={"image": JPGImage, "episode_start": EpisodeStart},
-    language="""
+_lazy = LazyAttributes(__name__)
+__getattr__ = _lazy.getattr
+
+
+@_lazy.attribute
+def _make_protocol_image_filter() -> "InteractionProtocol":
+    return new_protocol(
+        description="""An image filter. Takes an image, returns an image.""",
+        inputs={"image": JPGImage, "episode_start": EpisodeStart},
+        outputs={"image": JPGImage, "episode_start": EpisodeStart},
+        language="""
         (in:episode_start ; out:episode_start ; (in:image ; out:image)*)*
         """,
-)
+    )
+
 
-protocol_image_source = InteractionProtocol(
-    description="""
+@_lazy.attribute
+def _make_protocol_image_source() -> "InteractionProtocol":
+    return new_protocol(
+        description="""
 
 An abstraction over logs of images. 
 
 It emits a series of EpisodeStart followed by a set of images.
 
     """,
-    inputs={"next_image": type(None), "next_episode": type(None)},
-    outputs={
-        "image": JPGImage,
-        "episode_start": EpisodeStart,
-        "no_more_images": type(None),
-        "no_more_episodes": type(None),
-    },
-    language="""
+        inputs={"next_image": type(None), "next_episode": type(None)},
+        outputs={
+            "image": JPGImage,
+            "episode_start": EpisodeStart,
+            "no_more_images": type(None),
+            "no_more_episodes": type(None),
+        },
+        language="""
                 (
                     in:next_episode ; (
                         out:no_more_episodes | 
@@ -37,4 +51,4 @@ It emits a series of EpisodeStart followed by a set of images.
                     )
                 )*            
             """,
-)
+    )
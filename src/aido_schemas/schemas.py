@@ -1,26 +1,32 @@
-from typing import Dict, TYPE_CHECKING
+from typing import Dict, List, Optional, TYPE_CHECKING
 
 import numpy as np
 
-from zuper_nodes import particularize_no_check
-
 if TYPE_CHECKING:
     from dataclasses import dataclass
+    from zuper_nodes import InteractionProtocol
 else:
     from zuper_typing import dataclass
 
-from .protocol_agent import protocol_agent
+from .lazy import LazyAttributes, particularize_protocol
 from .protocol_simulator import (
+    CheckpointSaved,
     DuckieState,
+    DuckieStateBatch,
     JPGImage,
     JPGImageWithTimestamp,
-    protocol_simulator,
+    RawImage,
     RobotName,
     RobotObservations,
+    RobotObservationsBatch,
     RobotState,
+    RobotStateBatch,
     SetRobotCommands,
     StateDump,
+    StepAndObserve,
+    StepObservations,
 )
+from .validation import pwm_values, rgb_values
 
 __all__ = [
     "PWMCommands",
@@ -57,8 +63,38 @@ __all__ = [
     "DB20ObservationsWithTimestamp",
     "DB20OdometryWithTimestamp",
     "DB20RobotObservationsWithTimestamp",
+    "DB20ObservationsRaw",
+    "DB20RobotObservationsRaw",
+    "protocol_agent_DB20_raw",
+    "protocol_simulator_DB20_raw",
+    "DB18RobotObservationsBatch",
+    "DTSimRobotStateBatch",
+    "DTSimDuckieStateBatch",
+    "DB20RobotObservationsBatch",
+    "DB20RobotObservationsBatchWithTimestamp",
+    "DB20RobotObservationsBatchRaw",
+    "DB18StepAndObserve",
+    "DB18StepObservations",
+    "DB20StepAndObserve",
+    "DB20StepObservations",
+    "DB20StepObservationsWithTimestamp",
+    "DB20StepObservationsRaw",
+    "DTSimStateDelta",
+    "DTSimStateDeltaDump",
+    "DB20ObservationsPlusStateDelta",
+    "DB20ObservationsOnlyStateDelta",
+    "protocol_agent_DB20_fullstate_delta",
+    "protocol_agent_DB20_onlystate_delta",
+    "DB20ObservationsPlusStateCachedMap",
+    "DB20ObservationsOnlyStateCachedMap",
+    "protocol_agent_DB20_fullstate_cached_map",
+    "protocol_agent_DB20_onlystate_cached_map",
+    "DTSimCheckpointSaved",
 ]
 
+_lazy = LazyAttributes(__name__)
+__getattr__ = _lazy.getattr
+
 
 @dataclass
 class PWMCommands:
@@ -70,12 +106,7 @@ class PWMCommands:
     motor_right: float
 
     def __post_init__(self):
-        self.motor_left = float(self.motor_left)
-        self.motor_right = float(self.motor_right)
-        m = max(abs(self.motor_left), abs(self.motor_right))
-        if m > 1:
-            msg = f"Expected values to be between -1 and 1. Obtained {self.motor_left}, {self.motor_right}"
-            raise ValueError(msg)
+        self.motor_left, self.motor_right = pwm_values(self.motor_left, self.motor_right)
 
 
 @dataclass
@@ -92,9 +123,7 @@ class RGB:
     b: float
 
     def __post_init__(self):
-        for a in [self.r, self.g, self.b]:
-            if not isinstance(a, float):
-                raise ValueError(a)
+        self.r, self.g, self.b = rgb_values(self.r, self.g, self.b)
 
 
 @dataclass
@@ -126,6 +155,12 @@ class DB18RobotObservations(RobotObservations):
     observations: Duckiebot1Observations
 
 
+@dataclass
+class DB18RobotObservationsBatch(RobotObservationsBatch):
+    t_effective: float
+    observations: Dict[RobotName, Duckiebot1Observations]
+
+
 @dataclass
 class DTSimRobotInfo:
     pose: np.ndarray
@@ -154,6 +189,18 @@ class DTSimDuckieState(DuckieState):
     state: DTSimDuckieInfo
 
 
+@dataclass
+class DTSimRobotStateBatch(RobotStateBatch):
+    t_effective: float
+    states: Dict[RobotName, DTSimRobotInfo]
+
+
+@dataclass
+class DTSimDuckieStateBatch(DuckieStateBatch):
+    t_effective: float
+    states: Dict[str, DTSimDuckieInfo]
+
+
 @dataclass
 class DTSetMap:
     map_data: str
@@ -171,6 +218,57 @@ class DTSimStateDump(StateDump):
     state: DTSimState
 
 
+@dataclass
+class DTSimCheckpointSaved(CheckpointSaved):
+    checkpoint_name: str
+    state: DTSimStateDump
+
+
+@dataclass
+class DTSimStateDelta:
+    """
+    The changes to a DTSimState with respect to a previous version.
+
+    version: The version of the state obtained by applying this delta.
+    base_version: The version this delta applies to. None for a keyframe,
+        which contains all robots and duckies.
+    duckiebots: The robots that were added or changed.
+    duckies: The duckies that were added or changed.
+    removed_duckiebots: The robots that are not there anymore.
+    removed_duckies: The duckies that are not there anymore.
+    map_data: None, unless this is a keyframe or the map changed.
+    """
+
+    version: int
+    base_version: Optional[int]
+    t_effective: float
+    duckiebots: Dict[RobotName, DTSimRobotInfo]
+    duckies: Dict[str, DTSimDuckieInfo]
+    removed_duckiebots: List[RobotName]
+    removed_duckies: List[str]
+    map_data: Optional[str]
+
+
+@dataclass
+class DTSimStateDeltaDump(StateDump):
+    state: DTSimStateDelta
+
+
+@dataclass
+class DB18StepAndObserve(StepAndObserve):
+    commands: Dict[RobotName, Duckiebot1Commands]
+    until: float
+    robot_names: Optional[List[RobotName]] = None
+    with_state: bool = False
+
+
+@dataclass
+class DB18StepObservations(StepObservations):
+    t_effective: float
+    observations: Dict[RobotName, Duckiebot1Observations]
+    state: Optional[DTSimState] = None
+
+
 @dataclass
 class Duckiebot1ObservationsPlusState:
     camera: JPGImage
@@ -179,33 +277,48 @@ class Duckiebot1ObservationsPlusState:
     map_data: str
 
 
-description = """Particularization for Duckiebot1 observations and commands."""
-protocol_agent_duckiebot1 = particularize_no_check(
-    protocol_agent,
-    description=description,
-    inputs={"observations": Duckiebot1Observations},
-    outputs={"commands": Duckiebot1Commands},
-)
+@_lazy.attribute
+def _make_protocol_agent_duckiebot1() -> "InteractionProtocol":
+    return particularize_protocol(
+        "protocol_agent",
+        description="""Particularization for Duckiebot1 observations and commands.""",
+        inputs={"observations": Duckiebot1Observations},
+        outputs={"commands": Duckiebot1Commands},
+    )
+
 
 description = """Particularization for Duckiebot1; observations and commands with full state """
-protocol_agent_duckiebot1_fullstate = particularize_no_check(
-    protocol_agent_duckiebot1,
-    inputs={"observations": Duckiebot1ObservationsPlusState},
-)
 
-protocol_simulator_duckiebot1 = particularize_no_check(
-    protocol_simulator,
-    description="""Particularization for Duckiebot1 observations and commands.""",
-    inputs={
-        "set_robot_commands": DB18SetRobotCommands,
-        "set_map": DTSetMap,
-    },
-    outputs={
-        "robot_observations": DB18RobotObservations,
-        "robot_state": DTSimRobotState,
-        "state_dump": DTSimStateDump,
-    },
-)
+
+@_lazy.attribute
+def _make_protocol_agent_duckiebot1_fullstate() -> "InteractionProtocol":
+    return particularize_protocol(
+        "protocol_agent_duckiebot1",
+        inputs={"observations": Duckiebot1ObservationsPlusState},
+    )
+
+
+@_lazy.attribute
+def _make_protocol_simulator_duckiebot1() -> "InteractionProtocol":
+    return particularize_protocol(
+        "protocol_simulator",
+        description="""Particularization for Duckiebot1 observations and commands.""",
+        inputs={
+            "set_robot_commands": DB18SetRobotCommands,
+            "step_and_observe": DB18StepAndObserve,
+            "set_map": DTSetMap,
+        },
+        outputs={
+            "robot_observations": DB18RobotObservations,
+            "robot_observations_batch": DB18RobotObservationsBatch,
+            "step_observations": DB18StepObservations,
+            "robot_state": DTSimRobotState,
+            "robot_state_batch": DTSimRobotStateBatch,
+            "state_dump": DTSimStateDump,
+            "state_delta_dump": DTSimStateDeltaDump,
+            "checkpoint_saved": DTSimCheckpointSaved,
+        },
+    )
 
 
 ### DB20
@@ -238,6 +351,14 @@ class DB20ObservationsWithTimestamp:
     odometry: DB20OdometryWithTimestamp
 
 
+@dataclass
+class DB20ObservationsRaw:
+    """Like DB20Observations, but the camera frame is not compressed."""
+
+    camera: RawImage
+    odometry: DB20Odometry
+
+
 @dataclass
 class DB20ObservationsPlusState:
     camera: JPGImageWithTimestamp
@@ -258,6 +379,45 @@ class DB20ObservationsOnlyState:
     map_data: str
 
 
+@dataclass
+class DB20ObservationsPlusStateCachedMap:
+    """
+    Like DB20ObservationsPlusState, but the map is referred to by digest
+    and map_data is only present the first time (see MapSender/MapCache).
+    """
+
+    camera: JPGImageWithTimestamp
+    odometry: DB20OdometryWithTimestamp
+
+    your_name: RobotName
+    state: DTSimState
+    map_digest: str
+    map_data: Optional[str]
+
+
+@dataclass
+class DB20ObservationsOnlyStateCachedMap:
+    your_name: RobotName
+    state: DTSimState
+    map_digest: str
+    map_data: Optional[str]
+
+
+@dataclass
+class DB20ObservationsPlusStateDelta:
+    camera: JPGImageWithTimestamp
+    odometry: DB20OdometryWithTimestamp
+
+    your_name: RobotName
+    state: DTSimStateDelta
+
+
+@dataclass
+class DB20ObservationsOnlyStateDelta:
+    your_name: RobotName
+    state: DTSimStateDelta
+
+
 @dataclass
 class DB20Commands:
     wheels: PWMCommands
@@ -285,55 +445,208 @@ class DB20RobotObservationsWithTimestamp(RobotObservations):
     observations: DB20ObservationsWithTimestamp
 
 
-protocol_agent_DB20 = particularize_no_check(
-    protocol_agent,
-    description="""Particularization for DB20 observations and commands.""",
-    inputs={"observations": DB20Observations},
-    outputs={"commands": DB20Commands},
-)
-protocol_agent_DB20_timestamps = particularize_no_check(
-    protocol_agent,
-    description="""Particularization for DB20 observations and commands and timestamps.""",
-    inputs={"observations": DB20ObservationsWithTimestamp},
-    outputs={"commands": DB20Commands},
-)
+@dataclass
+class DB20RobotObservationsRaw(RobotObservations):
+    robot_name: RobotName
+    t_effective: float
+    observations: DB20ObservationsRaw
 
-protocol_agent_DB20_fullstate = particularize_no_check(
-    protocol_agent_duckiebot1,
-    inputs={"observations": DB20ObservationsPlusState},
-)
 
-protocol_agent_DB20_onlystate = particularize_no_check(
-    protocol_agent_duckiebot1,
-    inputs={"observations": DB20ObservationsOnlyState},
-)
+@dataclass
+class DB20StepAndObserve(StepAndObserve):
+    commands: Dict[RobotName, DB20Commands]
+    until: float
+    robot_names: Optional[List[RobotName]] = None
+    with_state: bool = False
 
-protocol_simulator_DB20 = particularize_no_check(
-    protocol_simulator,
-    description="""Particularization for Duckiebot1 observations and commands.""",
-    inputs={
-        "set_robot_commands": DB20SetRobotCommands,
-        "set_map": DTSetMap,
-    },
-    outputs={
-        "robot_observations": DB20RobotObservations,
-        "robot_state": DTSimRobotState,
-        "duckie_state": DTSimDuckieState,
-        "state_dump": DTSimStateDump,
-    },
-)
 
-protocol_simulator_DB20_timestamps = particularize_no_check(
-    protocol_simulator,
-    description="""Particularization for Duckiebot1 observations and commands with timestamps""",
-    inputs={
-        "set_robot_commands": DB20SetRobotCommands,
-        "set_map": DTSetMap,
-    },
-    outputs={
-        "robot_observations": DB20RobotObservationsWithTimestamp,
-        "robot_state": DTSimRobotState,
-        "duckie_state": DTSimDuckieState,
-        "state_dump": DTSimStateDump,
-    },
-)
+@dataclass
+class DB20StepObservations(StepObservations):
+    t_effective: float
+    observations: Dict[RobotName, DB20Observations]
+    state: Optional[DTSimState] = None
+
+
+@dataclass
+class DB20StepObservationsWithTimestamp(StepObservations):
+    t_effective: float
+    observations: Dict[RobotName, DB20ObservationsWithTimestamp]
+    state: Optional[DTSimState] = None
+
+
+@dataclass
+class DB20StepObservationsRaw(StepObservations):
+    t_effective: float
+    observations: Dict[RobotName, DB20ObservationsRaw]
+    state: Optional[DTSimState] = None
+
+
+@dataclass
+class DB20RobotObservationsBatch(RobotObservationsBatch):
+    t_effective: float
+    observations: Dict[RobotName, DB20Observations]
+
+
+@dataclass
+class DB20RobotObservationsBatchWithTimestamp(RobotObservationsBatch):
+    t_effective: float
+    observations: Dict[RobotName, DB20ObservationsWithTimestamp]
+
+
+@dataclass
+class DB20RobotObservationsBatchRaw(RobotObservationsBatch):
+    t_effective: float
+    observations: Dict[RobotName, DB20ObservationsRaw]
+
+
+@_lazy.attribute
+def _make_protocol_agent_DB20() -> "InteractionProtocol":
+    return particularize_protocol(
+        "protocol_agent",
+        description="""Particularization for DB20 observations and commands.""",
+        inputs={"observations": DB20Observations},
+        outputs={"commands": DB20Commands},
+    )
+
+
+@_lazy.attribute
+def _make_protocol_agent_DB20_timestamps() -> "InteractionProtocol":
+    return particularize_protocol(
+        "protocol_agent",
+        description="""Particularization for DB20 observations and commands and timestamps.""",
+        inputs={"observations": DB20ObservationsWithTimestamp},
+        outputs={"commands": DB20Commands},
+    )
+
+
+@_lazy.attribute
+def _make_protocol_agent_DB20_raw() -> "InteractionProtocol":
+    return particularize_protocol(
+        "protocol_agent",
+        description="""Particularization for DB20 observations (uncompressed camera) and commands.""",
+        inputs={"observations": DB20ObservationsRaw},
+        outputs={"commands": DB20Commands},
+    )
+
+
+@_lazy.attribute
+def _make_protocol_agent_DB20_fullstate() -> "InteractionProtocol":
+    return particularize_protocol(
+        "protocol_agent_duckiebot1",
+        inputs={"observations": DB20ObservationsPlusState},
+    )
+
+
+@_lazy.attribute
+def _make_protocol_agent_DB20_onlystate() -> "InteractionProtocol":
+    return particularize_protocol(
+        "protocol_agent_duckiebot1",
+        inputs={"observations": DB20ObservationsOnlyState},
+    )
+
+
+@_lazy.attribute
+def _make_protocol_agent_DB20_fullstate_cached_map() -> "InteractionProtocol":
+    return particularize_protocol(
+        "protocol_agent_duckiebot1",
+        inputs={"observations": DB20ObservationsPlusStateCachedMap},
+    )
+
+
+@_lazy.attribute
+def _make_protocol_agent_DB20_onlystate_cached_map() -> "InteractionProtocol":
+    return particularize_protocol(
+        "protocol_agent_duckiebot1",
+        inputs={"observations": DB20ObservationsOnlyStateCachedMap},
+    )
+
+
+@_lazy.attribute
+def _make_protocol_agent_DB20_fullstate_delta() -> "InteractionProtocol":
+    return particularize_protocol(
+        "protocol_agent_duckiebot1",
+        inputs={"observations": DB20ObservationsPlusStateDelta},
+    )
+
+
+@_lazy.attribute
+def _make_protocol_agent_DB20_onlystate_delta() -> "InteractionProtocol":
+    return particularize_protocol(
+        "protocol_agent_duckiebot1",
+        inputs={"observations": DB20ObservationsOnlyStateDelta},
+    )
+
+
+@_lazy.attribute
+def _make_protocol_simulator_DB20() -> "InteractionProtocol":
+    return particularize_protocol(
+        "protocol_simulator",
+        description="""Particularization for Duckiebot1 observations and commands.""",
+        inputs={
+            "set_robot_commands": DB20SetRobotCommands,
+            "step_and_observe": DB20StepAndObserve,
+            "set_map": DTSetMap,
+        },
+        outputs={
+            "robot_observations": DB20RobotObservations,
+            "robot_observations_batch": DB20RobotObservationsBatch,
+            "step_observations": DB20StepObservations,
+            "robot_state": DTSimRobotState,
+            "robot_state_batch": DTSimRobotStateBatch,
+            "duckie_state": DTSimDuckieState,
+            "duckie_state_batch": DTSimDuckieStateBatch,
+            "state_dump": DTSimStateDump,
+            "state_delta_dump": DTSimStateDeltaDump,
+            "checkpoint_saved": DTSimCheckpointSaved,
+        },
+    )
+
+
+@_lazy.attribute
+def _make_protocol_simulator_DB20_timestamps() -> "InteractionProtocol":
+    return particularize_protocol(
+        "protocol_simulator",
+        description="""Particularization for Duckiebot1 observations and commands with timestamps""",
+        inputs={
+            "set_robot_commands": DB20SetRobotCommands,
+            "step_and_observe": DB20StepAndObserve,
+            "set_map": DTSetMap,
+        },
+        outputs={
+            "robot_observations": DB20RobotObservationsWithTimestamp,
+            "robot_observations_batch": DB20RobotObservationsBatchWithTimestamp,
+            "step_observations": DB20StepObservationsWithTimestamp,
+            "robot_state": DTSimRobotState,
+            "robot_state_batch": DTSimRobotStateBatch,
+            "duckie_state": DTSimDuckieState,
+            "duckie_state_batch": DTSimDuckieStateBatch,
+            "state_dump": DTSimStateDump,
+            "state_delta_dump": DTSimStateDeltaDump,
+            "checkpoint_saved": DTSimCheckpointSaved,
+        },
+    )
+
+
+@_lazy.attribute
+def _make_protocol_simulator_DB20_raw() -> "InteractionProtocol":
+    return particularize_protocol(
+        "protocol_simulator",
+        description="""Particularization for DB20 observations (uncompressed camera) and commands.""",
+        inputs={
+            "set_robot_commands": DB20SetRobotCommands,
+            "step_and_observe": DB20StepAndObserve,
+            "set_map": DTSetMap,
+        },
+        outputs={
+            "robot_observations": DB20RobotObservationsRaw,
+            "robot_observations_batch": DB20RobotObservationsBatchRaw,
+            "step_observations": DB20StepObservationsRaw,
+            "robot_state": DTSimRobotState,
+            "robot_state_batch": DTSimRobotStateBatch,
+            "duckie_state": DTSimDuckieState,
+            "duckie_state_batch": DTSimDuckieStateBatch,
+            "state_dump": DTSimStateDump,
+            "state_delta_dump": DTSimStateDeltaDump,
+            "checkpoint_saved": DTSimCheckpointSaved,
+        },
+    )
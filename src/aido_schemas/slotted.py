@@ -0,0 +1,196 @@
+"""
+Immutable variants of the schemas that are created in large numbers
+(e.g. when keeping whole episodes in memory), without a per-instance __dict__.
+
+They are plain (frozen) dataclasses rather than zuper_typing ones, because the
+latter always add a __dict__; they have the same fields and the same IPCE
+serialization, so they can be used to particularize the protocols.
+"""
+import dataclasses
+from dataclasses import dataclass
+from typing import Any, Dict, Tuple, TypeVar
+
+from .protocol_simulator import FriendlyPose, FriendlyVelocity, Metric, RobotName, RobotObservations
+from .schemas import (
+    DB20Commands,
+    DB20Odometry,
+    DB20OdometryWithTimestamp,
+    LEDSCommands,
+    PWMCommands,
+    RGB,
+)
+from .validation import metric_value, pwm_values, rgb_values, trusted_construction
+
+__all__ = [
+    "PWMCommandsSlotted",
+    "RGBSlotted",
+    "LEDSCommandsSlotted",
+    "DB20CommandsSlotted",
+    "FriendlyPoseSlotted",
+    "FriendlyVelocitySlotted",
+    "DB20OdometrySlotted",
+    "DB20OdometryWithTimestampSlotted",
+    "RobotObservationsSlotted",
+    "MetricSlotted",
+    "to_slotted",
+    "from_slotted",
+]
+
+X = TypeVar("X")
+
+
+class _Slotted:
+    __slots__ = ()
+
+    def __reduce__(self):
+        # the default for slotted objects uses setattr, which frozen classes refuse
+        return type(self), tuple(getattr(self, f.name) for f in dataclasses.fields(self))
+
+
+def _set_values(ob: _Slotted, names: Tuple[str, ...], values: tuple):
+    # the same checks and conversions as the original schemas, for frozen objects
+    for name, value in zip(names, values):
+        object.__setattr__(ob, name, value)
+
+
+@dataclass(frozen=True)
+class PWMCommandsSlotted(_Slotted):
+    """
+    PWM commands are floats between -1 and 1.
+    """
+
+    __slots__ = ("motor_left", "motor_right")
+
+    motor_left: float
+    motor_right: float
+
+    def __post_init__(self):
+        _set_values(self, ("motor_left", "motor_right"), pwm_values(self.motor_left, self.motor_right))
+
+
+@dataclass(frozen=True)
+class RGBSlotted(_Slotted):
+    """Values between 0, 1."""
+
+    __slots__ = ("r", "g", "b")
+
+    r: float
+    g: float
+    b: float
+
+    def __post_init__(self):
+        _set_values(self, ("r", "g", "b"), rgb_values(self.r, self.g, self.b))
+
+
+@dataclass(frozen=True)
+class LEDSCommandsSlotted(_Slotted):
+    __slots__ = ("center", "front_left", "front_right", "back_left", "back_right")
+
+    center: RGBSlotted
+    front_left: RGBSlotted
+    front_right: RGBSlotted
+    back_left: RGBSlotted
+    back_right: RGBSlotted
+
+
+@dataclass(frozen=True)
+class DB20CommandsSlotted(_Slotted):
+    __slots__ = ("wheels", "LEDS")
+
+    wheels: PWMCommandsSlotted
+    LEDS: LEDSCommandsSlotted
+
+
+@dataclass(frozen=True)
+class FriendlyPoseSlotted(_Slotted):
+    __slots__ = ("x", "y", "theta_deg")
+
+    x: float
+    y: float
+    theta_deg: float
+
+
+@dataclass(frozen=True)
+class FriendlyVelocitySlotted(_Slotted):
+    __slots__ = ("x", "y", "theta_deg")
+
+    x: float
+    y: float
+    theta_deg: float
+
+
+@dataclass(frozen=True)
+class DB20OdometrySlotted(_Slotted):
+    __slots__ = ("resolution_rad", "axis_left_rad", "axis_right_rad")
+
+    resolution_rad: float
+    axis_left_rad: float
+    axis_right_rad: float
+
+
+@dataclass(frozen=True)
+class DB20OdometryWithTimestampSlotted(_Slotted):
+    # flat rather than a subclass of DB20OdometrySlotted: zuper_ipce cannot
+    # instantiate a subclass of a slotted dataclass when decoding without the schema
+    __slots__ = ("resolution_rad", "axis_left_rad", "axis_right_rad", "timestamp")
+
+    resolution_rad: float
+    axis_left_rad: float
+    axis_right_rad: float
+    timestamp: float
+
+
+@dataclass(frozen=True)
+class RobotObservationsSlotted(_Slotted):
+    __slots__ = ("robot_name", "t_effective", "observations")
+
+    robot_name: RobotName
+    t_effective: float
+    observations: Any
+
+
+@dataclass(frozen=True)
+class MetricSlotted(_Slotted):
+    __slots__ = ("higher_is_better", "cumulative_value", "description")
+
+    higher_is_better: bool
+    cumulative_value: float
+    description: str
+
+    def __post_init__(self):
+        _set_values(self, ("cumulative_value",), (metric_value(self.cumulative_value),))
+
+
+_slotted: Dict[type, type] = {
+    PWMCommands: PWMCommandsSlotted,
+    RGB: RGBSlotted,
+    LEDSCommands: LEDSCommandsSlotted,
+    DB20Commands: DB20CommandsSlotted,
+    FriendlyPose: FriendlyPoseSlotted,
+    FriendlyVelocity: FriendlyVelocitySlotted,
+    DB20Odometry: DB20OdometrySlotted,
+    DB20OdometryWithTimestamp: DB20OdometryWithTimestampSlotted,
+    RobotObservations: RobotObservationsSlotted,
+    Metric: MetricSlotted,
+}
+_original: Dict[type, type] = {v: k for k, v in _slotted.items()}
+
+
+def _convert(ob: Any, table: Dict[type, type]) -> Any:
+    K = table.get(type(ob))
+    if K is None:
+        return ob
+    values = {f.name: _convert(getattr(ob, f.name), table) for f in dataclasses.fields(ob)}
+    # the values were already checked
+    with trusted_construction():
+        return K(**values)
+
+
+def to_slotted(ob: X) -> X:
+    """Returns the slotted version of ``ob``, if there is one, converting the fields as well."""
+    return _convert(ob, _slotted)
+
+
+def from_slotted(ob: X) -> X:
+    """The inverse of to_slotted()."""
+    return _convert(ob, _original)
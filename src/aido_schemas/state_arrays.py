@@ -0,0 +1,187 @@
+from functools import cached_property
+from typing import Iterator, List, Mapping, TYPE_CHECKING
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from dataclasses import dataclass
+    from zuper_nodes import InteractionProtocol
+else:
+    from zuper_typing import dataclass
+
+from .lazy import LazyAttributes, particularize_protocol
+from .protocol_simulator import JPGImageWithTimestamp, RobotName
+from .schemas import (
+    DB20OdometryWithTimestamp,
+    DTSimDuckieInfo,
+    DTSimRobotInfo,
+    DTSimState,
+    LEDSCommands,
+    PWMCommands,
+    RGB,
+)
+
+__all__ = [
+    "DTSimStateArrays",
+    "DB20ObservationsPlusStateArrays",
+    "DB20ObservationsOnlyStateArrays",
+    "protocol_agent_DB20_fullstate_arrays",
+    "protocol_agent_DB20_onlystate_arrays",
+    "sim_state_arrays_from_sim_state",
+    "sim_state_from_sim_state_arrays",
+]
+
+_lazy = LazyAttributes(__name__)
+__getattr__ = _lazy.getattr
+
+LED_NAMES = ("center", "front_left", "front_right", "back_left", "back_right")
+
+
+@dataclass
+class DTSimStateArrays:
+    """
+    Same content as DTSimState, with one stacked array per quantity
+    instead of one object per robot/duckie.
+
+    robot_names: The i-th name refers to the i-th entry of the robot_* arrays
+    robot_pose: (N, ...) stacked poses
+    robot_velocity: (N, ...) stacked velocities
+    robot_pwm: (N, 2) motor_left, motor_right
+    robot_leds: (N, 5, 3) RGB for center, front_left, front_right, back_left, back_right
+
+    duckie_names: The i-th name refers to the i-th entry of the duckie_* arrays
+    duckie_pose: (M, ...) stacked poses
+    duckie_velocity: (M, ...) stacked velocities
+
+    ``duckiebots`` and ``duckies`` give a read-only dict-like view
+    with the same interface as DTSimState. The views (and their index of
+    the names) are created at the first access, so the names must not be
+    changed afterwards.
+    """
+
+    t_effective: float
+
+    robot_names: List[RobotName]
+    robot_pose: np.ndarray
+    robot_velocity: np.ndarray
+    robot_pwm: np.ndarray
+    robot_leds: np.ndarray
+
+    duckie_names: List[str]
+    duckie_pose: np.ndarray
+    duckie_velocity: np.ndarray
+
+    @cached_property
+    def duckiebots(self) -> Mapping[RobotName, DTSimRobotInfo]:
+        return _RobotsView(self)
+
+    @cached_property
+    def duckies(self) -> Mapping[str, DTSimDuckieInfo]:
+        return _DuckiesView(self)
+
+
+class _RobotsView(Mapping):
+    def __init__(self, s: DTSimStateArrays):
+        self.s = s
+        self.index = {k: i for i, k in enumerate(s.robot_names)}
+
+    def __getitem__(self, k: RobotName) -> DTSimRobotInfo:
+        i = self.index[k]
+        s = self.s
+        left, right = s.robot_pwm[i]
+        leds = LEDSCommands(*(RGB(float(r), float(g), float(b)) for r, g, b in s.robot_leds[i]))
+        return DTSimRobotInfo(
+            pose=s.robot_pose[i],
+            velocity=s.robot_velocity[i],
+            pwm=PWMCommands(motor_left=float(left), motor_right=float(right)),
+            leds=leds,
+        )
+
+    def __iter__(self) -> Iterator[RobotName]:
+        return iter(self.s.robot_names)
+
+    def __len__(self) -> int:
+        return len(self.s.robot_names)
+
+
+class _DuckiesView(Mapping):
+    def __init__(self, s: DTSimStateArrays):
+        self.s = s
+        self.index = {k: i for i, k in enumerate(s.duckie_names)}
+
+    def __getitem__(self, k: str) -> DTSimDuckieInfo:
+        i = self.index[k]
+        return DTSimDuckieInfo(pose=self.s.duckie_pose[i], velocity=self.s.duckie_velocity[i])
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.s.duckie_names)
+
+    def __len__(self) -> int:
+        return len(self.s.duckie_names)
+
+
+def _stack(arrays: List[np.ndarray], shape=(3, 3)) -> np.ndarray:
+    if not arrays:
+        return np.zeros((0,) + shape)
+    return np.stack(arrays)
+
+
+def sim_state_arrays_from_sim_state(state: DTSimState) -> DTSimStateArrays:
+    robot_names = list(state.duckiebots)
+    robots = [state.duckiebots[_] for _ in robot_names]
+    duckie_names = list(state.duckies)
+    duckies = [state.duckies[_] for _ in duckie_names]
+
+    robot_pwm = np.array([(r.pwm.motor_left, r.pwm.motor_right) for r in robots], dtype="float64")
+    robot_leds = np.array(
+        [[(c.r, c.g, c.b) for c in (getattr(r.leds, _) for _ in LED_NAMES)] for r in robots],
+        dtype="float64",
+    )
+    return DTSimStateArrays(
+        t_effective=state.t_effective,
+        robot_names=robot_names,
+        robot_pose=_stack([_.pose for _ in robots]),
+        robot_velocity=_stack([_.velocity for _ in robots]),
+        robot_pwm=robot_pwm.reshape((len(robots), 2)),
+        robot_leds=robot_leds.reshape((len(robots), 5, 3)),
+        duckie_names=duckie_names,
+        duckie_pose=_stack([_.pose for _ in duckies]),
+        duckie_velocity=_stack([_.velocity for _ in duckies]),
+    )
+
+
+def sim_state_from_sim_state_arrays(s: DTSimStateArrays) -> DTSimState:
+    return DTSimState(t_effective=s.t_effective, duckiebots=dict(s.duckiebots), duckies=dict(s.duckies))
+
+
+@dataclass
+class DB20ObservationsPlusStateArrays:
+    camera: JPGImageWithTimestamp
+    odometry: DB20OdometryWithTimestamp
+
+    your_name: RobotName
+    state: DTSimStateArrays
+    map_data: str
+
+
+@dataclass
+class DB20ObservationsOnlyStateArrays:
+    your_name: RobotName
+    state: DTSimStateArrays
+    map_data: str
+
+
+@_lazy.attribute
+def _make_protocol_agent_DB20_fullstate_arrays() -> "InteractionProtocol":
+    return particularize_protocol(
+        "protocol_agent_duckiebot1",
+        inputs={"observations": DB20ObservationsPlusStateArrays},
+    )
+
+
+@_lazy.attribute
+def _make_protocol_agent_DB20_onlystate_arrays() -> "InteractionProtocol":
+    return particularize_protocol(
+        "protocol_agent_duckiebot1",
+        inputs={"observations": DB20ObservationsOnlyStateArrays},
+    )
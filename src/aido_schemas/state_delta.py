@@ -0,0 +1,165 @@
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from .protocol_simulator import RobotName
+from .schemas import DTSimDuckieInfo, DTSimRobotInfo, DTSimState, DTSimStateDelta
+
+__all__ = [
+    "SimStateDeltaEncoder",
+    "SimStateDeltaDecoder",
+    "StateDeltaOutOfSync",
+    "apply_state_delta",
+]
+
+
+class StateDeltaOutOfSync(Exception):
+    """The delta does not apply to the version the receiver has."""
+
+
+def _robot_key(r: DTSimRobotInfo) -> tuple:
+    leds = r.leds
+    rgbs = (leds.center, leds.front_left, leds.front_right, leds.back_left, leds.back_right)
+    colors = tuple((c.r, c.g, c.b) for c in rgbs)
+    pwm = (r.pwm.motor_left, r.pwm.motor_right)
+    return np.array(r.pose, copy=True), np.array(r.velocity, copy=True), pwm, colors
+
+
+def _duckie_key(d: DTSimDuckieInfo) -> tuple:
+    return np.array(d.pose, copy=True), np.array(d.velocity, copy=True)
+
+
+def _same(a: tuple, b: tuple) -> bool:
+    if not (np.array_equal(a[0], b[0]) and np.array_equal(a[1], b[1])):
+        return False
+    return a[2:] == b[2:]
+
+
+class SimStateDeltaEncoder:
+    """
+    Sender side: produces a keyframe first and then deltas against the
+    last state that was encoded.
+
+    keyframe_every: If given, a keyframe is sent every that many messages,
+    so that receivers that lost sync eventually recover.
+    """
+
+    version: int
+    robots: Dict[RobotName, tuple]
+    duckies: Dict[str, tuple]
+    map_data: Optional[str]
+
+    def __init__(self, keyframe_every: Optional[int] = None):
+        self.keyframe_every = keyframe_every
+        self.version = 0
+        self.reset()
+
+    def reset(self):
+        """The next message will be a keyframe."""
+        self.robots = {}
+        self.duckies = {}
+        self.map_data = None
+        self.since_keyframe = None
+
+    def resync(self, since_version: Optional[int]):
+        """
+        Tells the encoder which version the receiver has (None if it has none).
+        If it is not the last one produced, the next message will be a keyframe.
+        """
+        if since_version is None or since_version != self.version:
+            self.reset()
+
+    def encode(self, state: DTSimState, map_data: str) -> DTSimStateDelta:
+        """Encodes the state as a delta against the last encoded one."""
+        if self.keyframe_every is not None and self.since_keyframe is not None:
+            if self.since_keyframe + 1 >= self.keyframe_every:
+                self.reset()
+
+        keyframe = self.since_keyframe is None
+        base_version = None if keyframe else self.version
+
+        duckiebots = {}
+        robots = {}
+        for k, r in state.duckiebots.items():
+            key = _robot_key(r)
+            robots[k] = key
+            if keyframe or k not in self.robots or not _same(key, self.robots[k]):
+                duckiebots[k] = r
+
+        duckies = {}
+        duckie_keys = {}
+        for k, d in state.duckies.items():
+            key = _duckie_key(d)
+            duckie_keys[k] = key
+            if keyframe or k not in self.duckies or not _same(key, self.duckies[k]):
+                duckies[k] = d
+
+        removed_duckiebots = [_ for _ in self.robots if _ not in robots]
+        removed_duckies = [_ for _ in self.duckies if _ not in duckie_keys]
+        send_map = keyframe or map_data != self.map_data
+
+        self.version += 1
+        self.robots = robots
+        self.duckies = duckie_keys
+        self.map_data = map_data
+        self.since_keyframe = 0 if keyframe else self.since_keyframe + 1
+
+        return DTSimStateDelta(
+            version=self.version,
+            base_version=base_version,
+            t_effective=state.t_effective,
+            duckiebots=duckiebots,
+            duckies=duckies,
+            removed_duckiebots=removed_duckiebots,
+            removed_duckies=removed_duckies,
+            map_data=map_data if send_map else None,
+        )
+
+
+def apply_state_delta(state: Optional[DTSimState], delta: DTSimStateDelta) -> DTSimState:
+    """Returns the full state obtained by applying the delta to ``state`` (ignored for keyframes)."""
+    if delta.base_version is None:
+        duckiebots = {}
+        duckies = {}
+    else:
+        if state is None:
+            msg = f"Delta version {delta.version} needs version {delta.base_version}, but there is no state."
+            raise StateDeltaOutOfSync(msg)
+        duckiebots = dict(state.duckiebots)
+        duckies = dict(state.duckies)
+    for k in delta.removed_duckiebots:
+        duckiebots.pop(k, None)
+    for k in delta.removed_duckies:
+        duckies.pop(k, None)
+    duckiebots.update(delta.duckiebots)
+    duckies.update(delta.duckies)
+    return DTSimState(t_effective=delta.t_effective, duckiebots=duckiebots, duckies=duckies)
+
+
+class SimStateDeltaDecoder:
+    """
+    Receiver side: keeps the full state and map rebuilt from the deltas.
+
+    ``apply()`` raises StateDeltaOutOfSync if a delta is missing; ``version``
+    is what to send back (e.g. in DumpStateDelta) to resynchronize.
+    """
+
+    version: Optional[int]
+    state: Optional[DTSimState]
+    map_data: Optional[str]
+
+    def __init__(self):
+        self.version = None
+        self.state = None
+        self.map_data = None
+
+    def apply(self, delta: DTSimStateDelta) -> Tuple[DTSimState, str]:
+        if delta.base_version is not None and delta.base_version != self.version:
+            msg = f"Delta version {delta.version} needs version {delta.base_version}; I have {self.version}."
+            self.version = None
+            raise StateDeltaOutOfSync(msg)
+        self.state = apply_state_delta(self.state, delta)
+        if delta.map_data is not None:
+            self.map_data = delta.map_data
+        self.version = delta.version
+        return self.state, self.map_data
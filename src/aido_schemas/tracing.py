@@ -0,0 +1,91 @@
+import json
+import time
+from typing import Dict, Optional, Tuple
+
+from .utils import PhaseStats
+
+__all__ = ["LatencyTracer"]
+
+OBSERVATION_TO_COMMANDS = "observation_to_commands"
+""" From when the observations were received by the agent to when the commands were written. """
+
+ACQUISITION_TO_COMMANDS = "acquisition_to_commands"
+""" From the acquisition timestamp of the observations (wall clock) to when the commands were written. """
+
+
+class LatencyTracer:
+    """
+    Measures the observation-to-action latency of an agent.
+
+    Call ``observation_received()`` in ``on_received_observations``, and
+    ``commands_sent()`` right after writing the ``commands`` that answer the
+    next ``get_commands``. Each observation is linked to the first commands
+    that follow it; observations replaced by newer ones before any commands
+    are counted as superseded.
+
+    deadline: If given, latencies above this many seconds count as deadline misses.
+    """
+
+    episodes: Dict[str, Dict[str, PhaseStats]]
+    misses: Dict[str, int]
+    superseded: Dict[str, int]
+    pending: Optional[Tuple[float, Optional[float]]]
+
+    def __init__(self, deadline: Optional[float] = None):
+        self.deadline = deadline
+        self.episodes = {}
+        self.misses = {}
+        self.superseded = {}
+        self.pending = None
+        self.start_episode("default")
+
+    def start_episode(self, episode_name: str):
+        self.episode_name = episode_name
+        self.episodes.setdefault(episode_name, {})
+        self.misses.setdefault(episode_name, 0)
+        self.superseded.setdefault(episode_name, 0)
+        self.pending = None
+
+    def observation_received(self, acquired: Optional[float] = None):
+        """
+        acquired: The acquisition time of the observations (seconds since the epoch),
+        e.g. the ``timestamp`` of JPGImageWithTimestamp, if the clocks are comparable.
+        """
+        if self.pending is not None:
+            self.superseded[self.episode_name] += 1
+        self.pending = (time.perf_counter(), acquired)
+
+    def commands_sent(self):
+        if self.pending is None:
+            return
+        t_received, acquired = self.pending
+        self.pending = None
+        latency = time.perf_counter() - t_received
+        self._add(OBSERVATION_TO_COMMANDS, latency)
+        if acquired is not None:
+            self._add(ACQUISITION_TO_COMMANDS, time.time() - acquired)
+        if self.deadline is not None and latency > self.deadline:
+            self.misses[self.episode_name] += 1
+
+    def _add(self, name: str, dt: float):
+        episode = self.episodes[self.episode_name]
+        stats = episode.get(name)
+        if stats is None:
+            stats = episode[name] = PhaseStats()
+        stats.add(dt)
+
+    def report(self) -> dict:
+        """Latency distributions and deadline misses for each episode."""
+        res = {}
+        for episode_name, episode in self.episodes.items():
+            if not episode:
+                continue
+            r = {k: v.summary() for k, v in episode.items()}
+            r["deadline"] = self.deadline
+            r["deadline_misses"] = self.misses[episode_name]
+            r["superseded_observations"] = self.superseded[episode_name]
+            res[episode_name] = r
+        return res
+
+    def to_json(self) -> str:
+        return json.dumps(self.report(), indent=2)
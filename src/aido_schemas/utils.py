@@ -1,24 +1,160 @@
 #!/usr/bin/env python
+import json
+import math
 import time
 from contextlib import contextmanager
 
 from dataclasses import dataclass, field
-from typing import Dict
+from typing import Dict, List, Tuple
 
-__all__ = ["TimeTracker"]
+__all__ = ["TimeTracker", "TimingStats", "PhaseStats"]
+
+# Relative width of the histogram buckets: percentiles are accurate to about 1%.
+_BUCKET_RATIO = 1.02
+_LOG_BUCKET_RATIO = math.log(_BUCKET_RATIO)
+# Durations are bucketed in units of this many seconds.
+_BUCKET_UNIT = 1e-7
+
+
+@dataclass
+class PhaseStats:
+    """
+    Running statistics for the durations of one phase, in seconds.
+
+    The distribution is kept as a histogram with logarithmically spaced buckets,
+    so memory does not grow with the number of samples.
+    """
+
+    count: int = 0
+    total: float = 0.0
+    min: float = math.inf
+    max: float = 0.0
+    buckets: Dict[int, int] = field(default_factory=dict)
+
+    def add(self, dt: float):
+        self.count += 1
+        self.total += dt
+        if dt < self.min:
+            self.min = dt
+        if dt > self.max:
+            self.max = dt
+        if dt > _BUCKET_UNIT:
+            b = int(math.log(dt / _BUCKET_UNIT) / _LOG_BUCKET_RATIO)
+        else:
+            b = 0
+        self.buckets[b] = self.buckets.get(b, 0) + 1
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else math.nan
+
+    def percentile(self, q: float) -> float:
+        """q between 0 and 100."""
+        if not self.count:
+            return math.nan
+        rank = q / 100.0 * self.count
+        seen = 0
+        for b in sorted(self.buckets):
+            seen += self.buckets[b]
+            if seen >= rank:
+                value = _BUCKET_UNIT * _BUCKET_RATIO ** (b + 0.5)
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "total": self.total,
+            "mean": self.mean,
+            "min": self.min if self.count else math.nan,
+            "max": self.max,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+        }
+
+
+@dataclass
+class TimingStats:
+    """
+    Statistics for all phases, aggregated over many steps.
+
+    If ``max_events`` is not zero, the last ``max_events`` individual
+    measurements are kept as well, for exporting as a Chrome trace.
+    """
+
+    phases: Dict[str, PhaseStats] = field(default_factory=dict)
+    max_events: int = 0
+    events: List[Tuple[str, float, float, int]] = field(default_factory=list)
+
+    def add(self, phase_name: str, t0: float, dt: float, step: int):
+        stats = self.phases.get(phase_name)
+        if stats is None:
+            stats = self.phases[phase_name] = PhaseStats()
+        stats.add(dt)
+        if self.max_events:
+            self.events.append((phase_name, t0, dt, step))
+            if len(self.events) > 2 * self.max_events:
+                del self.events[: -self.max_events]
+
+    def percentile(self, phase_name: str, q: float) -> float:
+        return self.phases[phase_name].percentile(q)
+
+    def summary(self) -> Dict[str, dict]:
+        return {k: v.summary() for k, v in sorted(self.phases.items())}
+
+    def to_json(self) -> str:
+        return json.dumps(self.summary(), indent=2)
+
+    def to_chrome_trace(self, pid: int = 0, tid: int = 0) -> dict:
+        """The recorded events in the Trace Event Format used by chrome://tracing."""
+        events = []
+        for name, t0, dt, step in self.events[-self.max_events :]:
+            events.append(
+                {
+                    "name": name.split("/")[-1],
+                    "cat": name,
+                    "ph": "X",
+                    "ts": t0 * 1e6,
+                    "dur": dt * 1e6,
+                    "pid": pid,
+                    "tid": tid,
+                    "args": {"step": step},
+                }
+            )
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
 
 
 @dataclass
 class TimeTracker:
+    """
+    Measures the phases of a step.
+
+    Phases can be nested: the inner ones are named "outer/inner".
+    ``phases`` has the durations for this step (summed, if a phase
+    is repeated); ``total`` is the sum of the top-level phases.
+    Pass the same ``stats`` to the trackers of successive steps
+    to aggregate over a whole run.
+    """
+
     step: int
     total: float = 0
     phases: Dict[str, float] = field(default_factory=dict)
+    stats: TimingStats = field(default_factory=TimingStats)
+    _stack: List[str] = field(default_factory=list, init=False, repr=False, compare=False)
 
     @contextmanager
     def measure(self, phase_name: str):
-        t0 = time.time()
-        yield
-        t1 = time.time()
-        delta = t1 - t0
-        self.phases[phase_name] = delta
-        self.total += delta
+        stack = self._stack
+        stack.append(phase_name)
+        name = "/".join(stack)
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            delta = time.perf_counter() - t0
+            stack.pop()
+            self.phases[name] = self.phases.get(name, 0.0) + delta
+            if not stack:
+                self.total += delta
+            self.stats.add(name, t0, delta, self.step)
@@ -0,0 +1,340 @@
+import dataclasses
+import threading
+import typing
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional, Tuple, Type, TypeVar
+
+import numpy as np
+
+__all__ = [
+    "trusted_construction",
+    "decoder_for",
+    "validator_for",
+    "object_from_ipce_fast",
+]
+
+X = TypeVar("X")
+
+SCHEMA_ATT = "$schema"
+
+
+class _Trust(threading.local):
+    active: bool = False
+
+
+trust = _Trust()
+""" Checked by the ``__post_init__`` of the schemas; see trusted_construction(). """
+
+
+@contextmanager
+def trusted_construction():
+    """
+    Objects created in this context (in this thread) skip the checks
+    in their ``__post_init__`` (PWMCommands, RGB), but the values are
+    still converted (e.g. ints to floats).
+
+    Only for values that are known to be valid already, for example
+    because they come from a peer that validated them.
+    """
+    previous = trust.active
+    trust.active = True
+    try:
+        yield
+    finally:
+        trust.active = previous
+
+
+def _to_float(v):
+    return v if v.__class__ is float else float(v)
+
+
+# The checks and conversions of the schemas (and of their slotted variants).
+# In trusted_construction() the values are still converted, but not checked.
+
+
+def pwm_values(motor_left, motor_right) -> Tuple[float, float]:
+    """The values of PWMCommands, as floats between -1 and 1."""
+    motor_left = _to_float(motor_left)
+    motor_right = _to_float(motor_right)
+    if not trust.active and (abs(motor_left) > 1 or abs(motor_right) > 1):
+        msg = f"Expected values to be between -1 and 1. Obtained {motor_left}, {motor_right}"
+        raise ValueError(msg)
+    return motor_left, motor_right
+
+
+def rgb_values(r, g, b) -> Tuple[float, float, float]:
+    """The values of RGB, which must be floats."""
+    if trust.active:
+        return _to_float(r), _to_float(g), _to_float(b)
+    for a in (r, g, b):
+        if not isinstance(a, float):
+            raise ValueError(a)
+    return r, g, b
+
+
+def metric_value(cumulative_value) -> float:
+    """The cumulative value of Metric, as a float."""
+    if isinstance(cumulative_value, int):
+        return float(cumulative_value)
+    return cumulative_value
+
+
+def _array_from_ipce(d: dict) -> np.ndarray:
+    return np.frombuffer(d["data"], dtype=d["dtype"]).reshape(tuple(d["shape"]))
+
+
+def _fallback_decoder(T) -> Callable[[Any], Any]:
+    def decode(v):
+        from zuper_ipce import IEDO, object_from_ipce
+
+        return object_from_ipce(v, T, iedo=IEDO(True, True))
+
+    return decode
+
+
+_IDENTITY = (str, int, bool, bytes, type(None))
+
+_decoders: Dict[object, Optional[Callable[[Any], Any]]] = {}
+_validators: Dict[object, Optional[Callable[[Any], None]]] = {}
+_lock = threading.RLock()
+
+
+def _optional_arg(T) -> Optional[object]:
+    """X for Optional[X], otherwise None."""
+    if typing.get_origin(T) is typing.Union:
+        args = [_ for _ in typing.get_args(T) if _ is not type(None)]
+        if len(args) == 1 and len(typing.get_args(T)) == 2:
+            return args[0]
+    return None
+
+
+def _decoder(T) -> Optional[Callable[[Any], Any]]:
+    """The decoder from IPCE for the type, or None if the IPCE value can be used as is."""
+    with _lock:
+        if T not in _decoders:
+            _decoders[T] = _make_decoder(T)
+        return _decoders[T]
+
+
+def _make_decoder(T) -> Optional[Callable[[Any], Any]]:
+    if T in _IDENTITY:
+        return None
+    if T is float:
+        return _to_float
+    if T is np.ndarray:
+        return _array_from_ipce
+    if dataclasses.is_dataclass(T):
+        return _generate_dataclass_decoder(T)
+
+    X = _optional_arg(T)
+    if X is not None:
+        d = _decoder(X)
+        if d is None:
+            return None
+        return lambda v: None if v is None else d(v)
+
+    origin, args = typing.get_origin(T), typing.get_args(T)
+    if origin is list and args:
+        d = _decoder(args[0])
+        if d is None:
+            return None
+        return lambda v: [d(_) for _ in v]
+    if origin is tuple and args:
+        if len(args) == 2 and args[1] is Ellipsis:
+            d = _decoder(args[0])
+            if d is None:
+                return tuple
+            return lambda v: tuple(d(_) for _ in v)
+        ds = [_decoder(_) or (lambda x: x) for _ in args]
+        return lambda v: tuple(d(_) for d, _ in zip(ds, v))
+    if origin is dict and args and args[0] is str:
+        d = _decoder(args[1]) or (lambda x: x)
+        return lambda v: {k: d(x) for k, x in v.items() if k != SCHEMA_ATT}
+    # Any, object, type, unions, ...: the IPCE has the schema.
+    return _fallback_decoder(T)
+
+
+def _generate_dataclass_decoder(T: type) -> Callable[[dict], Any]:
+    fields = dataclasses.fields(T)
+    hints = typing.get_type_hints(T)
+    ns: Dict[str, object] = {"cls": T, "new": object.__new__, "SCHEMA_ATT": SCHEMA_ATT}
+    ns["fallback"] = _fallback_decoder(T)
+    lines = [
+        "def decode(d):",
+        # A subclass, or an older peer with fewer fields: let zuper_ipce figure it out.
+        f"    if len(d) - (SCHEMA_ATT in d) != {len(fields)}:",
+        "        return fallback(d)",
+        "    ob = new(cls)",
+    ]
+    for i, f in enumerate(fields):
+        v = f"v{i}"
+        lines.append(f"    {v} = d[{f.name!r}]")
+        FT = hints.get(f.name, f.type)
+        if FT is float:
+            lines.append(f"    if {v}.__class__ is not float:")
+            lines.append(f"        {v} = float({v})")
+        else:
+            d = _decoder(FT)
+            if d is not None:
+                ns[f"d{i}"] = d
+                lines.append(f"    {v} = d{i}({v})")
+    if all("__slots__" in vars(_) for _ in T.__mro__[:-1]):
+        # slotted (and possibly frozen) classes
+        ns["setattr"] = object.__setattr__
+        for i, f in enumerate(fields):
+            lines.append(f"    setattr(ob, {f.name!r}, v{i})")
+    else:
+        items = ", ".join(f"{f.name!r}: v{i}" for i, f in enumerate(fields))
+        lines.append(f"    ob.__dict__.update({{{items}}})")
+    lines.append("    return ob")
+    exec("\n".join(lines), ns)
+    decode = ns["decode"]
+    decode.__qualname__ = f"decode_{T.__name__}"
+    return decode
+
+
+def decoder_for(T: Type[X]) -> Callable[[dict], X]:
+    """
+    Returns a function that creates an instance of the dataclass T from its IPCE,
+    without any checks; ``__init__`` and ``__post_init__`` are not called.
+
+    The function is generated once per class. It is equivalent to
+    ``object_from_ipce(ipce, T)`` for well-formed input, but much faster.
+    """
+    if not dataclasses.is_dataclass(T):
+        raise ValueError(f"Expected a dataclass, got {T!r}")
+    return _decoder(T)
+
+
+def _validator(T) -> Optional[Callable[[Any], None]]:
+    """The checker for values of the type, or None if there is nothing to check."""
+    with _lock:
+        if T not in _validators:
+            _validators[T] = _make_validator(T)
+        return _validators[T]
+
+
+def _isinstance_check(T: type, classes) -> Callable[[Any], None]:
+    def check(v):
+        if not isinstance(v, classes):
+            raise ValueError(f"Expected {T.__name__}, got {v!r}.")
+
+    return check
+
+
+def _make_validator(T) -> Optional[Callable[[Any], None]]:
+    if T is float:
+        return _isinstance_check(T, (float, int))
+    if T in _IDENTITY or T is np.ndarray or T is type:
+        return _isinstance_check(T, T)
+    if dataclasses.is_dataclass(T):
+        return _generate_dataclass_validator(T)
+
+    X = _optional_arg(T)
+    if X is not None:
+        c = _validator(X)
+        if c is None:
+            return None
+
+        def check_optional(v):
+            if v is not None:
+                c(v)
+
+        return check_optional
+
+    origin, args = typing.get_origin(T), typing.get_args(T)
+    if origin in (list, tuple, dict):
+        return _container_validator(origin, args)
+    # Any, object, unions, ...
+    return None
+
+
+def _container_validator(origin: type, args: tuple) -> Callable[[Any], None]:
+    if origin is tuple and args and args[-1] is not Ellipsis:
+        cs = [_validator(_) for _ in args]
+
+        def check_tuple(v):
+            if not isinstance(v, tuple) or len(v) != len(cs):
+                raise ValueError(f"Expected a tuple of {len(cs)} elements, got {v!r}.")
+            for c, x in zip(cs, v):
+                if c is not None:
+                    c(x)
+
+        return check_tuple
+
+    if origin is dict:
+        c = _validator(args[1]) if args else None
+    else:
+        c = _validator(args[0]) if args else None
+
+    def check_container(v):
+        if not isinstance(v, origin):
+            raise ValueError(f"Expected {origin.__name__}, got {v!r}.")
+        if c is not None:
+            for x in v.values() if origin is dict else v:
+                c(x)
+
+    return check_container
+
+
+def _generate_dataclass_validator(T: type) -> Callable[[Any], None]:
+    fields = dataclasses.fields(T)
+    hints = typing.get_type_hints(T)
+    ns: Dict[str, object] = {"cls": T}
+    lines = [
+        "def validate(ob):",
+        "    if not isinstance(ob, cls):",
+        f"        raise ValueError('Expected {T.__name__}, got %r.' % (ob,))",
+    ]
+    for i, f in enumerate(fields):
+        FT = hints.get(f.name, f.type)
+        if FT is float:
+            classes = "(float, int)"
+        elif FT in _IDENTITY or FT is np.ndarray:
+            ns[f"T{i}"] = FT
+            classes = f"T{i}"
+        else:
+            c = _validator(FT)
+            if c is not None:
+                ns[f"c{i}"] = c
+                lines.append(f"    c{i}(ob.{f.name})")
+            continue
+        lines.append(f"    if not isinstance(ob.{f.name}, {classes}):")
+        msg = f"{T.__name__}.{f.name}: expected {getattr(FT, '__name__', FT)}, got %r."
+        lines.append(f"        raise ValueError({msg!r} % (ob.{f.name},))")
+    post_init = getattr(T, "__post_init__", None)
+    if post_init is not None:
+        # The checks specific to the class.
+        ns["post_init"] = post_init
+        lines.append("    post_init(ob)")
+    else:
+        lines.append("    pass")
+    exec("\n".join(lines), ns)
+    validate = ns["validate"]
+    validate.__qualname__ = f"validate_{T.__name__}"
+    return validate
+
+
+def validator_for(T: Type[X]) -> Callable[[X], None]:
+    """
+    Returns a function that checks an instance of the dataclass T (recursively):
+    the types of the fields and the checks in ``__post_init__``.
+    It raises ValueError if the object is not valid.
+
+    The function is generated once per class. Fields typed as Any are not checked.
+    """
+    if not dataclasses.is_dataclass(T):
+        raise ValueError(f"Expected a dataclass, got {T!r}")
+    return _validator(T)
+
+
+def object_from_ipce_fast(ipce: dict, T: Type[X], trusted: bool = False) -> X:
+    """
+    Like ``object_from_ipce(ipce, T)`` for a dataclass T, using the generated decoder.
+
+    trusted: If True, the object is not validated (see validator_for()).
+    """
+    ob = decoder_for(T)(ipce)
+    if not trusted:
+        validator_for(T)(ob)
+    return ob
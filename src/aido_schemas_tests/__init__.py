@@ -1 +1,22 @@
 from .protocols_test import *
+from .images_test import *
+from .state_arrays_test import *
+from .state_delta_test import *
+from .map_cache_test import *
+from .utils_test import *
+from .tracing_test import *
+from .import_time_test import *
+from .automata_test import *
+from .validation_test import *
+from .slotted_test import *
+from .packed_test import *
+from .memo_test import *
+from .serialization_benchmark_test import *
+from .frame_pool_test import *
+from .pipeline_test import *
+from .backpressure_test import *
+from .async_node_test import *
+from .deadline_test import *
+from .multi_agent_test import *
+from .batch_agent_test import *
+from .load_generator_test import *
@@ -0,0 +1,149 @@
+import asyncio
+import threading
+import time
+
+from aido_schemas import (
+    AsyncNodeAdapter,
+    EpisodeStart,
+    GetCommands,
+    protocol_agent_DB20,
+    protocol_simulator_DB20,
+)
+from .helpers import FakeContext
+
+
+class SlowAgent:
+    """Its "commands" are the number of the last observation processed."""
+
+    def __init__(self):
+        self.processed = []
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    async def init(self, context):
+        self.initialized = True
+
+    async def on_received_episode_start(self, context, data: EpisodeStart):
+        self.episode = data.episode_name
+
+    async def on_received_observations(self, context, data):
+        self.started.set()
+        # perception in a thread, leaving the loop free
+        await context.run_in_executor(self.release.wait, 5)
+        self.processed.append(data)
+        context.write("commands", (self.episode, data))
+
+    async def finish(self, context):
+        self.finished = True
+
+
+def wait_until(condition):
+    t0 = time.time()
+    while not condition():
+        assert time.time() - t0 < 5
+        time.sleep(0.001)
+
+
+def test_async_node_freshest_commands():
+    node = SlowAgent()
+    adapter = AsyncNodeAdapter(node, protocol_agent_DB20)
+    context = FakeContext()
+    adapter.init(context)
+    assert node.initialized
+
+    adapter.on_received_episode_start(context, EpisodeStart("e1"))
+    adapter.on_received_observations(context, 0)
+    assert node.started.wait(5)
+    # the wrapper is not blocked by the node
+    for i in range(1, 5):
+        adapter.on_received_observations(context, i)
+    node.release.set()
+    adapter.on_received_get_commands(context, GetCommands(0.0))
+    # observation 0 was being processed; 1..3 were superseded by 4
+    wait_until(lambda: node.processed == [0, 4])
+    adapter.on_received_get_commands(context, GetCommands(0.1))
+    assert context.written[-1] == ("commands", ("e1", 4))
+
+    # a new episode forgets the old commands
+    node.release.clear()
+    adapter.on_received_episode_start(context, EpisodeStart("e2"))
+    adapter.on_received_observations(context, 5)
+    threading.Timer(0.05, node.release.set).start()
+    adapter.on_received_get_commands(context, GetCommands(0.0))
+    assert context.written[-1] == ("commands", ("e2", 5))
+
+    adapter.finish(context)
+    assert node.finished
+
+
+class FailingAgent:
+    async def on_received_observations(self, context, data):
+        await asyncio.sleep(0)
+        raise ValueError(data)
+
+
+def test_async_node_errors():
+    adapter = AsyncNodeAdapter(FailingAgent(), protocol_agent_DB20)
+    context = FakeContext()
+    adapter.init(context)
+    adapter.on_received_observations(context, 1)
+    try:
+        adapter.on_received_get_commands(context, GetCommands(0.0))
+    except Exception as e:
+        assert isinstance(e.__cause__, ValueError)
+    else:
+        raise Exception()
+    # the error is raised again at the end
+    try:
+        adapter.finish(context)
+    except Exception as e:
+        assert isinstance(e.__cause__, ValueError)
+    else:
+        raise Exception()
+
+
+class AsyncSimulator:
+    """Answers "get_robot_observations" like a simulator, with an output that is not a reply."""
+
+    def __init__(self):
+        self.t = 0.0
+
+    async def on_received_step(self, context, data):
+        await asyncio.sleep(0.01)
+        self.t = data
+
+    async def on_received_get_robot_observations(self, context, data):
+        await asyncio.sleep(0.01)
+        context.write("robot_observations", (data, self.t), with_schema=True)
+
+
+def test_async_node_forwards_outputs():
+    adapter = AsyncNodeAdapter(AsyncSimulator(), protocol_simulator_DB20, replies={}, queues={})
+    context = FakeContext()
+    adapter.init(context)
+    for i in range(3):
+        adapter.on_received_step(context, float(i))
+        adapter.on_received_get_robot_observations(context, "ego")
+        # written in the wrapper's thread, right after the request
+        assert context.written == [("robot_observations", ("ego", float(_))) for _ in range(i + 1)]
+    adapter.finish(context)
+
+
+class SilentAgent:
+    async def on_received_observations(self, context, data):
+        await asyncio.sleep(0.01)
+
+
+def test_async_node_missing_reply():
+    adapter = AsyncNodeAdapter(SilentAgent(), protocol_agent_DB20)
+    context = FakeContext()
+    adapter.init(context)
+    adapter.on_received_episode_start(context, EpisodeStart("e1"))
+    adapter.on_received_observations(context, 1)
+    try:
+        adapter.on_received_get_commands(context, GetCommands(0.0))
+    except Exception as e:
+        assert "commands" in str(e)
+    else:
+        raise Exception()
+    adapter.finish(context)
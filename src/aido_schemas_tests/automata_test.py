@@ -0,0 +1,57 @@
+import os
+import random
+import tempfile
+
+from zuper_nodes import InputReceived, LanguageChecker, OutputProduced
+
+from aido_schemas import (
+    AutomatonChecker,
+    compile_language,
+    protocol_agent,
+    protocol_image_source,
+    protocol_simulator,
+)
+
+
+def random_walk(protocol, checker, rng: random.Random, n: int):
+    """Random sequences, biased towards the events that are allowed."""
+    events = [InputReceived(_) for _ in protocol.inputs] + [OutputProduced(_) for _ in protocol.outputs]
+    seq = []
+    for i in range(n):
+        expected = checker.get_expected_events()
+        if expected and rng.random() < 0.95:
+            kind, channel = rng.choice(sorted(expected))
+            e = InputReceived(channel) if kind == "in" else OutputProduced(channel)
+        else:
+            e = rng.choice(events)
+        seq.append(e)
+        checker.push(e)
+    return seq
+
+
+def test_automaton_same_as_language_checker():
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as d:
+        for protocol in [protocol_agent, protocol_simulator, protocol_image_source]:
+            automaton = compile_language(protocol.language, cache_dir=d)
+            for _ in range(50):
+                seq = random_walk(protocol, AutomatonChecker(automaton), rng, 30)
+                pc = LanguageChecker(protocol.interaction)
+                ac = AutomatonChecker(automaton)
+                assert type(pc.finish()) == type(ac.finish())
+                for e in seq:
+                    assert type(pc.push(e)) == type(ac.push(e)), (protocol.language, seq)
+
+
+def test_automaton_disk_cache():
+    language = "in:a ; (in:b | (in:c ; out:d))* ; in:e?"
+    with tempfile.TemporaryDirectory() as d:
+        a1 = compile_language(language, cache_dir=d)
+        files = os.listdir(d)
+        assert len(files) == 1
+        from aido_schemas import automata
+
+        automata._compiled.clear()
+        a2 = compile_language(language, cache_dir=d)
+        assert a2 is not a1
+        assert a2 == a1
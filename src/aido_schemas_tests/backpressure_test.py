@@ -0,0 +1,95 @@
+import time
+
+from aido_schemas import (
+    DROP_OLDEST,
+    JPGImage,
+    KEEP_LATEST,
+    parse_queue_policies,
+    Pipeline,
+    PipelineStage,
+    protocol_image_filter,
+    protocol_image_source,
+    QueuePolicy,
+    relay,
+    TopicQueue,
+)
+from .pipeline_test import Filter, Source
+
+
+def test_topic_queue_drop_oldest():
+    q = TopicQueue({"image": QueuePolicy(DROP_OLDEST, 2)})
+    q.put("episode_start", "e1")
+    for i in range(5):
+        q.put("image", i)
+    q.put("episode_start", "e2")
+    q.put("image", 5)
+    got = []
+    while len(q):
+        got.append(q.get())
+        q.task_done()
+    # the episode starts are never dropped, and the order is kept
+    assert got == [("episode_start", "e1"), ("image", 4), ("episode_start", "e2"), ("image", 5)], got
+    assert q.stats() == {
+        "episode_start": {"received": 2, "dropped": 0},
+        "image": {"received": 6, "dropped": 4},
+    }
+    q.join()
+
+
+def test_parse_queue_policies():
+    p = parse_queue_policies("image:drop-oldest:4, observations:keep-latest")
+    assert p == {"image": QueuePolicy(DROP_OLDEST, 4), "observations": QueuePolicy(KEEP_LATEST, 1)}
+
+
+def test_relay_slow_consumer():
+    messages = [{"topic": "episode_start"}] + [{"topic": "image", "data": i} for i in range(50)]
+
+    def produce():
+        for m in messages:
+            time.sleep(0.0005)
+            yield m
+
+    written = []
+
+    def write(m):
+        time.sleep(0.005)
+        written.append(m)
+
+    stats = relay(produce(), write, {"image": QueuePolicy(KEEP_LATEST)})
+    assert written[0] == {"topic": "episode_start"}
+    # the last image is always delivered
+    assert written[-1] == messages[-1]
+    assert stats["image"]["dropped"] > 0
+    assert stats["image"]["dropped"] + len(written) - 1 == 50
+
+
+class SlowFilter(Filter):
+    def on_received_image(self, context, data: JPGImage):
+        time.sleep(0.005)
+        context.write("image", data)
+
+
+def test_pipeline_with_queues():
+    outputs = []
+    source = Source(nimages=50)
+    stages = [
+        PipelineStage("source", source, protocol_image_source),
+        PipelineStage("filter0", SlowFilter(), protocol_image_filter),
+        PipelineStage("filter1", Filter(), protocol_image_filter),
+    ]
+    sink = lambda topic, data, timing: outputs.append((topic, data))
+    pipeline = Pipeline(stages, sink, queues={"image": QueuePolicy(KEEP_LATEST)})
+    pipeline.init()
+    pipeline.write("next_episode")
+    # the last one gives no_more_images, which filter0 does not take
+    for _ in range(51):
+        pipeline.write("next_image")
+    pipeline.finish()
+
+    images = [data for topic, data in outputs if topic == "image"]
+    assert outputs[0][0] == "episode_start"
+    assert outputs[-1] == ("no_more_images", None), outputs[-1]
+    assert images[-1] is source.sent[-1]
+    stats = pipeline.queue_stats()
+    assert stats["filter0"]["image"]["dropped"] + len(images) == 50
+    assert stats["filter0"]["image"]["dropped"] > 0
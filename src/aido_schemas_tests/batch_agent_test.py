@@ -0,0 +1,131 @@
+import numpy as np
+
+from aido_schemas import (
+    BatchAgent,
+    BatchAgentAdapter,
+    commands_batch_from_commands,
+    commands_from_commands_batch,
+    DB20CommandsBatchArrays,
+    DB20Observations,
+    DB20ObservationsBatchArrays,
+    DB20ObservationsRaw,
+    DB20Odometry,
+    DB20RobotObservationsBatch,
+    EpisodeStart,
+    GetCommands,
+    JPGImage,
+    MultiAgentEpisodeStart,
+    MultiAgentGetCommands,
+    observations_batch_from_observations,
+    observations_from_observations_batch,
+    PWMCommands,
+    raw_image_from_array,
+    RGB,
+)
+from .helpers import FakeContext, make_commands
+
+
+def test_observations_batch_roundtrip():
+    rng = np.random.RandomState(0)
+    frames = rng.randint(0, 255, (3, 4, 6, 3)).astype("uint8")
+    observations = {
+        f"r{i}": DB20ObservationsRaw(raw_image_from_array(frames[i]), DB20Odometry(0.1, i, -i))
+        for i in range(3)
+    }
+    b = observations_batch_from_observations(observations)
+    assert b.robot_names == ["r0", "r1", "r2"]
+    assert b.images.shape == (3, 4, 6, 3)
+    np.testing.assert_array_equal(b.images, frames)
+    np.testing.assert_array_equal(b.odometry[:, 1], [0, 1, 2])
+    assert observations_from_observations_batch(b) == observations
+
+    # JPG frames go through the decoder
+    jpgs = {"r0": DB20Observations(JPGImage(b"r0"), DB20Odometry(0.1, 0.0, 0.0))}
+    b = observations_batch_from_observations(jpgs, decode_jpg=lambda _: frames[0])
+    np.testing.assert_array_equal(b.images[0], frames[0])
+    encoded = observations_from_observations_batch(b, encode_jpg=lambda _: b"r0")
+    assert encoded == jpgs
+    b = observations_batch_from_observations(jpgs, with_images=False)
+    assert b.images is None
+
+
+def test_commands_batch_roundtrip():
+    commands = {"r0": make_commands(0.1, 0.2), "r1": make_commands(0.3, 0.4)}
+    commands["r1"].LEDS.back_right = RGB(1.0, 0.0, 0.0)
+    b = commands_batch_from_commands(commands)
+    np.testing.assert_array_equal(b.pwm, [[0.1, 0.2], [0.3, 0.4]])
+    np.testing.assert_array_equal(b.leds[:, 4], [[0, 0, 0], [1, 0, 0]])
+    assert commands_from_commands_batch(b) == commands
+
+    try:
+        commands_from_commands_batch(DB20CommandsBatchArrays(["r0"], np.zeros((2, 2)), np.zeros((2, 5, 3))))
+    except ValueError:
+        pass
+    else:
+        raise Exception()
+
+
+class MeanBrightnessAgent(BatchAgent):
+    """Both motors at the mean brightness of the frame; one call for all the robots."""
+
+    def __init__(self):
+        self.calls = []
+        self.episodes = []
+        self.seeds = []
+
+    def seed(self, seed: int):
+        self.seeds.append(seed)
+
+    def episode_start(self, robot_name: str, data: EpisodeStart):
+        self.episodes.append((robot_name, data.episode_name))
+
+    def get_commands_batch(self, observations: DB20ObservationsBatchArrays, request: GetCommands):
+        self.calls.append(observations.robot_names)
+        n = len(observations.robot_names)
+        v = observations.images.reshape((n, -1)).mean(axis=1) / 255.0
+        return DB20CommandsBatchArrays(
+            observations.robot_names, np.stack([v, v], axis=1), np.zeros((n, 5, 3))
+        )
+
+
+def decode_fill(jpg_data: bytes) -> np.ndarray:
+    # a frame filled with the first byte of the "JPG"
+    return np.full((4, 6, 3), jpg_data[0], dtype="uint8")
+
+
+def test_batch_agent_adapter():
+    agent = MeanBrightnessAgent()
+    host = BatchAgentAdapter(agent, decode_jpg=decode_fill).host()
+    context = FakeContext()
+    host.init(context)
+    host.on_received_seed(42)
+    host.on_received_episode_start(context, MultiAgentEpisodeStart("e1", ["r0", "r1", "r2"]))
+    assert agent.episodes == [("r0", "e1"), ("r1", "e1"), ("r2", "e1")]
+    assert agent.seeds == [42]
+
+    odometry = DB20Odometry(0.1, 0.0, 0.0)
+    observations = {
+        k: DB20Observations(JPGImage(bytes([v])), odometry) for k, v in {"r0": 0, "r2": 255}.items()
+    }
+    host.on_received_observations(DB20RobotObservationsBatch(0.0, observations))
+    host.on_received_get_commands(context, MultiAgentGetCommands(0.1, ["r0", "r1", "r2"]))
+    assert agent.calls == [["r0", "r2"]]
+    commands = context.written[-1][1].commands
+    assert list(commands) == ["r0", "r1", "r2"]
+    assert commands["r0"].wheels == PWMCommands(0.0, 0.0)
+    assert commands["r2"].wheels == PWMCommands(1.0, 1.0)
+    # no observations yet: stopped
+    assert commands["r1"] == BatchAgentAdapter(agent).safe_default
+    host.finish(context)
+
+
+def test_batch_agent_abstract():
+    class NoCommands(BatchAgent):
+        pass
+
+    try:
+        NoCommands()
+    except TypeError:
+        pass
+    else:
+        raise Exception()
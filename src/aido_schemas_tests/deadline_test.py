@@ -0,0 +1,82 @@
+import threading
+import time
+
+from aido_schemas import DeadlineGuard, GetCommands, protocol_agent
+from zuper_ipce import ipce_from_object, object_from_ipce
+
+
+def test_deadline_in_time():
+    guard = DeadlineGuard("stop", default_deadline=1.0)
+    assert guard.get(lambda: "fast") == "fast"
+    assert guard.last == "fast"
+    assert guard.report() == {"requests": 1, "deadline_misses": 0, "fallbacks_default": 0}
+    guard.close()
+
+
+def test_deadline_fallback():
+    guard = DeadlineGuard("stop")
+    release = threading.Event()
+
+    def slow():
+        release.wait(5)
+        return "slow"
+
+    # nothing computed yet: the safe default
+    assert guard.get(slow, deadline=0.01) == "stop"
+    # still running: no new computation is started
+    assert guard.get(lambda: "other", deadline=0.0) == "stop"
+    release.set()
+    # the late result is used as the last commands
+    t0 = time.time()
+    while guard.last is None:
+        assert time.time() - t0 < 5
+        time.sleep(0.001)
+    assert guard.last == "slow"
+    release.clear()
+    threading.Timer(0.5, release.set).start()
+    assert guard.get(slow, deadline=0.01) == "slow"
+    assert guard.report() == {"requests": 3, "deadline_misses": 3, "fallbacks_default": 2}
+
+    # a new episode starts from the safe default again
+    guard.start_episode()
+    assert guard.get(lambda: "new", deadline=0.0) == "stop"
+    guard.close()
+
+
+def test_deadline_errors():
+    guard = DeadlineGuard("stop")
+
+    def fail():
+        raise ValueError()
+
+    try:
+        guard.get(fail, deadline=1.0)
+    except ValueError:
+        pass
+    else:
+        raise Exception()
+
+    release = threading.Event()
+
+    def fail_late():
+        release.wait(5)
+        raise ValueError()
+
+    assert guard.get(fail_late, deadline=0.0) == "stop"
+    release.set()
+    # raised at the next request
+    try:
+        guard.close()
+    except Exception as e:
+        assert isinstance(e.__cause__, ValueError)
+    else:
+        raise Exception()
+
+
+def test_get_commands_deadline_compatible():
+    # messages without a deadline are still accepted
+    ob = object_from_ipce({"at_time": 1.0}, GetCommands)
+    assert ob.deadline is None
+    ob = GetCommands(1.0, deadline=0.05)
+    assert object_from_ipce(ipce_from_object(ob), GetCommands) == ob
+    assert protocol_agent.inputs["get_commands"] is GetCommands
@@ -0,0 +1,51 @@
+import threading
+import time
+
+from aido_schemas import FramePool
+
+
+def test_frame_pool_ring():
+    made = []
+
+    def make(i: int) -> bytes:
+        made.append(i)
+        return b"frame%d" % i
+
+    pool = FramePool(make, size=3)
+    assert made == [0, 1, 2]
+    assert pool.ready() == 3
+    got = [pool.get() for _ in range(7)]
+    assert got == [b"frame0", b"frame1", b"frame2"] * 2 + [b"frame0"]
+    # computed only once
+    assert made == [0, 1, 2]
+
+    pool.close()
+    try:
+        pool.get()
+    except ValueError:
+        pass
+    else:
+        raise Exception()
+
+
+def test_frame_pool_background():
+    started = threading.Event()
+    release = threading.Event()
+
+    def make(i: int) -> int:
+        if i == 1:
+            started.set()
+            release.wait(5)
+        return i
+
+    pool = FramePool(make, size=4, nthreads=2)
+    assert started.wait(5)
+    # the first value does not wait for the others
+    assert pool.get() == 0
+    assert pool.ready() < 4
+    threading.Timer(0.05, release.set).start()
+    t0 = time.time()
+    assert pool.get() == 1
+    assert time.time() - t0 >= 0.04
+    assert [pool.get() for _ in range(3)] == [2, 3, 0]
+    assert pool.ready() == 4
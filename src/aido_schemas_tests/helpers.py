@@ -0,0 +1,24 @@
+from typing import Optional
+
+from aido_schemas import DB20Commands, LEDSCommands, PWMCommands, RGB
+
+
+class FakeContext:
+    """Records what a node writes, in place of the Context of the node wrapper."""
+
+    def __init__(self):
+        self.written = []
+
+    def write(self, topic, data, timing=None, with_schema=False):
+        self.written.append((topic, data))
+
+    def info(self, msg: str):
+        pass
+
+
+def make_commands(left: float, right: Optional[float] = None) -> DB20Commands:
+    """The commands with these PWM values (by default the same for both motors) and the LEDs off."""
+    if right is None:
+        right = left
+    grey = RGB(0.0, 0.0, 0.0)
+    return DB20Commands(PWMCommands(left, right), LEDSCommands(grey, grey, grey, grey, grey))
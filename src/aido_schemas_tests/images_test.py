@@ -0,0 +1,114 @@
+import numpy as np
+from zuper_ipce import ipce_from_object, object_from_ipce
+
+from aido_schemas import (
+    apply_camera_configuration,
+    array_from_raw_image,
+    camera_encodings,
+    CameraConfigurationRequest,
+    DB20ObservationsRaw,
+    DB20Odometry,
+    IMAGE_ENCODING_JPG,
+    IMAGE_ENCODING_RAW,
+    negotiate_camera_configuration,
+    protocol_simulator,
+    protocol_simulator_DB20,
+    protocol_simulator_DB20_raw,
+    protocol_simulator_DB20_timestamps,
+    raw_image_from_array,
+    RegionOfInterest,
+)
+
+
+def test_raw_image_roundtrip():
+    a = (128 + np.random.randn(48, 64, 3) * 60).astype("uint8")
+    camera = raw_image_from_array(a)
+    odometry = DB20Odometry(resolution_rad=0.1, axis_left_rad=0.0, axis_right_rad=0.0)
+    obs = DB20ObservationsRaw(camera=camera, odometry=odometry)
+
+    ipce = ipce_from_object(obs)
+    obs2 = object_from_ipce(ipce, DB20ObservationsRaw)
+    b = array_from_raw_image(obs2.camera)
+    assert b.shape == a.shape
+    assert b.dtype == a.dtype
+    assert np.array_equal(a, b)
+
+
+def test_raw_image_no_copy():
+    a = np.arange(12, dtype="float32").reshape((2, 2, 3))
+    image = raw_image_from_array(a[:, ::-1])
+    b = array_from_raw_image(image)
+    # a view whose memory is owned by the bytes of the image
+    base = b
+    while isinstance(base, np.ndarray):
+        base = base.base
+    assert base is image.data
+    assert not b.flags.writeable
+    assert np.array_equal(b, a[:, ::-1])
+
+
+def test_negotiate_roi_clamped():
+    roi = RegionOfInterest(x=-10, y=400, width=100, height=200)
+    request = CameraConfigurationRequest("ego", IMAGE_ENCODING_RAW, roi=roi, resolution=(1000, 50))
+    config = negotiate_camera_configuration(request, (480, 640), [IMAGE_ENCODING_RAW])
+    # clipped to the frame, and no larger than the region
+    assert config.roi == RegionOfInterest(x=0, y=400, width=90, height=80)
+    assert config.resolution == (80, 50)
+    assert config.encoding == IMAGE_ENCODING_RAW
+    assert config.jpg_quality is None
+
+    # a region outside of the frame keeps at least one pixel
+    roi = RegionOfInterest(x=1000, y=1000, width=10, height=10)
+    request = CameraConfigurationRequest("ego", IMAGE_ENCODING_RAW, roi=roi)
+    config = negotiate_camera_configuration(request, (480, 640), [IMAGE_ENCODING_RAW])
+    assert config.roi == RegionOfInterest(x=639, y=479, width=1, height=1)
+    assert config.resolution == (1, 1)
+
+
+def test_camera_encodings():
+    assert camera_encodings(protocol_simulator_DB20) == [IMAGE_ENCODING_JPG]
+    assert camera_encodings(protocol_simulator_DB20_timestamps) == [IMAGE_ENCODING_JPG]
+    assert camera_encodings(protocol_simulator_DB20_raw) == [IMAGE_ENCODING_RAW]
+    # the observations are not typed
+    assert camera_encodings(protocol_simulator) == [IMAGE_ENCODING_JPG, IMAGE_ENCODING_RAW]
+
+
+def test_negotiate_encoding_fallback():
+    # a simulator for protocol_simulator_DB20 cannot send raw images
+    encodings = camera_encodings(protocol_simulator_DB20)
+    for encoding in (IMAGE_ENCODING_RAW, "png"):
+        request = CameraConfigurationRequest("ego", encoding)
+        config = negotiate_camera_configuration(request, (480, 640), encodings)
+        assert config.encoding == IMAGE_ENCODING_JPG
+        assert config.jpg_quality == 95
+        assert config.resolution == (480, 640)
+        assert config.roi is None
+
+    request = CameraConfigurationRequest("ego", IMAGE_ENCODING_JPG, jpg_quality=150)
+    config = negotiate_camera_configuration(request, (480, 640), encodings)
+    assert config.jpg_quality == 100
+
+    # and one for protocol_simulator_DB20_raw cannot send JPGs
+    encodings = camera_encodings(protocol_simulator_DB20_raw)
+    request = CameraConfigurationRequest("ego", IMAGE_ENCODING_JPG)
+    config = negotiate_camera_configuration(request, (480, 640), encodings)
+    assert config.encoding == IMAGE_ENCODING_RAW
+    assert config.jpg_quality is None
+
+
+def test_apply_camera_configuration():
+    a = np.arange(480 * 640 * 3, dtype="uint32").reshape((480, 640, 3))
+    roi = RegionOfInterest(x=100, y=40, width=200, height=120)
+    request = CameraConfigurationRequest("ego", IMAGE_ENCODING_RAW, roi=roi)
+    config = negotiate_camera_configuration(request, a.shape[:2], [IMAGE_ENCODING_RAW])
+    b = apply_camera_configuration(a, config)
+    # cropping only: a view
+    assert np.shares_memory(a, b)
+    assert np.array_equal(b, a[40:160, 100:300])
+
+    request = CameraConfigurationRequest("ego", IMAGE_ENCODING_RAW, roi=roi, resolution=(30, 50))
+    config = negotiate_camera_configuration(request, a.shape[:2], [IMAGE_ENCODING_RAW])
+    c = apply_camera_configuration(a, config)
+    # decimation by 4 along both axes
+    assert c.shape == (30, 50, 3)
+    assert np.array_equal(c, a[40:160:4, 100:300:4])
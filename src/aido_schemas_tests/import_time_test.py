@@ -0,0 +1,40 @@
+import json
+import subprocess
+import sys
+
+from zuper_commons.logs import ZLogger
+
+logger = ZLogger(__name__)
+
+SCRIPT = """
+import json, sys, time
+t0 = time.perf_counter()
+import aido_schemas
+dt = time.perf_counter() - t0
+heavy = sorted(m for m in sys.modules if m.split(".")[0] in ("zuper_nodes", "zuper_nodes_wrapper"))
+protocols = ("protocol_agent", "protocol_simulator", "protocol_agent_DB20")
+built = [k for k in protocols if k in vars(aido_schemas)]
+t0 = time.perf_counter()
+aido_schemas.protocol_simulator_DB20
+dt_protocol = time.perf_counter() - t0
+print(json.dumps(dict(dt=dt, dt_protocol=dt_protocol, heavy=heavy, built=built)))
+"""
+
+
+def measure_import() -> dict:
+    # a fresh interpreter each time, so that nothing is cached in sys.modules
+    res = subprocess.run([sys.executable, "-c", SCRIPT], check=True, capture_output=True, text=True)
+    return json.loads(res.stdout.strip().splitlines()[-1])
+
+
+def test_import_is_lazy():
+    r = measure_import()
+    assert r["heavy"] == [], r
+    assert r["built"] == [], r
+
+
+def test_import_time_benchmark():
+    runs = [measure_import() for _ in range(3)]
+    dt = sorted(_["dt"] for _ in runs)[1]
+    dt_protocol = sorted(_["dt_protocol"] for _ in runs)[1]
+    logger.info(f"import aido_schemas: {dt * 1000:.0f} ms; first protocol: {dt_protocol * 1000:.0f} ms")
@@ -0,0 +1,82 @@
+import importlib.util
+import os
+import time
+
+from aido_schemas import (
+    DB20Commands,
+    LEDSCommands,
+    Pipeline,
+    PipelineStage,
+    protocol_agent_DB20,
+    PWMCommands,
+    RGB,
+)
+
+
+def load_generator_module():
+    # the load generator is a script of the minimal nodes, not part of the package
+    fn = os.path.join(
+        os.path.dirname(__file__), "..", "..", "minimal-nodes-stubs", "load_generator", "load_generator.py"
+    )
+    spec = importlib.util.spec_from_file_location("load_generator", fn)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class InProcessInterface:
+    """Plays the part of ComponentInterface for an agent run in a Pipeline."""
+
+    def __init__(self, agent):
+        self.replies = []
+        self.pipeline = Pipeline(
+            [PipelineStage("agent", agent, protocol_agent_DB20)],
+            lambda topic, data, timing: self.replies.append(topic),
+        )
+        self.pipeline.init()
+
+    def write_topic_and_expect_zero(self, topic, data=None, **kwargs):
+        self.pipeline.write(topic, data)
+        assert self.replies == [], self.replies
+
+    def write_topic_and_expect(self, topic, data=None, expect=None, **kwargs):
+        self.pipeline.write(topic, data)
+        replies, self.replies = self.replies, []
+        assert replies == [expect], replies
+
+
+class Agent:
+    def __init__(self, delay: float):
+        self.delay = delay
+
+    def on_received_get_commands(self, context, data):
+        time.sleep(self.delay)
+        grey = RGB(0.0, 0.0, 0.0)
+        context.write(
+            "commands", DB20Commands(PWMCommands(0.0, 0.0), LEDSCommands(grey, grey, grey, grey, grey))
+        )
+
+
+def test_load_generator():
+    lg = load_generator_module()
+    # a few misses are tolerated, as the machine running the tests may be busy
+    config = lg.LoadGeneratorConfig(commands_rate=[20.0, 50.0], duration=0.5, max_miss_ratio=0.1)
+
+    # fast enough for both rates
+    report = lg.LoadGenerator(config, InProcessInterface(Agent(0.0)), jpg_data=b"jpg").run()
+    assert report["max_sustained_rate"] == 50.0
+    for episode, rate in zip(report["episodes"], config.commands_rate):
+        n = rate * config.duration
+        assert n - 2 <= episode["commands_received"] <= n + 1, episode
+        assert n - 2 <= episode["observations_sent"] <= n + 1, episode
+        assert abs(episode["commands_throughput"] - rate) < 0.2 * rate, episode
+        assert episode["miss_ratio"] <= config.max_miss_ratio, episode
+
+    # 30 ms per request: keeps up with 20 Hz, but not with 50 Hz
+    report = lg.LoadGenerator(config, InProcessInterface(Agent(0.03)), jpg_data=b"jpg").run()
+    assert report["max_sustained_rate"] == 20.0
+    slow = report["episodes"][1]
+    assert slow["deadline_misses"] == slow["commands_received"] > 0, slow
+    assert slow["skipped"] > 0, slow
+    assert slow["miss_ratio"] == 1.0
+    assert slow["commands_throughput"] < 0.7 * 50.0, slow
@@ -0,0 +1,56 @@
+from aido_schemas import map_digest, MapCache, MapCacheMiss, MapSender
+
+
+def test_map_cache_bounded():
+    cache = MapCache(max_entries=2)
+    d1 = cache.put("map1")
+    d2 = cache.put("map2")
+    assert cache.get(d1) == "map1"
+    cache.put("map3")
+    # map2 was the least recently used
+    assert d1 in cache
+    assert d2 not in cache
+    assert len(cache) == 2
+    try:
+        cache.get(d2)
+    except MapCacheMiss:
+        pass
+    else:
+        raise Exception()
+
+
+def test_map_sender():
+    sender = MapSender()
+    cache = MapCache()
+    digest, map_data = sender.prepare("map1")
+    assert digest == map_digest("map1")
+    assert cache.resolve(digest, map_data) == "map1"
+    digest, map_data = sender.prepare("map1")
+    assert map_data is None
+    assert cache.resolve(digest, map_data) == "map1"
+
+
+def test_map_sender_follows_evictions():
+    sender = MapSender(max_entries=3)
+    cache = MapCache(max_entries=3)
+    maps = [f"map{i}" for i in range(5)]
+    # more maps than entries, in an order that evicts recently sent ones
+    sequence = maps + [maps[0], maps[4], maps[1], maps[3], maps[0], maps[2]] * 3
+    resent = 0
+    for m in sequence:
+        digest, map_data = sender.prepare(m)
+        resent += map_data is not None
+        assert cache.resolve(digest, map_data) == m
+        assert list(sender.sent) == list(cache.maps)
+    assert resent > len(maps)
+
+
+def test_map_cache_checks_digest():
+    cache = MapCache()
+    try:
+        cache.resolve(map_digest("map1"), "map2")
+    except ValueError:
+        pass
+    else:
+        raise Exception()
+    assert len(cache) == 0
@@ -0,0 +1,30 @@
+from aido_schemas import CommandsDeduplicator, DB20CommandsSlotted, Interner
+from .helpers import make_commands
+
+
+def test_interner_and_dedup():
+    interner = Interner(max_entries=2)
+    a = interner.intern(make_commands(0.1))
+    assert interner.intern(make_commands(0.1)) is a
+    interner.intern(make_commands(0.2))
+    interner.intern(make_commands(0.3))
+    b = interner.intern(make_commands(0.1))
+    assert b is not a
+    # the shared instances cannot be changed
+    assert isinstance(b, DB20CommandsSlotted)
+    assert interner.intern(b) is b
+
+    dedup = CommandsDeduplicator()
+    assert not dedup.unchanged("r", make_commands(0.1))
+    assert dedup.unchanged("r", make_commands(0.1))
+    assert not dedup.unchanged("r2", make_commands(0.1))
+    assert not dedup.unchanged("r", make_commands(0.2))
+    dedup.reset()
+    assert not dedup.unchanged("r", make_commands(0.2))
+    assert dedup.unchanged_count == 1
+    # changed in place
+    commands = make_commands(0.3)
+    assert not dedup.unchanged("r", commands)
+    commands.wheels.motor_left = 0.4
+    assert not dedup.unchanged("r", commands)
+    assert dedup.unchanged("r", commands)
@@ -0,0 +1,140 @@
+import threading
+import time
+
+from aido_schemas import (
+    DB20Commands,
+    DB20Observations,
+    DB20Odometry,
+    DB20RobotObservationsBatch,
+    DeadlineGuard,
+    EpisodeStart,
+    GetCommands,
+    JPGImage,
+    MultiAgentEpisodeStart,
+    MultiAgentGetCommands,
+    MultiAgentHost,
+)
+from .helpers import FakeContext, make_commands
+
+
+class CountingAgent:
+    """Its speed is a tenth of the number of observations received."""
+
+    created = []
+
+    def __init__(self, robot_name: str):
+        self.robot_name = robot_name
+        self.n = 0
+        self.created.append(robot_name)
+
+    def on_received_seed(self, data: int):
+        self.seed = data
+
+    def on_received_episode_start(self, data: EpisodeStart):
+        self.episode = data.episode_name
+        self.n = 0
+
+    def on_received_observations(self, data: DB20Observations):
+        self.n += 1
+
+    def on_received_get_commands(self, context, data: GetCommands):
+        context.write("commands", make_commands(self.n / 10))
+
+    def finish(self):
+        self.finished = True
+
+
+def observations(*robot_names: str) -> DB20RobotObservationsBatch:
+    obs = DB20Observations(JPGImage(b""), DB20Odometry(0.1, 0.0, 0.0))
+    return DB20RobotObservationsBatch(0.0, {_: obs for _ in robot_names})
+
+
+def test_multi_agent_host():
+    CountingAgent.created = []
+    host = MultiAgentHost(CountingAgent)
+    context = FakeContext()
+    host.init(context)
+    host.on_received_seed(42)
+    host.on_received_episode_start(context, MultiAgentEpisodeStart("e1", ["r1", "r2"]))
+    host.on_received_observations(observations("r1", "r2"))
+    host.on_received_observations(observations("r1"))
+    host.on_received_get_commands(context, MultiAgentGetCommands(0.1, ["r1", "r2"]))
+    topic, data = context.written[-1]
+    assert topic == "commands"
+    assert data.commands == {"r1": make_commands(0.2), "r2": make_commands(0.1)}
+
+    # the agents are kept across episodes
+    host.on_received_episode_start(context, MultiAgentEpisodeStart("e2", ["r2", "r3"]))
+    assert CountingAgent.created == ["r1", "r2", "r3"]
+    assert host.agents["r3"].seed == 42
+    assert host.agents["r1"].episode == "e1"
+    assert host.agents["r2"].episode == "e2"
+
+    try:
+        host.on_received_observations(observations("r4"))
+    except ValueError:
+        pass
+    else:
+        raise Exception()
+
+    host.finish(context)
+    assert all(_.finished for _ in host.agents.values())
+
+
+def test_multi_agent_host_batch():
+    requests = []
+
+    def batch(agents, request: GetCommands):
+        requests.append((sorted(agents), request))
+        return {k: make_commands(v.n / 10) for k, v in agents.items()}
+
+    host = MultiAgentHost(CountingAgent, batch=batch)
+    context = FakeContext()
+    host.on_received_episode_start(context, MultiAgentEpisodeStart("e1", ["r1", "r2"]))
+    host.on_received_observations(observations("r2"))
+    host.on_received_get_commands(context, MultiAgentGetCommands(0.1, ["r1", "r2"], deadline=0.05))
+    assert requests == [(["r1", "r2"], GetCommands(0.1, deadline=0.05))]
+    assert context.written[-1][1].commands == {"r1": make_commands(0.0), "r2": make_commands(0.1)}
+    host.finish(context)
+
+
+class SlowAgent:
+    """Its computation never ends in time: it answers with the fallback after the whole deadline."""
+
+    def __init__(self, robot_name: str):
+        self.release = threading.Event()
+        self.guard = DeadlineGuard(make_commands(0.0))
+        self.deadlines = []
+
+    def on_received_episode_start(self, data: EpisodeStart):
+        self.guard.start_episode()
+
+    def on_received_get_commands(self, context, data: GetCommands):
+        self.deadlines.append(data.deadline)
+        context.write("commands", self.guard.get(self.compute, data.deadline))
+
+    def compute(self) -> DB20Commands:
+        self.release.wait(5)
+        return make_commands(0.5)
+
+    def finish(self):
+        self.release.set()
+        self.guard.close()
+
+
+def test_multi_agent_host_deadline():
+    host = MultiAgentHost(SlowAgent)
+    context = FakeContext()
+    robot_names = ["r1", "r2", "r3", "r4"]
+    host.on_received_episode_start(context, MultiAgentEpisodeStart("e1", robot_names))
+    deadline = 0.1
+    t0 = time.perf_counter()
+    host.on_received_get_commands(context, MultiAgentGetCommands(0.1, robot_names, deadline=deadline))
+    elapsed = time.perf_counter() - t0
+    # the robots share the budget of the request, rather than taking one each
+    assert elapsed < 2 * deadline, elapsed
+    assert context.written[-1][1].commands == {_: make_commands(0.0) for _ in robot_names}
+    deadlines = [host.agents[_].deadlines[0] for _ in robot_names]
+    assert deadlines[0] <= deadline
+    assert all(_ < 0.02 for _ in deadlines[1:]), deadlines
+    host.finish(context)
@@ -0,0 +1,88 @@
+import cbor2
+import numpy as np
+from zuper_ipce import IEDO, IESO, ipce_from_object, object_from_ipce
+
+from aido_schemas import (
+    array_from_raw_image,
+    DB20StepObservationsPacked,
+    DTSimCheckpointSavedPacked,
+    DTSimStateDeltaDumpPacked,
+    DTSimStateDeltaPacked,
+    DTSimStateDump,
+    DTSimStateDumpPacked,
+    pack_sim_state,
+    pack_state_delta,
+    protocol_simulator_DB20_packed,
+    raw_image_from_array,
+    SimStateDeltaDecoder,
+    SimStateDeltaEncoder,
+    unpack_sim_state,
+    unpack_state_delta,
+)
+from .state_arrays_test import assert_same_sim_state, make_sim_state
+
+
+def encoded_size(ob) -> int:
+    return len(cbor2.dumps(ipce_from_object(ob, ieso=IESO(with_schema=False))))
+
+
+def test_pack_array():
+    for a in [np.random.randn(3, 3), np.arange(10, dtype=">i4"), np.zeros((2, 0)), np.eye(3)[:, 1]]:
+        p = raw_image_from_array(a)
+        assert p.dtype.startswith("<") or p.dtype.startswith("|")
+        b = array_from_raw_image(p)
+        assert b.shape == a.shape
+        assert np.array_equal(a, b)
+        # zero-copy
+        assert not b.flags.owndata
+        assert not b.flags.writeable
+
+    a = np.random.randn(3, 3)
+    b = array_from_raw_image(raw_image_from_array(a, "<f4"))
+    assert b.dtype == np.float32
+    assert np.allclose(a, b, atol=1e-6)
+
+
+def test_packed_state_roundtrip():
+    iedo = IEDO(True, True)
+    state = make_sim_state(4, 3)
+    dump = DTSimStateDump(state)
+    dump_packed = DTSimStateDumpPacked(pack_sim_state(state))
+
+    # the same as what the current encoding gives
+    dump2 = object_from_ipce(ipce_from_object(dump), DTSimStateDump, iedo=iedo)
+    dump_packed2 = object_from_ipce(ipce_from_object(dump_packed), DTSimStateDumpPacked, iedo=iedo)
+    assert_same_sim_state(dump2.state, state)
+    assert_same_sim_state(unpack_sim_state(dump_packed2.state), state)
+
+    n = encoded_size(dump)
+    n32 = encoded_size(DTSimStateDumpPacked(pack_sim_state(state, float32=True)))
+    assert n32 < n
+
+    assert protocol_simulator_DB20_packed.outputs["state_dump"] is DTSimStateDumpPacked
+
+
+def roundtrip(ob):
+    return object_from_ipce(ipce_from_object(ob), type(ob), iedo=IEDO(True, True))
+
+
+def test_packed_outputs():
+    state = make_sim_state(2, 3)
+    p = protocol_simulator_DB20_packed
+
+    checkpoint = roundtrip(DTSimCheckpointSavedPacked("c", DTSimStateDumpPacked(pack_sim_state(state))))
+    assert_same_sim_state(unpack_sim_state(checkpoint.state.state), state)
+    assert p.outputs["checkpoint_saved"] is DTSimCheckpointSavedPacked
+
+    observations = roundtrip(DB20StepObservationsPacked(1.0, {}, pack_sim_state(state, float32=True)))
+    assert_same_sim_state(unpack_sim_state(observations.state), state)
+    assert p.outputs["step_observations"] is DB20StepObservationsPacked
+
+    encoder, decoder = SimStateDeltaEncoder(), SimStateDeltaDecoder()
+    for _ in range(2):
+        delta = encoder.encode(state, "map")
+        dump = roundtrip(DTSimStateDeltaDumpPacked(pack_state_delta(delta)))
+        assert isinstance(dump.state, DTSimStateDeltaPacked)
+        state2, map_data = decoder.apply(unpack_state_delta(dump.state))
+        assert_same_sim_state(state2, state)
+    assert p.outputs["state_delta_dump"] is DTSimStateDeltaDumpPacked
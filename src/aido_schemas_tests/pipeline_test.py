@@ -0,0 +1,101 @@
+from typing import List, Tuple
+
+from aido_schemas import (
+    EpisodeStart,
+    JPGImage,
+    Pipeline,
+    PipelineStage,
+    protocol_image_filter,
+    protocol_image_source,
+    ProtocolViolation,
+)
+
+
+class Source:
+    def __init__(self, nimages: int):
+        self.nimages = nimages
+        self.sent = []
+
+    def init(self):
+        self.episode = 0
+        self.n = 0
+
+    def on_received_next_episode(self, context):
+        self.episode += 1
+        self.n = 0
+        context.write("episode_start", EpisodeStart(f"episode{self.episode}"))
+
+    def on_received_next_image(self, context):
+        if self.n >= self.nimages:
+            context.write("no_more_images", None)
+            return
+        self.n += 1
+        image = JPGImage(b"image%d" % self.n)
+        self.sent.append(image)
+        context.write("image", image)
+
+
+class Filter:
+    def on_received_episode_start(self, context, data: EpisodeStart):
+        context.write("episode_start", data)
+
+    def on_received_image(self, context, data: JPGImage):
+        context.write("image", data)
+
+
+class BadFilter(Filter):
+    def on_received_episode_start(self, context, data: EpisodeStart):
+        # does not forward the episode start
+        context.write("image", JPGImage(b""))
+
+
+def make_pipeline(filters) -> Tuple[Pipeline, Source, List]:
+    outputs = []
+    source = Source(nimages=2)
+    stages = [PipelineStage("source", source, protocol_image_source)]
+    for i, f in enumerate(filters):
+        stages.append(PipelineStage(f"filter{i}", f, protocol_image_filter))
+    pipeline = Pipeline(stages, sink=lambda topic, data, timing: outputs.append((topic, data)))
+    return pipeline, source, outputs
+
+
+def test_pipeline():
+    pipeline, source, outputs = make_pipeline([Filter(), Filter()])
+    pipeline.init()
+    pipeline.write("next_episode")
+    for _ in range(3):
+        pipeline.write("next_image")
+    pipeline.finish()
+
+    assert [_[0] for _ in outputs] == ["episode_start", "image", "image", "no_more_images"]
+    # the same objects, not copies
+    assert outputs[1][1] is source.sent[0]
+    assert outputs[2][1] is source.sent[1]
+    assert pipeline.counts[("filter1", "image")] == 2
+
+
+def assert_violation(f, *args):
+    try:
+        f(*args)
+    except ProtocolViolation:
+        pass
+    else:
+        raise Exception()
+
+
+def test_pipeline_violations():
+    pipeline, _, _ = make_pipeline([Filter(), BadFilter()])
+    pipeline.init()
+    assert_violation(pipeline.write, "next_episode")
+
+    pipeline, _, _ = make_pipeline([Filter()])
+    pipeline.init()
+    # next_image before next_episode
+    assert_violation(pipeline.write, "next_image")
+    # the nodes can still be finished
+    pipeline.finish()
+
+    pipeline, _, _ = make_pipeline([])
+    pipeline.init()
+    # wrong type
+    assert_violation(pipeline.write, "next_episode", 1)
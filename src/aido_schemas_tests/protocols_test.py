@@ -1,9 +1,176 @@
-from aido_schemas import protocol_image_source
-from zuper_nodes import OutputProduced, Unexpected
+import numpy as np
+from zuper_ipce import IEDO, IESO, ipce_from_object, object_from_ipce
+from zuper_nodes import InputReceived, OutputProduced, Unexpected
+from zuper_nodes.language_recognize import Enough, NeedMore
 from zuper_nodes_tests.test_protocol import assert_seq
 
+from aido_schemas import (
+    DB18RobotObservationsBatch,
+    DB20Observations,
+    DB20Odometry,
+    DB20RobotObservationsBatch,
+    DTSimDuckieInfo,
+    DTSimDuckieStateBatch,
+    DTSimRobotInfo,
+    DTSimRobotStateBatch,
+    Duckiebot1Observations,
+    GetRobotObservationsBatch,
+    JPGImage,
+    LEDSCommands,
+    protocol_image_source,
+    protocol_simulator,
+    protocol_simulator_DB20,
+    protocol_simulator_duckiebot1,
+    PWMCommands,
+    RGB,
+)
+
 
 def test_proto_image_source():
     l0 = protocol_image_source.language
     seq = [OutputProduced("next_image")]
     assert_seq(l0, seq, (Unexpected,), Unexpected)
+
+
+def test_proto_simulator_camera_configuration():
+    l0 = protocol_simulator.language
+    seq = [
+        InputReceived("clear"),
+        InputReceived("set_map"),
+        InputReceived("spawn_robot"),
+        InputReceived("set_camera_configuration"),
+        OutputProduced("camera_configuration"),
+        InputReceived("episode_start"),
+    ]
+    assert_seq(l0, seq, (NeedMore, NeedMore, NeedMore, NeedMore, NeedMore, Enough), Enough)
+
+
+def test_proto_simulator_camera_configuration_after_start():
+    l0 = protocol_simulator.language
+    seq = [
+        InputReceived("clear"),
+        InputReceived("set_map"),
+        InputReceived("episode_start"),
+        InputReceived("set_camera_configuration"),
+    ]
+    assert_seq(l0, seq, (NeedMore, NeedMore, Enough, Unexpected), Unexpected)
+
+
+def test_proto_simulator_step_and_observe():
+    l0 = protocol_simulator.language
+    seq = [
+        InputReceived("clear"),
+        InputReceived("set_map"),
+        InputReceived("episode_start"),
+        InputReceived("step_and_observe"),
+        OutputProduced("step_observations"),
+        InputReceived("step_and_observe"),
+    ]
+    assert_seq(l0, seq, (NeedMore, NeedMore, Enough, NeedMore, Enough, NeedMore), NeedMore)
+
+
+def test_proto_simulator_offer_map():
+    l0 = protocol_simulator.language
+    seq = [
+        InputReceived("clear"),
+        InputReceived("offer_map"),
+        OutputProduced("map_offer_reply"),
+        InputReceived("spawn_robot"),
+        InputReceived("episode_start"),
+    ]
+    assert_seq(l0, seq, (NeedMore, NeedMore, NeedMore, NeedMore, Enough), Enough)
+
+
+def test_proto_simulator_checkpoint():
+    l0 = protocol_simulator.language
+    seq = [
+        InputReceived("clear"),
+        InputReceived("set_map"),
+        InputReceived("spawn_robot"),
+        InputReceived("save_checkpoint"),
+        OutputProduced("checkpoint_saved"),
+        InputReceived("episode_start"),
+        InputReceived("step"),
+        InputReceived("restore_checkpoint"),
+        InputReceived("episode_start"),
+    ]
+    expect = (NeedMore, NeedMore, NeedMore, NeedMore, NeedMore, Enough, Enough, NeedMore, Enough)
+    assert_seq(l0, seq, expect, Enough)
+
+
+def test_proto_simulator_batch_queries():
+    l0 = protocol_simulator.language
+    seq = [
+        InputReceived("clear"),
+        InputReceived("set_map"),
+        InputReceived("episode_start"),
+        InputReceived("get_robot_observations_batch"),
+        OutputProduced("robot_observations_batch"),
+        InputReceived("get_robot_state_batch"),
+        OutputProduced("robot_state_batch"),
+        InputReceived("get_duckie_state_batch"),
+        OutputProduced("duckie_state_batch"),
+    ]
+    expect = (NeedMore, NeedMore, Enough, NeedMore, Enough, NeedMore, Enough, NeedMore, Enough)
+    assert_seq(l0, seq, expect, Enough)
+
+
+def test_proto_simulator_batch_reply_required():
+    l0 = protocol_simulator.language
+    seq = [
+        InputReceived("clear"),
+        InputReceived("set_map"),
+        InputReceived("episode_start"),
+        InputReceived("get_robot_state_batch"),
+        InputReceived("step"),
+    ]
+    assert_seq(l0, seq, (NeedMore, NeedMore, Enough, NeedMore, Unexpected), Unexpected)
+
+
+def test_proto_simulator_batch_particularized():
+    assert protocol_simulator_DB20.outputs["robot_observations_batch"] is DB20RobotObservationsBatch
+    assert protocol_simulator_DB20.outputs["robot_state_batch"] is DTSimRobotStateBatch
+    assert protocol_simulator_DB20.outputs["duckie_state_batch"] is DTSimDuckieStateBatch
+    assert protocol_simulator_duckiebot1.outputs["robot_observations_batch"] is DB18RobotObservationsBatch
+
+
+def roundtrip(ob):
+    # as the node wrapper does: with and without the schema
+    iedo = IEDO(True, True)
+    res = []
+    for with_schema in [True, False]:
+        ipce = ipce_from_object(ob, ieso=IESO(with_schema=with_schema))
+        ob2 = object_from_ipce(ipce, type(ob), iedo=iedo)
+        assert type(ob2) is type(ob), (type(ob), with_schema)
+        res.append(ob2)
+    return res
+
+
+def test_batch_ipce_roundtrip():
+    for robot_names in (None, ["a", "b"]):
+        ob = GetRobotObservationsBatch(robot_names, 1.0)
+        assert roundtrip(ob) == [ob, ob]
+
+    jpg = JPGImage(b"\xff\xd8 not really a jpg")
+    odometry = DB20Odometry(resolution_rad=0.1, axis_left_rad=0.2, axis_right_rad=0.3)
+    observations = DB20Observations(jpg, odometry)
+    ob = DB20RobotObservationsBatch(2.0, {"a": observations, "b": observations})
+    assert roundtrip(ob) == [ob, ob]
+    ob = DB18RobotObservationsBatch(2.0, {"a": Duckiebot1Observations(jpg)})
+    assert roundtrip(ob) == [ob, ob]
+
+    grey = RGB(0.5, 0.5, 0.5)
+    info = DTSimRobotInfo(
+        pose=np.eye(3),
+        velocity=np.zeros((3, 3)),
+        pwm=PWMCommands(0.1, 0.2),
+        leds=LEDSCommands(grey, grey, grey, grey, grey),
+    )
+    for ob2 in roundtrip(DTSimRobotStateBatch(3.0, {"a": info})):
+        assert ob2.t_effective == 3.0 and list(ob2.states) == ["a"]
+        assert np.array_equal(ob2.states["a"].pose, info.pose)
+        assert ob2.states["a"].leds == info.leds
+
+    duckie = DTSimDuckieInfo(np.eye(3), np.zeros((3, 3)))
+    for ob2 in roundtrip(DTSimDuckieStateBatch(3.0, {"duckie-0": duckie})):
+        assert np.array_equal(ob2.states["duckie-0"].pose, np.eye(3))
@@ -0,0 +1,273 @@
+import dataclasses
+import json
+import os
+import time
+import tracemalloc
+import typing
+from typing import Callable, Dict
+
+import cbor2
+import numpy as np
+from zuper_commons.logs import ZLogger
+from zuper_ipce import IEDO, IESO, ipce_from_object, object_from_ipce
+
+import aido_schemas
+from aido_schemas import (
+    DB20Observations,
+    DTSimStateArrays,
+    object_from_ipce_fast,
+    RawImage,
+    raw_image_from_array,
+    sim_state_arrays_from_sim_state,
+)
+from .state_arrays_test import make_sim_state
+
+logger = ZLogger(__name__)
+
+# Encode/decode time, size and allocations through the IPCE/CBOR path
+# (as used by the node wrapper) for a sample of each schema defined in aido_schemas.
+#
+# The sizes are compared with the baselines in serialization_baseline.json;
+# to update them after an intended change: AIDO_BENCHMARK_UPDATE=1.
+# The times depend on the machine, so they are only written to OUTPUT and
+# compared with the previous run on the same machine, if any: a slowdown is
+# a warning, or a failure if AIDO_BENCHMARK_STRICT is set.
+
+BASELINE = os.path.join(os.path.dirname(__file__), "serialization_baseline.json")
+OUTPUT = os.path.join(os.path.dirname(__file__), "..", "..", "out-tests", "serialization_benchmark.json")
+ENV_UPDATE = "AIDO_BENCHMARK_UPDATE"
+ENV_STRICT = "AIDO_BENCHMARK_STRICT"
+
+SIZE_TOLERANCE = 1.1
+TIME_TOLERANCE = 2.0
+TIME_BUDGET = 0.005
+""" Seconds spent measuring each operation. """
+
+N = 4
+""" Number of robots, duckies, etc. in the samples. """
+
+NOT_DECODABLE = {
+    "DuckieState",
+    "DuckieStateBatch",
+    "RobotObservations",
+    "RobotObservationsBatch",
+    "RobotObservationsSlotted",
+    "RobotState",
+    "RobotStateBatch",
+    "Scenario",
+    "ScenarioRobotSpec",
+    "SetMap",
+    "SetRobotCommands",
+    "SpawnRobot",
+    "StepAndObserve",
+    "StepObservations",
+}
+"""
+Schemas with fields typed Any, which zuper_ipce cannot decode
+(only their particularizations are sent).
+"""
+
+SAMPLE_MAP = "tiles:\n" + "".join(
+    f"- [floor, straight/E, curve_left/N, 3way_left/W, asphalt]\n" for _ in range(40)
+)
+
+NOT_SCHEMAS = {"PipelineStage", "ProtocolAutomaton", "QueuePolicy"}
+""" Dataclasses exported by aido_schemas that are not sent as messages. """
+
+
+def schema_classes() -> Dict[str, type]:
+    """The dataclasses exported by aido_schemas (including the slotted variants)."""
+    res = {}
+    for name in aido_schemas.__all__:
+        T = getattr(aido_schemas, name)
+        if not (isinstance(T, type) and dataclasses.is_dataclass(T)):
+            continue
+        if T.__module__.startswith("aido_schemas.") and name not in NOT_SCHEMAS:
+            res[name] = T
+    return dict(sorted(res.items()))
+
+
+def sample_value(T, field_name: str, rng: np.random.RandomState):
+    if T is RawImage and field_name != "camera":
+        # the arrays of the packed states (see packed.py)
+        return raw_image_from_array(rng.randn(3, 3))
+    if T in SPECIAL:
+        return SPECIAL[T](rng)
+    if hasattr(T, "__supertype__"):  # NewType
+        return sample_value(T.__supertype__, field_name, rng)
+    if T is bool:
+        return True
+    if T is int:
+        return 3
+    if T is float:
+        return 0.5
+    if T is str:
+        if field_name == "map_data":
+            return SAMPLE_MAP
+        if "yaml" in field_name:
+            return "{}"
+        return "duckiebot-0"
+    if T is bytes:
+        # about the size of a compressed 640x480 camera frame
+        return rng.bytes(30000)
+    if T is np.ndarray:
+        return rng.randn(3, 3)
+    if T is type:
+        return DB20Observations
+    if T in (object, typing.Any):
+        return "opaque"
+    if dataclasses.is_dataclass(T):
+        return sample(T, rng)
+
+    origin, args = typing.get_origin(T), typing.get_args(T)
+    if origin is typing.Union:
+        return sample_value([_ for _ in args if _ is not type(None)][0], field_name, rng)
+    if origin is list:
+        return [sample_value(args[0], field_name, rng) for _ in range(N)]
+    if origin is tuple:
+        if len(args) == 2 and args[1] is Ellipsis:
+            return tuple(sample_value(args[0], field_name, rng) for _ in range(3))
+        return tuple(sample_value(_, field_name, rng) for _ in args)
+    if origin is dict:
+        return {f"{field_name}-{i}": sample_value(args[1], field_name, rng) for i in range(N)}
+    raise ValueError(f"Cannot make a sample of {T!r}")
+
+
+def sample(T: type, rng: np.random.RandomState):
+    if T in SPECIAL:
+        return SPECIAL[T](rng)
+    hints = typing.get_type_hints(T)
+    values = {f.name: sample_value(hints[f.name], f.name, rng) for f in dataclasses.fields(T)}
+    return T(**values)
+
+
+SPECIAL: Dict[object, Callable[[np.random.RandomState], object]] = {
+    RawImage: lambda rng: raw_image_from_array(rng.randint(0, 255, (120, 160, 3)).astype("uint8")),
+    DTSimStateArrays: lambda rng: sim_state_arrays_from_sim_state(make_sim_state(N, N)),
+}
+
+
+def time_per_call(f: Callable[[], object]) -> float:
+    """Microseconds."""
+    n = 0
+    t0 = time.perf_counter()
+    while True:
+        f()
+        n += 1
+        dt = time.perf_counter() - t0
+        if dt > TIME_BUDGET and n >= 3:
+            return round(dt / n * 1e6, 1)
+
+
+def measure(ob: object, T: type, decodable: bool) -> dict:
+    ieso = IESO(use_ipce_from_typelike_cache=True, with_schema=False)
+    iedo = IEDO(True, True)
+
+    def encode() -> bytes:
+        return cbor2.dumps(ipce_from_object(ob, ieso=ieso))
+
+    data = encode()
+    res = {"size": len(data), "encode_us": time_per_call(encode)}
+
+    def decode():
+        return object_from_ipce(cbor2.loads(data), T, iedo=iedo)
+
+    def decode_fast():
+        return object_from_ipce_fast(cbor2.loads(data), T)
+
+    if decodable:
+        res["decode_us"] = time_per_call(decode)
+        res["decode_fast_us"] = time_per_call(decode_fast)
+
+    tracemalloc.start()
+    try:
+        encode()
+        if decodable:
+            decode()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    res["peak_alloc"] = peak
+    return res
+
+
+def run_benchmarks() -> Dict[str, dict]:
+    results = {}
+    for name, T in schema_classes().items():
+        ob = sample(T, np.random.RandomState(0))
+        try:
+            results[name] = measure(ob, T, decodable=name not in NOT_DECODABLE)
+        except Exception as e:
+            raise Exception(f"Cannot encode and decode {name} without the schema") from e
+    return results
+
+
+def compare(results: Dict[str, dict], sizes: Dict[str, int], previous: Dict[str, dict]) -> Dict[str, list]:
+    bigger = []
+    slower = []
+    missing = []
+    for name, r in results.items():
+        if name not in sizes:
+            missing.append(name)
+        elif r["size"] > sizes[name] * SIZE_TOLERANCE:
+            bigger.append(f"{name}: {sizes[name]} -> {r['size']} bytes")
+        p = previous.get(name, {})
+        for k in ["encode_us", "decode_us"]:
+            if r.get(k) and p.get(k) and r[k] > p[k] * TIME_TOLERANCE:
+                slower.append(f"{name}: {k} {p[k]}us -> {r[k]}us")
+    return {"bigger": bigger, "slower": slower, "missing": missing}
+
+
+def has_field_typed_any(T: type) -> bool:
+    def is_any(t) -> bool:
+        return t in (typing.Any, object) or any(is_any(_) for _ in typing.get_args(t))
+
+    hints = typing.get_type_hints(T)
+    return any(is_any(hints[f.name]) for f in dataclasses.fields(T))
+
+
+def test_samples_for_all_schemas():
+    # new schemas must be covered by the benchmarks
+    for name, T in schema_classes().items():
+        sample(T, np.random.RandomState(0))
+
+
+def test_not_decodable_have_fields_typed_any():
+    # the exceptions to decoding must be justified
+    classes = schema_classes()
+    for name in NOT_DECODABLE:
+        assert name in classes, name
+        assert has_field_typed_any(classes[name]), name
+
+
+def test_serialization_benchmark():
+    previous = {}
+    if os.path.exists(OUTPUT):
+        with open(OUTPUT) as f:
+            previous = json.load(f)
+    results = run_benchmarks()
+    os.makedirs(os.path.dirname(OUTPUT), exist_ok=True)
+    with open(OUTPUT, "w") as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+
+    sizes = {k: v["size"] for k, v in results.items()}
+    if os.environ.get(ENV_UPDATE):
+        with open(BASELINE, "w") as f:
+            json.dump(sizes, f, indent=2, sort_keys=True)
+            f.write("\n")
+        logger.info(f"Written baselines to {BASELINE}")
+        return
+
+    with open(BASELINE) as f:
+        baseline = json.load(f)
+    diff = compare(results, baseline, previous)
+    for name in sorted(results):
+        r = results[name]
+        logger.debug(f"{name}: {r['size']} bytes, encode {r['encode_us']}us")
+    if diff["missing"]:
+        logger.warning(f"No baseline for {diff['missing']}; update it with {ENV_UPDATE}=1.")
+    if diff["slower"]:
+        logger.warning("Slower than the previous run:\n" + "\n".join(diff["slower"]))
+    assert not diff["bigger"], diff["bigger"]
+    if os.environ.get(ENV_STRICT):
+        assert not diff["slower"], diff["slower"]
@@ -0,0 +1,70 @@
+import numpy as np
+from zuper_ipce import IEDO, ipce_from_object, object_from_ipce
+
+from aido_schemas import (
+    DTSimStateArrays,
+    LEDSCommands,
+    PWMCommands,
+    RGB,
+    sim_state_arrays_from_sim_state,
+    sim_state_from_sim_state_arrays,
+)
+from aido_schemas.schemas import DTSimDuckieInfo, DTSimRobotInfo, DTSimState
+
+
+def make_sim_state(n_robots: int, n_duckies: int) -> DTSimState:
+    duckiebots = {}
+    for i in range(n_robots):
+        rgb = RGB(float(i % 2), 0.5, 1.0)
+        duckiebots[f"robot{i}"] = DTSimRobotInfo(
+            pose=np.random.randn(3, 3),
+            velocity=np.random.randn(3, 3),
+            pwm=PWMCommands(motor_left=0.1 * (i % 10), motor_right=-0.5),
+            leds=LEDSCommands(rgb, rgb, rgb, rgb, rgb),
+        )
+    duckies = {}
+    for i in range(n_duckies):
+        duckies[f"duckie{i}"] = DTSimDuckieInfo(pose=np.random.randn(3, 3), velocity=np.zeros((3, 3)))
+    return DTSimState(t_effective=1.5, duckiebots=duckiebots, duckies=duckies)
+
+
+def assert_same_sim_state(a: DTSimState, b: DTSimState):
+    assert a.t_effective == b.t_effective
+    assert list(a.duckiebots) == list(b.duckiebots)
+    for k, r in a.duckiebots.items():
+        r2 = b.duckiebots[k]
+        assert np.allclose(r.pose, r2.pose)
+        assert np.allclose(r.velocity, r2.velocity)
+        assert r.pwm == r2.pwm
+        assert r.leds == r2.leds
+    assert list(a.duckies) == list(b.duckies)
+    for k, d in a.duckies.items():
+        assert np.allclose(d.pose, b.duckies[k].pose)
+        assert np.allclose(d.velocity, b.duckies[k].velocity)
+
+
+def test_sim_state_arrays_roundtrip():
+    state = make_sim_state(4, 50)
+    arrays = sim_state_arrays_from_sim_state(state)
+    assert arrays.robot_pose.shape == (4, 3, 3)
+    assert arrays.duckie_pose.shape == (50, 3, 3)
+
+    ipce = ipce_from_object(arrays)
+    arrays2 = object_from_ipce(ipce, DTSimStateArrays, iedo=IEDO(True, True))
+    assert_same_sim_state(state, sim_state_from_sim_state_arrays(arrays2))
+
+
+def test_sim_state_arrays_views():
+    state = make_sim_state(2, 0)
+    arrays = sim_state_arrays_from_sim_state(state)
+    assert len(arrays.duckiebots) == 2
+    assert len(arrays.duckies) == 0
+    assert "robot1" in arrays.duckiebots
+    assert arrays.duckiebots["robot1"].pwm == state.duckiebots["robot1"].pwm
+    # the views, with their index, are created once
+    assert arrays.duckiebots is arrays.duckiebots
+    assert arrays.duckies is arrays.duckies
+    # and are not part of the data
+    ipce = ipce_from_object(arrays)
+    arrays2 = object_from_ipce(ipce, DTSimStateArrays, iedo=IEDO(True, True))
+    assert_same_sim_state(state, sim_state_from_sim_state_arrays(arrays2))
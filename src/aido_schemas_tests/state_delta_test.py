@@ -0,0 +1,70 @@
+from zuper_ipce import IEDO, ipce_from_object, object_from_ipce
+
+from aido_schemas import (
+    DTSimStateDelta,
+    SimStateDeltaDecoder,
+    SimStateDeltaEncoder,
+    StateDeltaOutOfSync,
+)
+from aido_schemas.schemas import DTSimState
+from .state_arrays_test import assert_same_sim_state, make_sim_state
+
+
+def test_state_delta_roundtrip():
+    state = make_sim_state(3, 20)
+    encoder = SimStateDeltaEncoder()
+    decoder = SimStateDeltaDecoder()
+
+    d0 = encoder.encode(state, "map")
+    assert d0.base_version is None
+    assert len(d0.duckies) == 20
+    assert d0.map_data == "map"
+    state1, map_data = decoder.apply(d0)
+    assert_same_sim_state(state, state1)
+    assert map_data == "map"
+
+    duckiebots = dict(state.duckiebots)
+    duckiebots["robot0"].pose = duckiebots["robot0"].pose + 1
+    duckies = dict(state.duckies)
+    del duckies["duckie3"]
+    state2 = DTSimState(t_effective=2.0, duckiebots=duckiebots, duckies=duckies)
+
+    d1 = encoder.encode(state2, "map")
+    assert d1.base_version == d0.version
+    assert list(d1.duckiebots) == ["robot0"]
+    assert not d1.duckies
+    assert d1.removed_duckies == ["duckie3"]
+    assert d1.map_data is None
+
+    ipce = ipce_from_object(d1)
+    d1b = object_from_ipce(ipce, DTSimStateDelta, iedo=IEDO(True, True))
+    state2b, map_data = decoder.apply(d1b)
+    assert_same_sim_state(state2, state2b)
+    assert map_data == "map"
+
+
+def test_state_delta_resync():
+    state = make_sim_state(2, 2)
+    encoder = SimStateDeltaEncoder()
+    decoder = SimStateDeltaDecoder()
+    decoder.apply(encoder.encode(state, "map"))
+    encoder.encode(state, "map")  # lost
+    try:
+        decoder.apply(encoder.encode(state, "map"))
+    except StateDeltaOutOfSync:
+        pass
+    else:
+        raise Exception()
+
+    encoder.resync(decoder.version)
+    d = encoder.encode(state, "map")
+    assert d.base_version is None
+    state2, _ = decoder.apply(d)
+    assert_same_sim_state(state, state2)
+
+
+def test_state_delta_keyframe_every():
+    state = make_sim_state(1, 1)
+    encoder = SimStateDeltaEncoder(keyframe_every=3)
+    keyframes = [encoder.encode(state, "map").base_version is None for _ in range(7)]
+    assert keyframes == [True, False, False, True, False, False, True]
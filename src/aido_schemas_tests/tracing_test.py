@@ -0,0 +1,23 @@
+import time
+
+from aido_schemas import LatencyTracer
+
+
+def test_latency_tracer():
+    tracer = LatencyTracer(deadline=0.005)
+    tracer.start_episode("ep1")
+    tracer.commands_sent()  # no observation yet
+    for i in range(5):
+        tracer.observation_received(acquired=time.time())
+        if i == 2:
+            tracer.observation_received()
+            time.sleep(0.01)
+        tracer.commands_sent()
+
+    report = tracer.report()
+    assert list(report) == ["ep1"]
+    r = report["ep1"]
+    assert r["observation_to_commands"]["count"] == 5
+    assert r["acquisition_to_commands"]["count"] == 4
+    assert r["deadline_misses"] == 1
+    assert r["superseded_observations"] == 1
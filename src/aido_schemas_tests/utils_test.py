@@ -0,0 +1,34 @@
+import json
+
+from aido_schemas.utils import TimeTracker, TimingStats
+
+
+def test_time_tracker_nested():
+    stats = TimingStats(max_events=100)
+    for step in range(10):
+        tt = TimeTracker(step, stats=stats)
+        with tt.measure("step"):
+            for _ in range(3):
+                with tt.measure("physics"):
+                    pass
+            with tt.measure("render"):
+                pass
+        assert set(tt.phases) == {"step", "step/physics", "step/render"}
+        assert tt.total == tt.phases["step"]
+
+    assert stats.phases["step/physics"].count == 30
+    assert stats.phases["step"].count == 10
+    s = json.loads(stats.to_json())
+    assert s["step"]["p99"] <= s["step"]["max"]
+    trace = stats.to_chrome_trace()
+    assert len(trace["traceEvents"]) == 50
+
+
+def test_phase_stats_percentiles():
+    stats = TimingStats()
+    for i in range(1, 1001):
+        stats.add("phase", 0.0, i * 0.001, 0)
+    p50 = stats.percentile("phase", 50)
+    p99 = stats.percentile("phase", 99)
+    assert abs(p50 - 0.5) < 0.02, p50
+    assert abs(p99 - 0.99) < 0.03, p99
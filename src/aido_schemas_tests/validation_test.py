@@ -0,0 +1,87 @@
+import numpy as np
+from zuper_ipce import IEDO, ipce_from_object, object_from_ipce
+
+from aido_schemas import (
+    CameraConfigurationRequest,
+    DB20Observations,
+    DB20Odometry,
+    DTSimState,
+    Duckiebot1Commands,
+    JPGImage,
+    LEDSCommands,
+    Metric,
+    PWMCommands,
+    RegionOfInterest,
+    RGB,
+    decoder_for,
+    object_from_ipce_fast,
+    trusted_construction,
+    validator_for,
+)
+from .state_arrays_test import assert_same_sim_state, make_sim_state
+
+
+def make_commands() -> Duckiebot1Commands:
+    c = RGB(0.1, 0.2, 0.3)
+    return Duckiebot1Commands(PWMCommands(0.5, -0.5), LEDSCommands(c, c, c, c, c))
+
+
+def test_fast_decoding_same_as_zuper():
+    iedo = IEDO(True, True)
+    obs = [
+        make_commands(),
+        DB20Observations(JPGImage(b"jpg"), DB20Odometry(0.1, 1.0, 2.0)),
+        CameraConfigurationRequest("r", "png", resolution=(240, 320), roi=RegionOfInterest(0, 0, 10, 10)),
+        CameraConfigurationRequest("r", "jpg"),
+        Metric(True, 1.0, "reward"),
+    ]
+    for ob in obs:
+        ipce = ipce_from_object(ob)
+        T = type(ob)
+        res = object_from_ipce_fast(ipce, T)
+        assert type(res) is T
+        assert res == object_from_ipce(ipce, T, iedo=iedo) == ob
+
+    state = make_sim_state(3, 2)
+    assert_same_sim_state(object_from_ipce_fast(ipce_from_object(state), DTSimState), state)
+
+
+def test_validation_errors():
+    ipce = ipce_from_object(PWMCommands(0.1, 0.2))
+    ipce["motor_left"] = 3.0
+    # the trusted path does not check
+    assert decoder_for(PWMCommands)(ipce).motor_left == 3.0
+    try:
+        object_from_ipce_fast(ipce, PWMCommands)
+    except ValueError:
+        pass
+    else:
+        raise Exception()
+
+    commands = make_commands()
+    validator_for(Duckiebot1Commands)(commands)
+    commands.LEDS.center.g = "green"
+    try:
+        validator_for(Duckiebot1Commands)(commands)
+    except ValueError:
+        pass
+    else:
+        raise Exception()
+
+
+def test_trusted_construction():
+    with trusted_construction():
+        # not checked, but still converted
+        rgb = RGB(1, 0, 0)
+        pwm = PWMCommands(np.float32(2), 0)
+        metric = Metric(True, 3, "")
+    assert (rgb.r, pwm.motor_left, pwm.motor_right, metric.cumulative_value) == (1.0, 2.0, 0.0, 3.0)
+    assert all(
+        type(_) is float for _ in (rgb.r, rgb.g, pwm.motor_left, pwm.motor_right, metric.cumulative_value)
+    )
+    try:
+        RGB(1, 0, 0)
+    except ValueError:
+        pass
+    else:
+        raise Exception()